@@ -5,3 +5,5 @@ class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
 
+    def ready(self):
+        import attendance.signals  # noqa
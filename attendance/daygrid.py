@@ -0,0 +1,176 @@
+"""
+Day classification shared by the monthly attendance view, month summaries and payroll.
+
+An employee-month is a vector of per-day flags (working calendar, joined,
+leave, partial leave, unpaid leave, worked); a company-month is a matrix with
+one row per employee. classify() turns the flags into one day code per cell
+and counts() tallies the codes per row. With NumPy installed both run as
+array operations over the whole matrix; without it they fall back to plain
+Python lists and give the same results.
+"""
+import calendar
+from datetime import date
+
+# Optional numpy import
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+# Day codes. classify() applies them in this order, so e.g. a weekend inside
+# an approved leave is NON_WORKING and a worked day inside a leave is LEAVE.
+BEFORE_JOINING = 0
+NON_WORKING = 1
+UNPAID_LEAVE = 2
+PARTIAL_LEAVE = 3
+LEAVE = 4
+FUTURE = 5
+WORKED = 6
+ABSENT = 7  # working day with no leave and no work; "expected work" when no worked flags are given
+DAY_CODES = 8
+
+
+class MonthGrid:
+    """
+    Calendar of one month: working-day and future flags per day, plus helpers
+    to turn dates into flag vectors aligned with it.
+    """
+
+    def __init__(self, year, month, holiday_dates=(), today=None):
+        self.year = year
+        self.month = month
+        self.num_days = calendar.monthrange(year, month)[1]
+        self.start = date(year, month, 1)
+        self.end = date(year, month, self.num_days)
+        days = [date(year, month, day) for day in range(1, self.num_days + 1)]
+        self.working = self.vector(day.weekday() < 5 and day not in holiday_dates for day in days)
+        self.future = self.vector(today is not None and day > today for day in days)
+
+    def vector(self, flags):
+        flags = list(flags)
+        return np.array(flags, dtype=bool) if HAS_NUMPY else flags
+
+    def matrix(self, rows):
+        """Stack per-employee vectors into a company-month matrix"""
+        rows = [list(row) for row in rows]
+        if HAS_NUMPY:
+            return np.array(rows, dtype=bool).reshape(len(rows), self.num_days)
+        return rows
+
+    def mask(self, days):
+        """Flags of the given dates; dates outside the month are ignored"""
+        flags = [False] * self.num_days
+        for day in days:
+            if self.start <= day <= self.end:
+                flags[day.day - 1] = True
+        return self.vector(flags)
+
+    def joined(self, joining_date):
+        """Flags of the days on or after joining_date (every day when it is unknown)"""
+        if not joining_date or joining_date <= self.start:
+            first = 0
+        elif joining_date > self.end:
+            first = self.num_days
+        else:
+            first = joining_date.day - 1
+        return self.vector(index >= first for index in range(self.num_days))
+
+
+def _is_matrix(flags):
+    if HAS_NUMPY:
+        return np.ndim(flags) == 2
+    return bool(flags) and isinstance(flags[0], list)
+
+
+def _classify_row(working, future, joined, leave, partial, unpaid, worked):
+    codes = []
+    for i in range(len(working)):
+        if not joined[i]:
+            codes.append(BEFORE_JOINING)
+        elif not working[i]:
+            codes.append(NON_WORKING)
+        elif leave and leave[i]:
+            if unpaid and unpaid[i]:
+                codes.append(UNPAID_LEAVE)
+            elif partial and partial[i]:
+                codes.append(PARTIAL_LEAVE)
+            else:
+                codes.append(LEAVE)
+        elif future[i]:
+            codes.append(FUTURE)
+        elif worked and worked[i]:
+            codes.append(WORKED)
+        else:
+            codes.append(ABSENT)
+    return codes
+
+
+def classify(grid, joined, leave=None, partial=None, unpaid=None, worked=None):
+    """
+    Day codes for an employee-month (vectors) or a company-month (matrices).
+
+    `joined` decides the shape; the other flags are optional and must have the
+    same shape. `partial` and `unpaid` only matter on `leave` days.
+    """
+    if HAS_NUMPY:
+        joined = np.asarray(joined, dtype=bool)
+        none = np.zeros(joined.shape, dtype=bool)
+        leave, partial, unpaid, worked = (
+            none if flags is None else np.asarray(flags, dtype=bool)
+            for flags in (leave, partial, unpaid, worked)
+        )
+        return np.select(
+            [~joined, ~grid.working, leave & unpaid, leave & partial, leave, grid.future, worked],
+            [BEFORE_JOINING, NON_WORKING, UNPAID_LEAVE, PARTIAL_LEAVE, LEAVE, FUTURE, WORKED],
+            default=ABSENT,
+        ).astype(np.int8)
+
+    if not _is_matrix(joined):
+        return _classify_row(grid.working, grid.future, joined, leave, partial, unpaid, worked)
+    return [
+        _classify_row(
+            grid.working, grid.future, joined[i],
+            *(flags[i] if flags else None for flags in (leave, partial, unpaid, worked))
+        )
+        for i in range(len(joined))
+    ]
+
+
+def counts(codes):
+    """Number of days per code: a list of DAY_CODES ints, or one such list per row"""
+    if HAS_NUMPY:
+        codes = np.asarray(codes)
+        return (codes[..., None] == np.arange(DAY_CODES)).sum(axis=-2).tolist()
+
+    def tally(row):
+        result = [0] * DAY_CODES
+        for code in row:
+            result[code] += 1
+        return result
+
+    return [tally(row) for row in codes] if _is_matrix(codes) else tally(codes)
+
+
+def expected_units(codes, restricted=None):
+    """
+    Expected work per day in half days: 2 on working days (and on Restricted
+    Holiday leave days, flagged in `restricted`), 1 on partial leave, 0 otherwise.
+    """
+    if HAS_NUMPY:
+        codes = np.asarray(codes)
+        restricted = np.zeros(codes.shape, dtype=bool) if restricted is None else np.asarray(restricted, dtype=bool)
+        full = (codes == WORKED) | (codes == ABSENT) | (codes == FUTURE) | ((codes == LEAVE) & restricted)
+        return np.where(full, 2, np.where(codes == PARTIAL_LEAVE, 1, 0)).tolist()
+
+    def row_units(row, row_restricted):
+        return [
+            2 if code in (WORKED, ABSENT, FUTURE) or (code == LEAVE and row_restricted and row_restricted[i])
+            else 1 if code == PARTIAL_LEAVE else 0
+            for i, code in enumerate(row)
+        ]
+
+    if _is_matrix(codes):
+        return [row_units(row, restricted[i] if restricted else None) for i, row in enumerate(codes)]
+    return row_units(codes, restricted)
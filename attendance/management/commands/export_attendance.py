@@ -0,0 +1,57 @@
+"""
+Management command to export attendance rows as CSV or JSONL.
+
+Rows are streamed in chunks, so memory stays flat for multi-month ranges.
+
+Usage:
+    # CSV to stdout
+    python manage.py export_attendance --start-date 2025-01-01 --end-date 2025-03-31
+
+    # JSONL for one company, written to a file
+    python manage.py export_attendance --start-date 2025-01-01 --end-date 2025-12-31 --company 1 --format jsonl --output attendance.jsonl
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from attendance.constants import DATE_FORMAT
+from attendance.services import AttendanceExportService
+
+
+class Command(BaseCommand):
+    help = 'Export attendance for a date range as CSV or JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', required=True, help=f'First date ({DATE_FORMAT})')
+        parser.add_argument('--end-date', required=True, help=f'Last date ({DATE_FORMAT})')
+        parser.add_argument('--company', type=int, help='Only employees of this company ID')
+        parser.add_argument('--department', type=int, help='Only employees of this department ID')
+        parser.add_argument('--format', dest='export_format', choices=AttendanceExportService.FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows per query (default: 2000)')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], DATE_FORMAT).date()
+            end_date = datetime.strptime(options['end_date'], DATE_FORMAT).date()
+        except ValueError:
+            raise CommandError(f'Dates must use the {DATE_FORMAT} format')
+
+        rows = AttendanceExportService.rows(
+            start_date, end_date,
+            company_id=options['company'],
+            department_id=options['department'],
+            chunk_size=options['chunk_size'],
+        )
+        lines = AttendanceExportService.stream(options['export_format'], rows)
+
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = -1 if options['export_format'] == 'csv' else 0  # CSV header
+        with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+            for line in lines:
+                handle.write(line)
+                count += 1
+        self.stderr.write(self.style.SUCCESS(f'Exported {count} rows to {options["output"]}'))
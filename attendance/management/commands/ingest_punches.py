@@ -0,0 +1,50 @@
+"""
+Management command to ingest raw turnstile/biometric punches.
+
+The file is a CSV with the columns employee_id,timestamp,location,direction
+(or a JSON list of objects with the same keys when it ends in .json).
+
+Usage:
+    python manage.py ingest_punches punches.csv
+
+    # Print every failed row
+    python manage.py ingest_punches punches.csv --show-errors
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from attendance.services import AttendancePunchIngestionService
+
+
+class Command(BaseCommand):
+    help = 'Fold raw in/out punches into attendance rows in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (or .json) file with punches')
+        parser.add_argument('--show-errors', action='store_true', help='Print each failed row')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, encoding='utf-8-sig') as handle:
+                if path.endswith('.json'):
+                    punches = json.load(handle)
+                else:
+                    punches = AttendancePunchIngestionService.parse_csv(handle.read())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {path}: {e}')
+
+        if not isinstance(punches, list):
+            raise CommandError('Expected a list of punches')
+
+        result = AttendancePunchIngestionService.ingest(punches)
+
+        if options['show_errors']:
+            for entry in result['results']:
+                if entry['status'] == 'error':
+                    self.stdout.write(self.style.ERROR(f"Row {entry['row']}: {entry['message']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {len(punches)} punches: {result['created']} attendance rows created, "
+            f"{result['updated']} updated, {result['failed']} punches failed"
+        ))
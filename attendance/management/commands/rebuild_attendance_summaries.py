@@ -0,0 +1,58 @@
+"""
+Management command to rebuild the materialized monthly attendance summaries.
+
+Usage:
+    # Rebuild every month that has attendance or stored summaries
+    python manage.py rebuild_attendance_summaries
+
+    # Rebuild one year, or one month
+    python manage.py rebuild_attendance_summaries --year 2025
+    python manage.py rebuild_attendance_summaries --year 2025 --month 12
+
+    # Drop the stored rows of the selected months before rebuilding
+    python manage.py rebuild_attendance_summaries --year 2025 --purge
+"""
+from django.core.management.base import BaseCommand, CommandError
+from attendance.models import Attendance, AttendanceMonthSummary
+from attendance.services import AttendanceSummaryService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild AttendanceMonthSummary rows from attendance, leaves and holidays'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only rebuild this year')
+        parser.add_argument('--month', type=int, help='Only rebuild this month (requires --year)')
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Delete the stored rows of the selected months first',
+        )
+
+    def handle(self, *args, **options):
+        year = options['year']
+        month = options['month']
+
+        if month and not year:
+            raise CommandError('--month requires --year')
+        if month and not 1 <= month <= 12:
+            raise CommandError('--month must be between 1 and 12')
+
+        if year and month:
+            months = [(year, month)]
+        elif year:
+            months = [(year, m) for m in range(1, 13)]
+        else:
+            months = {(d.year, d.month) for d in Attendance.objects.dates('date', 'month')}
+            months.update(AttendanceMonthSummary.objects.values_list('year', 'month').distinct())
+            months = sorted(months)
+
+        total = 0
+        for y, m in months:
+            if options['purge']:
+                AttendanceMonthSummary.objects.filter(year=y, month=m).delete()
+            rows = AttendanceSummaryService.rebuild_month(y, m)
+            total += rows
+            self.stdout.write(f'{y}-{m:02d}: {rows} summaries')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} summaries across {len(months)} months'))
@@ -0,0 +1,81 @@
+"""
+Management command to recalculate derived attendance fields in bulk.
+
+Recomputes worked/extra seconds, extra_time_status, admin_alert and day_type
+without calling Attendance.save(), so no signals or Slack messages fire.
+
+Usage:
+    # Everything
+    python manage.py recalculate_attendance
+
+    # A date range for one company, 1000 rows per chunk
+    python manage.py recalculate_attendance --start-date 2025-01-01 --end-date 2025-12-31 --company 1 --chunk-size 1000
+
+    # Resume an interrupted run after the last reported primary key
+    python manage.py recalculate_attendance --after-pk 48200
+
+    # Also apply the current ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS to the records
+    python manage.py recalculate_attendance --reset-total-time
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from attendance.constants import DATE_FORMAT
+from attendance.services import AttendanceRecalculationService
+
+
+class Command(BaseCommand):
+    help = 'Recalculate derived attendance fields in chunks using bulk_update'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help=f'First date to recalculate ({DATE_FORMAT})')
+        parser.add_argument('--end-date', help=f'Last date to recalculate ({DATE_FORMAT})')
+        parser.add_argument('--company', type=int, help='Only employees of this company ID')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per chunk (default: 500)')
+        parser.add_argument('--after-pk', type=int, default=0, help='Resume after this attendance ID')
+        parser.add_argument(
+            '--reset-total-time',
+            action='store_true',
+            help='Set orignal_total_time to ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], DATE_FORMAT).date() if options['start_date'] else None
+            end_date = datetime.strptime(options['end_date'], DATE_FORMAT).date() if options['end_date'] else None
+        except ValueError:
+            raise CommandError(f'Dates must use the {DATE_FORMAT} format')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        total_time = None
+        if options['reset_total_time']:
+            total_time = getattr(settings, 'ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS', 32400)
+
+        state = {'last_pk': options['after_pk']}
+
+        def report(processed, updated, last_pk):
+            state['last_pk'] = last_pk
+            self.stdout.write(f'Processed {processed} records, updated {updated} (last id {last_pk})')
+
+        try:
+            result = AttendanceRecalculationService.run(
+                start_date=start_date,
+                end_date=end_date,
+                company_id=options['company'],
+                chunk_size=options['chunk_size'],
+                after_pk=options['after_pk'],
+                total_time=total_time,
+                progress=report,
+            )
+        except (Exception, KeyboardInterrupt):
+            self.stderr.write(self.style.ERROR(
+                f'Interrupted. Resume with --after-pk {state["last_pk"]}'
+            ))
+            raise
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recalculated {result["processed"]} records: {result["updated"]} updated, '
+            f'summaries of {result["months"]} months rebuilt'
+        ))
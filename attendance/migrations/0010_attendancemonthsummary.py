@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_attendance_entry_type'),
+        ('employees', '0004_alter_employee_photo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('working_days', models.PositiveSmallIntegerField(default=0)),
+                ('non_working_days', models.PositiveSmallIntegerField(default=0)),
+                ('leave_days', models.PositiveSmallIntegerField(default=0)),
+                ('half_days', models.PositiveSmallIntegerField(default=0)),
+                ('expected_day_units', models.CharField(blank=True, help_text="Expected work per day of month in half days ('0', '1' or '2')", max_length=31)),
+                ('seconds_worked', models.IntegerField(default=0)),
+                ('seconds_extra', models.IntegerField(default=0)),
+                ('seconds_to_compensate', models.IntegerField(default=0)),
+                ('present_records', models.PositiveSmallIntegerField(default=0)),
+                ('half_day_records', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_month_summaries', to='employees.employee')),
+            ],
+            options={
+                'ordering': ['-year', '-month', 'employee'],
+                'indexes': [models.Index(fields=['year', 'month'], name='attendance__year_e20fc5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'year', 'month'), name='unique_employee_month_summary')],
+            },
+        ),
+    ]
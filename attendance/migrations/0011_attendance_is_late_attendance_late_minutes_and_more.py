@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_attendancemonthsummary'),
+        ('employees', '0004_alter_employee_photo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='is_late',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='late_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendancemonthsummary',
+            name='late_days',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['is_late', 'date'], name='attendance__is_late_b8aaaa_idx'),
+        ),
+    ]
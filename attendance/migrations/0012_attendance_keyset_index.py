@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_attendance_is_late_attendance_late_minutes_and_more'),
+        ('employees', '0004_alter_employee_photo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date', 'employee', 'id'], name='attendance__date_94444d_idx'),
+        ),
+    ]
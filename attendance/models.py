@@ -3,7 +3,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from employees.models import Employee
 from auth_app.models import User
-from .services import AttendanceCalculationService
+from .services import AttendanceCalculationService, AttendanceSummaryService
 from .constants import ADMIN_ALERT_MESSAGE_MISSING_TIME
 
 
@@ -63,6 +63,10 @@ class Attendance(models.Model):
     office_seconds_worked = models.IntegerField(default=0)
     home_seconds_worked = models.IntegerField(default=0)
 
+    # Late arrival (office check-in after office_working_hours, local time)
+    is_late = models.BooleanField(default=False)
+    late_minutes = models.PositiveIntegerField(default=0)
+
     day_type = models.CharField(
         max_length=20,
         choices=DAY_TYPE_CHOICES,
@@ -153,11 +157,27 @@ class Attendance(models.Model):
             models.Index(fields=['employee', 'date']),
             models.Index(fields=['date']),
             models.Index(fields=['day_type']),
+            models.Index(fields=['is_late', 'date']),
+            models.Index(fields=['-date', 'employee', 'id']),
         ]
 
     def __str__(self):
         return f"{self.employee.get_full_name()} - {self.date}"
 
+    # Fields that make up the record's contribution to AttendanceMonthSummary
+    SUMMARY_FIELDS = (
+        'employee_id', 'date', 'timesheet_status', 'day_type',
+        'seconds_actual_worked_time', 'seconds_extra_time', 'is_late',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded contribution so saving applies only the difference
+        if all(field in instance.__dict__ for field in cls.SUMMARY_FIELDS):
+            instance._summary_snapshot = AttendanceSummaryService.snapshot(instance)
+        return instance
+
     def clean(self):
         if self.in_time and self.out_time and self.out_time < self.in_time:
             raise ValidationError("Out time cannot be before in time.")
@@ -174,7 +194,11 @@ class Attendance(models.Model):
             if end and not timezone.is_aware(end):
                 raise ValidationError(f"{label} out time must be timezone-aware.")
 
-    def save(self, *args, **kwargs):
+    def apply_calculations(self):
+        """
+        Recompute the derived time, extra time and admin alert fields in memory.
+        Pure: no queries, so it can run over many records before a bulk_update.
+        """
         self.office_seconds_worked = AttendanceCalculationService.calculate_location_seconds(
             self.office_in_time, self.office_out_time
         )
@@ -204,6 +228,12 @@ class Attendance(models.Model):
             self.seconds_extra_time = 0
             self.extra_time_status = ''
 
+        late_minutes = AttendanceCalculationService.calculate_late_minutes(
+            self.office_in_time, self.office_working_hours
+        )
+        self.is_late = late_minutes is not None
+        self.late_minutes = late_minutes or 0
+
         if AttendanceCalculationService.should_flag_admin_alert(self):
             self.admin_alert = 1
             self.admin_alert_message = ADMIN_ALERT_MESSAGE_MISSING_TIME
@@ -211,10 +241,72 @@ class Attendance(models.Model):
             self.admin_alert = 0
             self.admin_alert_message = ""
 
+    def save(self, *args, **kwargs):
+        self.apply_calculations()
         self.full_clean()
         super().save(*args, **kwargs)
 
 
+class AttendanceMonthSummary(models.Model):
+    """
+    Materialized monthly attendance counters of one employee.
+
+    Backs the monthSummary/compensationSummary blocks of the monthly view and the
+    dashboard percentage. Maintained incrementally by attendance saves, leave status
+    changes and holiday edits (see AttendanceSummaryService); rebuild with
+    `python manage.py rebuild_attendance_summaries`.
+    """
+
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='attendance_month_summaries'
+    )
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+
+    # Calendar counters (holidays, approved leaves, joining date)
+    working_days = models.PositiveSmallIntegerField(default=0)
+    non_working_days = models.PositiveSmallIntegerField(default=0)
+    leave_days = models.PositiveSmallIntegerField(default=0)
+    half_days = models.PositiveSmallIntegerField(default=0)
+    expected_day_units = models.CharField(
+        max_length=31,
+        blank=True,
+        help_text="Expected work per day of month in half days ('0', '1' or '2')"
+    )
+
+    # Attendance counters (time only from approved timesheets)
+    seconds_worked = models.IntegerField(default=0)
+    seconds_extra = models.IntegerField(default=0)
+    seconds_to_compensate = models.IntegerField(default=0)
+    present_records = models.PositiveSmallIntegerField(default=0)
+    half_day_records = models.PositiveSmallIntegerField(default=0)
+    late_days = models.PositiveSmallIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-year', '-month', 'employee']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['employee', 'year', 'month'],
+                name='unique_employee_month_summary'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.year}-{self.month:02d}"
+
+    def expected_seconds(self, until_day, seconds_per_day):
+        """Expected working seconds from the 1st up to and including until_day"""
+        units = sum(int(unit) for unit in self.expected_day_units[:until_day])
+        return int(units * seconds_per_day / 2)
+
+
 # =========================================================
 # DEPENDENT MODELS (REQUIRED BY notifications APP)
 # =========================================================
@@ -5,10 +5,24 @@ from datetime import datetime
 from calendar import monthrange
 from django.conf import settings
 from django.utils import formats
+from leaves.services import LeaveDateIndex
 from .constants import (
     DATE_FORMAT, TIME_12HR_FORMAT, DAY_NAME_FORMAT, DAY_NUMBER_FORMAT,
     DATETIME_ISO_FORMAT, ADMIN_ALERT_MESSAGE_MISSING_TIME
 )
+from . import daygrid
+
+# Monthly view day_type for each day code of the day kernel
+DAY_TYPES = {
+    daygrid.BEFORE_JOINING: "BEFORE_JOINING",
+    daygrid.NON_WORKING: "NON_WORKING_DAY",
+    daygrid.UNPAID_LEAVE: "LEAVE_DAY",
+    daygrid.PARTIAL_LEAVE: "WORKING_DAY",
+    daygrid.LEAVE: "LEAVE_DAY",
+    daygrid.FUTURE: "FUTURE_DAY",
+    daygrid.WORKED: "WORKING_DAY",
+    daygrid.ABSENT: "ABSENT",
+}
 
 
 def format_seconds_to_time(seconds):
@@ -97,7 +111,11 @@ def get_leave_for_date(date, leaves_list):
     """
     Find leave that applies to a specific date.
     Returns: (leave_object, is_rh, is_partial, partial_type)
+    Pass a LeaveDateIndex when looking up many days; a plain list is scanned.
     """
+    if isinstance(leaves_list, LeaveDateIndex):
+        return leaves_list.lookup(date)
+
     for leave in leaves_list:
         if leave.from_date <= date <= leave.to_date:
             # Check if date is a Restricted Holiday
@@ -456,92 +474,81 @@ class MonthlyAttendanceSerializer(serializers.Serializer):
     data = serializers.DictField()
     
     @staticmethod
-    def serialize_monthly_data(attendance_records, employee, month, year, holidays_list, leaves_list):
-        """Create monthly attendance data structure matching API format"""
+    def serialize_monthly_data(attendance_records, employee, month, year, holidays_list, leaves_list, summary=None):
+        """
+        Create monthly attendance data structure matching API format.
+        holidays_list may be Holiday objects or an already built {date: name} map;
+        when None the month is read from the shared company calendar.
+        Counters come from the stored AttendanceMonthSummary (`summary`),
+        which is built from the given records on first access.
+        """
         from django.utils import timezone
-        from holidays.models import Holiday
-        from leaves.models import Leave
+        from holidays.services import CompanyCalendarService
+        from .services import AttendanceSummaryService
         
         # Get all days in the month
         num_days = monthrange(year, month)[1]
         today = timezone.now().date()
         
-        # Get holidays for the month
-        month_holidays = Holiday.objects.filter(
-            date__year=year,
-            date__month=month,
-            is_active=True
-        ).values_list('date', 'name')
-        holiday_dates = {h[0]: h[1] for h in month_holidays}
+        # Holidays for the month
+        if holidays_list is None:
+            holiday_dates = CompanyCalendarService.holidays_in_range(
+                datetime(year, month, 1).date(), datetime(year, month, num_days).date()
+            )
+        elif isinstance(holidays_list, dict):
+            holiday_dates = holidays_list
+        else:
+            holiday_dates = {h.date: h.name for h in holidays_list}
         
         # Create attendance map
         attendance_map = {rec.date: rec for rec in attendance_records}
         
+        if summary is None:
+            summary = AttendanceSummaryService.summaries_for_month(
+                [employee], year, month, holiday_dates,
+                {employee.id: list(leaves_list)}, {employee.id: list(attendance_records)}
+            )[employee.id]
+        
+        # Date -> leave index for the month, built once
+        leave_index = LeaveDateIndex.build(
+            leaves_list, datetime(year, month, 1).date(), datetime(year, month, num_days).date()
+        )
+        
+        # Day types for the whole month in one pass of the shared day kernel
+        grid = daygrid.MonthGrid(year, month, holiday_dates, today)
+        approved_days, partial_days = [], []
+        for leave_date, leave in leave_index.items():
+            if getattr(leave, 'status', '') in ['Approved', 'APPROVED']:
+                approved_days.append(leave_date)
+                if leave_index.lookup(leave_date)[2]:
+                    partial_days.append(leave_date)
+        worked_days = [
+            record_date for record_date, record in attendance_map.items()
+            if (record.office_in_time and record.office_out_time) or (record.home_in_time and record.home_out_time)
+        ]
+        day_codes = daygrid.classify(
+            grid,
+            grid.joined(employee.joining_date),
+            leave=grid.mask(approved_days),
+            partial=grid.mask(partial_days),
+            worked=grid.mask(worked_days),
+        )
+        
         # Build attendance array for all days in month
         attendance_array = []
-        total_seconds_worked = 0
-        total_seconds_extra = 0
-        seconds_to_compensate = 0
-        
-        # Counters for the summary
-        working_days_count = 0
-        non_working_days_count = 0
-        leave_days_count = 0
-        half_days_count = 0
         
         for day in range(1, num_days + 1):
             current_date = datetime(year, month, day).date()
             day_name = current_date.strftime(DAY_NAME_FORMAT)
-            is_weekend = current_date.weekday() >= 5  # Saturday=5, Sunday=6
             is_holiday = current_date in holiday_dates
-            is_future = current_date > today
             is_before_joining = employee.joining_date and current_date < employee.joining_date
+            day_type = DAY_TYPES[day_codes[day - 1]]
             
             # Get attendance record if exists
             attendance = attendance_map.get(current_date)
             
             # Get leave info for current date
-            leave_info = get_leave_for_date(current_date, leaves_list)
-            leave, is_rh, is_partial, partial_type = leave_info
-            
-            # Determine day type
-            if is_before_joining:
-                day_type = "BEFORE_JOINING"
-                non_working_days_count += 1
-            elif is_holiday or is_weekend:
-                day_type = "NON_WORKING_DAY"
-                non_working_days_count += 1
-            elif leave:
-                leave_status = getattr(leave, 'status', '')
-                if leave_status in ['Approved', 'APPROVED']:
-                    if is_partial:
-                        day_type = "WORKING_DAY"
-                        half_days_count += 1
-                        working_days_count += 1
-                    else:
-                        day_type = "LEAVE_DAY"
-                        leave_days_count += 1
-                else:
-                    # If leave is pending/rejected, it's still a working day or absent
-                    if is_future:
-                        day_type = "FUTURE_DAY"
-                        working_days_count += 1
-                    elif attendance and ((attendance.office_in_time and attendance.office_out_time) or (attendance.home_in_time and attendance.home_out_time)):
-                        day_type = "WORKING_DAY"
-                        working_days_count += 1
-                    else:
-                        day_type = "ABSENT" if not is_future else "FUTURE_DAY"
-                        working_days_count += 1
-            elif is_future:
-                day_type = "FUTURE_DAY"
-                working_days_count += 1
-            elif attendance and ((attendance.office_in_time and attendance.office_out_time) or (attendance.home_in_time and attendance.home_out_time)):
-                day_type = "WORKING_DAY"
-                working_days_count += 1
-            else:
-                # Past day with no check-in and no leave
-                day_type = "ABSENT"
-                working_days_count += 1
+            leave, is_rh, is_partial, partial_type = leave_index.lookup(current_date)
             
             # Default working hours
             default_office_hours = getattr(settings, 'ATTENDANCE_DEFAULT_WORKING_HOURS', '09:00')
@@ -556,13 +563,6 @@ class MonthlyAttendanceSerializer(serializers.Serializer):
                 home_out_time_str = format_datetime_to_iso(attendance.home_out_time) if attendance.home_out_time else ""
                 total_time_str = format_seconds_to_hms(attendance.seconds_actual_worked_time)
                 extra_time_str = format_seconds_to_hms(attendance.seconds_extra_time, include_sign=True)
-                
-                timesheet_status = getattr(attendance, 'timesheet_status', None)
-                if timesheet_status is None or timesheet_status == 'APPROVED':
-                    total_seconds_worked += attendance.seconds_actual_worked_time
-                    total_seconds_extra += attendance.seconds_extra_time
-                    if attendance.seconds_extra_time < 0:
-                        seconds_to_compensate += abs(attendance.seconds_extra_time)
             else:
                 office_hours = default_office_hours
                 total_time = default_total_time
@@ -618,36 +618,12 @@ class MonthlyAttendanceSerializer(serializers.Serializer):
             attendance_array.append(day_record)
         
         # Calculate summaries with "Till Today" logic
+        total_seconds_worked = summary.seconds_worked
+        seconds_to_compensate = summary.seconds_to_compensate
         compensation_time_str = format_seconds_to_hms(seconds_to_compensate)
-        actual_working_hours = format_seconds_to_hours_mins(total_seconds_worked)
-        
-        calculation_limit_date = today if (year == today.year and month == today.month) else datetime(year, month, num_days).date()
-        total_working_days_expected = 0.0
-        
-        for day in range(1, num_days + 1):
-            current_date = datetime(year, month, day).date()
-            if current_date > calculation_limit_date:
-                continue
-                
-            is_weekend = current_date.weekday() >= 5
-            is_holiday = current_date in holiday_dates
-            is_before_joining = employee.joining_date and current_date < employee.joining_date
-            
-            if is_before_joining or is_weekend or is_holiday:
-                continue
-            
-            l_info = get_leave_for_date(current_date, leaves_list)
-            l, i_rh, i_partial, p_type = l_info
-            l_status = getattr(l, 'status', '') if l else ''
-            
-            if l and l_status in ['Approved', 'APPROVED']:
-                if i_partial: total_working_days_expected += 0.5
-                elif i_rh: total_working_days_expected += 1.0
-                # Full day leave = 0 hours expected
-            else:
-                total_working_days_expected += 1.0
         
-        total_expected_seconds = int(total_working_days_expected * default_total_time)
+        until_day = today.day if (year == today.year and month == today.month) else num_days
+        total_expected_seconds = summary.expected_seconds(until_day, default_total_time)
         total_working_hours = format_seconds_to_hms(total_expected_seconds)
         actual_working_hours_formatted = format_seconds_to_hms(total_seconds_worked)
         
@@ -676,10 +652,10 @@ class MonthlyAttendanceSerializer(serializers.Serializer):
                 "completed_working_hours": actual_working_hours_formatted,
                 "pending_working_hours": pending_working_hours,
                 "total_working_hours": total_working_hours,
-                "WORKING_DAY": working_days_count,
-                "NON_WORKING_DAY": non_working_days_count,
-                "LEAVE_DAY": leave_days_count,
-                "HALF_DAY": half_days_count,
+                "WORKING_DAY": summary.working_days,
+                "NON_WORKING_DAY": summary.non_working_days,
+                "LEAVE_DAY": summary.leave_days,
+                "HALF_DAY": summary.half_days,
                 "admin_alert": "",
                 "admin_alert_message": "",
                 "seconds_actual_working_hours": total_expected_seconds,
@@ -710,16 +686,16 @@ class WeeklyTimesheetSubmitSerializer(serializers.Serializer):
     
     def validate_date(self, value):
         """Validate date is not weekend or holiday"""
-        from holidays.models import Holiday
+        from holidays.services import CompanyCalendarService
         
         # Check if date is weekend
-        if value.weekday() >= 5:  # Saturday=5, Sunday=6
+        if CompanyCalendarService.is_weekend(value):
             raise serializers.ValidationError("Cannot submit timesheet for weekends.")
         
         # Check if date is a holiday
-        if Holiday.objects.filter(date=value, is_active=True).exists():
-            holiday = Holiday.objects.get(date=value, is_active=True)
-            raise serializers.ValidationError(f"Cannot submit timesheet for holiday: {holiday.name}")
+        holiday_name = CompanyCalendarService.holiday_name(value)
+        if holiday_name:
+            raise serializers.ValidationError(f"Cannot submit timesheet for holiday: {holiday_name}")
         
         return value
     
@@ -815,10 +791,13 @@ class WeeklyTimesheetSerializer(serializers.Serializer):
     """Serializer for weekly timesheet GET response"""
     
     @staticmethod
-    def serialize_weekly_data(attendance_records, employee, week_start_date):
-        """Create weekly attendance data structure matching API format"""
+    def serialize_weekly_data(attendance_records, employee, week_start_date, leaves_list=()):
+        """
+        Create weekly attendance data structure matching API format.
+        Days covered by an approved full-day leave are reported as LEAVE_DAY.
+        """
         from django.utils import timezone
-        from holidays.models import Holiday
+        from holidays.services import CompanyCalendarService
         from datetime import timedelta
         
         # Calculate week range (Monday to Sunday)
@@ -831,16 +810,14 @@ class WeeklyTimesheetSerializer(serializers.Serializer):
         today = timezone.now().date()
         
         # Get holidays for the week
-        week_holidays = Holiday.objects.filter(
-            date__gte=week_days[0],
-            date__lte=week_days[6],
-            is_active=True
-        ).values_list('date', 'name')
-        holiday_dates = {h[0]: h[1] for h in week_holidays}
+        holiday_dates = CompanyCalendarService.holidays_in_range(week_days[0], week_days[6])
         
         # Create attendance map
         attendance_map = {rec.date: rec for rec in attendance_records}
         
+        # Date -> leave index for the week
+        leave_index = LeaveDateIndex.build(leaves_list, week_days[0], week_days[6])
+        
         # Build attendance array for all 7 days
         attendance_array = []
         
@@ -853,11 +830,16 @@ class WeeklyTimesheetSerializer(serializers.Serializer):
             # Get attendance record if exists
             attendance = attendance_map.get(current_date)
             
+            leave, is_rh, is_partial, partial_type = leave_index.lookup(current_date)
+            is_leave_day = bool(leave) and leave.status in ['Approved', 'APPROVED'] and not is_partial and not is_rh
+            
             # Determine day type
             if is_holiday:
                 day_type = "HOLIDAY"
             elif is_weekend:
                 day_type = "WEEKEND_OFF"
+            elif is_leave_day and not attendance:
+                day_type = "LEAVE_DAY"
             elif is_future:
                 day_type = "WORKING_DAY"
             elif attendance:
@@ -944,8 +926,12 @@ class WeeklyTimesheetSerializer(serializers.Serializer):
                 "day_type": day_type,
                 "entry_type": getattr(attendance, 'entry_type', 'REGULAR') if attendance else (0 if is_future or is_holiday or is_weekend else 'REGULAR'),
                 "entry_type_display": attendance.get_entry_type_display() if attendance and hasattr(attendance, 'get_entry_type_display') else ("Regular" if is_future or is_holiday or is_weekend else "Regular"),
-                "admin_alert": getattr(attendance, 'admin_alert', 0) if attendance else (0 if is_future or is_holiday or is_weekend else 1),
-                "admin_alert_message": getattr(attendance, 'admin_alert_message', "") if attendance else ("" if is_future or is_holiday or is_weekend else ADMIN_ALERT_MESSAGE_MISSING_TIME),
+                "admin_alert": getattr(attendance, 'admin_alert', 0) if attendance else (0 if is_future or is_holiday or is_weekend or is_leave_day else 1),
+                "admin_alert_message": getattr(attendance, 'admin_alert_message', "") if attendance else ("" if is_future or is_holiday or is_weekend or is_leave_day else ADMIN_ALERT_MESSAGE_MISSING_TIME),
+                "leave_id": leave.id if leave else None,
+                "leave_type": leave.leave_type if leave else "",
+                "is_restricted_holiday": is_rh,
+                "is_partial_leave": is_partial,
             }
             
             attendance_array.append(day_record)
@@ -57,6 +57,26 @@ class AttendanceCalculationService:
             return '-'
         return ''
 
+    @staticmethod
+    def calculate_late_minutes(office_in_time, office_working_hours):
+        """
+        Minutes the office check-in is past the scheduled start ("HH:MM", local time),
+        or None when on time.
+        """
+        if not office_in_time:
+            return None
+        start = office_working_hours or getattr(settings, 'ATTENDANCE_DEFAULT_WORKING_HOURS', '09:00')
+        try:
+            hour, minute = (int(part) for part in start.split(':')[:2])
+        except ValueError:
+            hour, minute = 9, 0
+
+        local_in = timezone.localtime(office_in_time) if timezone.is_aware(office_in_time) else office_in_time
+        scheduled = local_in.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if local_in <= scheduled:
+            return None
+        return int((local_in - scheduled).total_seconds() // 60)
+
     @staticmethod
     def should_flag_admin_alert(attendance):
         if attendance.day_type in ['HOLIDAY', 'WEEKEND_OFF', 'LEAVE_DAY']:
@@ -70,10 +90,11 @@ class AttendanceCalculationService:
         return not (attendance.in_time and attendance.out_time)
 
     @staticmethod
-    def determine_day_type(attendance, today=None):
+    def determine_day_type(attendance, today=None, has_approved_leave=None):
         """
         Determines the day_type for an attendance record based on date, holidays, 
         and weekends.
+        has_approved_leave skips the leave lookup when the caller already knows it.
         """
         if not today:
             today = timezone.now().date()
@@ -96,21 +117,22 @@ class AttendanceCalculationService:
             return
 
         # Check for holidays
-        from holidays.models import Holiday
-        if Holiday.objects.filter(date=date, is_active=True).exists():
+        from holidays.services import CompanyCalendarService
+        if CompanyCalendarService.is_holiday(date):
             attendance.day_type = 'HOLIDAY'
             return
         
         # Check for leaves
-        from leaves.models import Leave
-        leave = Leave.objects.filter(
-            employee=attendance.employee,
-            from_date__lte=date,
-            to_date__gte=date,
-            status='APPROVED'
-        ).first()
+        if has_approved_leave is None:
+            from leaves.models import Leave
+            has_approved_leave = Leave.objects.filter(
+                employee=attendance.employee,
+                from_date__lte=date,
+                to_date__gte=date,
+                status=Leave.Status.APPROVED
+            ).exists()
         
-        if leave:
+        if has_approved_leave:
             attendance.day_type = 'LEAVE_DAY'
             return
 
@@ -126,3 +148,871 @@ class AttendanceCalculationService:
             attendance.day_type = 'ABSENT'
         else:
             attendance.day_type = 'WORKING_DAY'
+
+
+# Counters of AttendanceMonthSummary that come from attendance records,
+# in the order returned by AttendanceSummaryService.attendance_contribution
+ATTENDANCE_COUNTER_FIELDS = (
+    'seconds_worked', 'seconds_extra', 'seconds_to_compensate',
+    'present_records', 'half_day_records', 'late_days',
+)
+
+# Counters of AttendanceMonthSummary that come from the calendar, approved leaves
+# and the joining date
+CALENDAR_COUNTER_FIELDS = (
+    'working_days', 'non_working_days', 'leave_days', 'half_days', 'expected_day_units',
+)
+
+
+class AttendanceSummaryService:
+    """
+    Maintains AttendanceMonthSummary rows.
+
+    Attendance saves apply the difference of the record's contribution with F()
+    expressions, leave status changes and holiday edits recompute the calendar
+    counters of the affected months only, and rebuild_month() recomputes a whole
+    month in a fixed number of queries.
+    """
+
+    @staticmethod
+    def month_bounds(year, month):
+        from calendar import monthrange
+        from datetime import date
+        return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+    @staticmethod
+    def attendance_contribution(attendance):
+        """Counters a single attendance record adds to its month summary"""
+        approved = attendance.timesheet_status in (None, 'APPROVED')
+        worked = attendance.seconds_actual_worked_time if approved else 0
+        extra = attendance.seconds_extra_time if approved else 0
+        return (
+            worked,
+            extra,
+            -extra if extra < 0 else 0,
+            1 if attendance.day_type == 'WORKING_DAY' else 0,
+            1 if attendance.day_type == 'HALF_DAY' else 0,
+            1 if attendance.is_late else 0,
+        )
+
+    @staticmethod
+    def snapshot(attendance):
+        """(employee_id, year, month, contribution) of a record, used to compute deltas on save"""
+        return (
+            attendance.employee_id,
+            attendance.date.year,
+            attendance.date.month,
+            AttendanceSummaryService.attendance_contribution(attendance),
+        )
+
+    @staticmethod
+    def calendar_counters(employee, year, month, holiday_dates, leaves_list):
+        """
+        Day counters of the monthly view that do not depend on attendance records.
+        expected_day_units holds the expected work per day in half days
+        ('0', '1' or '2'), so "expected till today" is a prefix sum.
+        """
+        return AttendanceSummaryService.calendar_counters_many(
+            [employee], year, month, holiday_dates, {employee.id: leaves_list}
+        )[employee.id]
+
+    @staticmethod
+    def calendar_counters_many(employees, year, month, holiday_dates, leaves_by_employee):
+        """calendar_counters() for many employees at once, {employee_id: counters}"""
+        from leaves.services import LeaveDateIndex
+        from . import daygrid
+
+        if not employees:
+            return {}
+        grid = daygrid.MonthGrid(year, month, holiday_dates)
+        joined, leave, partial, restricted = [], [], [], []
+        for employee in employees:
+            leaves = leaves_by_employee.get(employee.id, [])
+            if not isinstance(leaves, LeaveDateIndex):
+                # The index keeps the first leave per day, so a pending or rejected
+                # leave listed first must not hide an approved one
+                leaves = [leave for leave in leaves if leave.status in ['Approved', 'APPROVED']]
+            leave_index = LeaveDateIndex.build(leaves, grid.start, grid.end)
+            leave_days, partial_days, rh_days = [], [], []
+            for day, day_leave in leave_index.items():
+                if day_leave.status not in ['Approved', 'APPROVED']:
+                    continue
+                _, is_rh, is_partial, _ = leave_index.lookup(day)
+                leave_days.append(day)
+                if is_partial:
+                    partial_days.append(day)
+                if is_rh:
+                    rh_days.append(day)
+            joined.append(grid.joined(employee.joining_date))
+            leave.append(grid.mask(leave_days))
+            partial.append(grid.mask(partial_days))
+            restricted.append(grid.mask(rh_days))
+
+        # No worked flags: every working day without a leave classifies as ABSENT (= expected work)
+        codes = daygrid.classify(grid, grid.matrix(joined), leave=grid.matrix(leave), partial=grid.matrix(partial))
+        units = daygrid.expected_units(codes, grid.matrix(restricted))
+        result = {}
+        for employee, day_counts, day_units in zip(employees, daygrid.counts(codes), units):
+            result[employee.id] = {
+                'working_days': day_counts[daygrid.ABSENT] + day_counts[daygrid.PARTIAL_LEAVE],
+                'non_working_days': day_counts[daygrid.BEFORE_JOINING] + day_counts[daygrid.NON_WORKING],
+                'leave_days': day_counts[daygrid.LEAVE],
+                'half_days': day_counts[daygrid.PARTIAL_LEAVE],
+                'expected_day_units': ''.join(str(unit) for unit in day_units),
+            }
+        return result
+
+    @staticmethod
+    def _approved_leaves(employee_ids, start_date, end_date):
+        """Approved leaves overlapping the range, grouped per employee id"""
+        from collections import defaultdict
+        from leaves.models import Leave
+
+        leaves_by_employee = defaultdict(list)
+        for leave in Leave.objects.filter(
+            employee_id__in=employee_ids,
+            status=Leave.Status.APPROVED,
+            from_date__lte=end_date,
+            to_date__gte=start_date
+        ).order_by('from_date'):
+            leaves_by_employee[leave.employee_id].append(leave)
+        return leaves_by_employee
+
+    @staticmethod
+    def _attendance_counters(employee_ids, start_date, end_date):
+        """Attendance counters per employee id, aggregated in SQL"""
+        from django.db.models import Count, F, Q, Sum
+        from .models import Attendance
+
+        approved = Q(timesheet_status='APPROVED')
+        rows = Attendance.objects.filter(
+            employee_id__in=employee_ids,
+            date__gte=start_date,
+            date__lte=end_date
+        ).order_by().values('employee_id').annotate(
+            seconds_worked=Sum('seconds_actual_worked_time', filter=approved),
+            seconds_extra=Sum('seconds_extra_time', filter=approved),
+            seconds_to_compensate=Sum(F('seconds_extra_time') * -1, filter=approved & Q(seconds_extra_time__lt=0)),
+            present_records=Count('id', filter=Q(day_type='WORKING_DAY')),
+            half_day_records=Count('id', filter=Q(day_type='HALF_DAY')),
+            late_days=Count('id', filter=Q(is_late=True)),
+        )
+        return {
+            row['employee_id']: {field: row[field] or 0 for field in ATTENDANCE_COUNTER_FIELDS}
+            for row in rows
+        }
+
+    @staticmethod
+    def _sum_contributions(attendance_records):
+        totals = [0] * len(ATTENDANCE_COUNTER_FIELDS)
+        for record in attendance_records:
+            for i, value in enumerate(AttendanceSummaryService.attendance_contribution(record)):
+                totals[i] += value
+        return dict(zip(ATTENDANCE_COUNTER_FIELDS, totals))
+
+    @staticmethod
+    def build(employee, year, month, holiday_dates, approved_leaves, attendance_counters):
+        """Unsaved AttendanceMonthSummary from already fetched inputs"""
+        from .models import AttendanceMonthSummary
+
+        return AttendanceMonthSummary(
+            employee=employee,
+            year=year,
+            month=month,
+            **AttendanceSummaryService.calendar_counters(employee, year, month, holiday_dates, approved_leaves),
+            **attendance_counters
+        )
+
+    @staticmethod
+    def refresh(employee, year, month):
+        """Recompute one employee-month from scratch and store it"""
+        from holidays.services import CompanyCalendarService
+        from .models import AttendanceMonthSummary
+
+        start_date, end_date = AttendanceSummaryService.month_bounds(year, month)
+        summary = AttendanceSummaryService.build(
+            employee, year, month,
+            CompanyCalendarService.holidays_in_range(start_date, end_date),
+            AttendanceSummaryService._approved_leaves([employee.id], start_date, end_date)[employee.id],
+            AttendanceSummaryService._attendance_counters([employee.id], start_date, end_date).get(
+                employee.id, dict.fromkeys(ATTENDANCE_COUNTER_FIELDS, 0)
+            ),
+        )
+        defaults = {
+            field: getattr(summary, field)
+            for field in CALENDAR_COUNTER_FIELDS + ATTENDANCE_COUNTER_FIELDS
+        }
+        summary, _ = AttendanceMonthSummary.objects.update_or_create(
+            employee=employee, year=year, month=month, defaults=defaults
+        )
+        return summary
+
+    @staticmethod
+    def refresh_calendar(employee, year, month):
+        """Recompute the calendar counters of one employee-month (leave status changes)"""
+        from holidays.services import CompanyCalendarService
+        from .models import AttendanceMonthSummary
+
+        start_date, end_date = AttendanceSummaryService.month_bounds(year, month)
+        counters = AttendanceSummaryService.calendar_counters(
+            employee, year, month,
+            CompanyCalendarService.holidays_in_range(start_date, end_date),
+            AttendanceSummaryService._approved_leaves([employee.id], start_date, end_date)[employee.id],
+        )
+        updated = AttendanceMonthSummary.objects.filter(
+            employee=employee, year=year, month=month
+        ).update(updated_at=timezone.now(), **counters)
+        if not updated:
+            AttendanceSummaryService.refresh(employee, year, month)
+
+    @staticmethod
+    def record_saved(attendance, previous):
+        """
+        Apply an attendance save to the month summary.
+        previous is the snapshot taken when the record was loaded,
+        None for new records, or False when it is unknown.
+        """
+        current = AttendanceSummaryService.snapshot(attendance)
+        if previous is False:
+            AttendanceSummaryService.refresh(attendance.employee, current[1], current[2])
+            return
+
+        if previous is None:
+            AttendanceSummaryService._apply_delta(attendance, current)
+        elif previous[:3] == current[:3]:
+            delta = tuple(new - old for new, old in zip(current[3], previous[3]))
+            AttendanceSummaryService._apply_delta(attendance, current[:3] + (delta,))
+        else:
+            AttendanceSummaryService.record_deleted(attendance, previous)
+            AttendanceSummaryService._apply_delta(attendance, current)
+
+    @staticmethod
+    def record_deleted(attendance, previous=None):
+        """Remove a record's contribution from its month summary"""
+        employee_id, year, month, contribution = previous or AttendanceSummaryService.snapshot(attendance)
+        AttendanceSummaryService._apply_delta(
+            attendance, (employee_id, year, month, tuple(-value for value in contribution)), create_missing=False
+        )
+
+    @staticmethod
+    def _apply_delta(attendance, change, create_missing=True):
+        from django.db.models import F
+        from .models import AttendanceMonthSummary
+
+        employee_id, year, month, delta = change
+        changes = {
+            field: F(field) + value
+            for field, value in zip(ATTENDANCE_COUNTER_FIELDS, delta) if value
+        }
+        if not changes:
+            return
+        updated = AttendanceMonthSummary.objects.filter(
+            employee_id=employee_id, year=year, month=month
+        ).update(updated_at=timezone.now(), **changes)
+        if not updated and create_missing:
+            # First write of the month: build the full row, it already includes this record
+            AttendanceSummaryService.refresh(attendance.employee, year, month)
+
+    @staticmethod
+    def get_summary(employee, year, month):
+        """Stored summary of one employee-month, built on first access"""
+        from .models import AttendanceMonthSummary
+
+        summary = AttendanceMonthSummary.objects.filter(employee=employee, year=year, month=month).first()
+        return summary or AttendanceSummaryService.refresh(employee, year, month)
+
+    @staticmethod
+    def summaries_for_month(employees, year, month, holiday_dates, leaves_by_employee, attendance_by_employee):
+        """
+        Stored summaries for many employees, {employee_id: summary}.
+        Missing rows are built from the inputs the caller already fetched and
+        bulk inserted, so this costs at most two queries.
+        """
+        from .models import AttendanceMonthSummary
+
+        summaries = {
+            s.employee_id: s for s in AttendanceMonthSummary.objects.filter(
+                employee_id__in=[e.id for e in employees], year=year, month=month
+            )
+        }
+        missing_employees = [employee for employee in employees if employee.id not in summaries]
+        calendar_counters = AttendanceSummaryService.calendar_counters_many(
+            missing_employees, year, month, holiday_dates, leaves_by_employee
+        )
+        missing = []
+        for employee in missing_employees:
+            summary = AttendanceMonthSummary(
+                employee=employee,
+                year=year,
+                month=month,
+                **calendar_counters[employee.id],
+                **AttendanceSummaryService._sum_contributions(attendance_by_employee.get(employee.id, []))
+            )
+            summaries[employee.id] = summary
+            missing.append(summary)
+        if missing:
+            AttendanceMonthSummary.objects.bulk_create(missing, ignore_conflicts=True)
+        return summaries
+
+    @staticmethod
+    def rebuild_month(year, month, employee_ids=None, calendar_only=False):
+        """
+        Recompute the summaries of a month in a fixed number of queries.
+        employee_ids=None covers active employees plus anyone with attendance
+        that month; calendar_only keeps the attendance counters as stored.
+        Returns the number of rows written.
+        """
+        from django.db import transaction
+        from django.db.models import Q
+        from employees.models import Employee
+        from holidays.services import CompanyCalendarService
+        from .models import Attendance, AttendanceMonthSummary
+
+        start_date, end_date = AttendanceSummaryService.month_bounds(year, month)
+        employees = Employee.objects.all()
+        if employee_ids is None:
+            employees = employees.filter(
+                Q(is_active=True) |
+                Q(id__in=Attendance.objects.filter(date__gte=start_date, date__lte=end_date).values('employee_id'))
+            ).filter(Q(joining_date__isnull=True) | Q(joining_date__lte=end_date))
+        else:
+            employees = employees.filter(id__in=employee_ids)
+        employees = list(employees.only('id', 'joining_date'))
+        ids = [e.id for e in employees]
+
+        holiday_dates = CompanyCalendarService.holidays_in_range(start_date, end_date)
+        leaves_by_employee = AttendanceSummaryService._approved_leaves(ids, start_date, end_date)
+        attendance_counters = {} if calendar_only else AttendanceSummaryService._attendance_counters(
+            ids, start_date, end_date
+        )
+        empty_counters = dict.fromkeys(ATTENDANCE_COUNTER_FIELDS, 0)
+
+        with transaction.atomic():
+            existing = {
+                s.employee_id: s for s in AttendanceMonthSummary.objects.select_for_update().filter(
+                    employee_id__in=ids, year=year, month=month
+                )
+            }
+            to_create, to_update = [], []
+            calendar_counters = AttendanceSummaryService.calendar_counters_many(
+                employees, year, month, holiday_dates, leaves_by_employee
+            )
+            for employee in employees:
+                counters = calendar_counters[employee.id]
+                if not calendar_only:
+                    counters.update(attendance_counters.get(employee.id, empty_counters))
+                summary = existing.get(employee.id)
+                if summary is None:
+                    if calendar_only:
+                        counters.update(attendance_counters.get(employee.id, empty_counters))
+                    to_create.append(AttendanceMonthSummary(employee=employee, year=year, month=month, **counters))
+                    continue
+                for field, value in counters.items():
+                    setattr(summary, field, value)
+                summary.updated_at = timezone.now()
+                to_update.append(summary)
+
+            fields = list(CALENDAR_COUNTER_FIELDS) + ['updated_at']
+            if not calendar_only:
+                fields += list(ATTENDANCE_COUNTER_FIELDS)
+            if to_update:
+                AttendanceMonthSummary.objects.bulk_update(to_update, fields, batch_size=500)
+            if to_create:
+                AttendanceMonthSummary.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+        return len(to_update) + len(to_create)
+
+
+class AttendanceFingerprintService:
+    """
+    Validators for conditional GET on the monthly and weekly attendance views.
+
+    The stamp combines the newest updated_at and the row count of everything the
+    response is built from (the employee's attendance and leaves in the range,
+    holidays in the range, the employee row itself) plus today's date, because
+    FUTURE_DAY/ABSENT depend on it. Counts catch deletes, which do not move
+    updated_at. Everything comes from a single query of correlated subqueries.
+    """
+
+    @staticmethod
+    def _aggregate(queryset, function, field):
+        from django.db.models import F, Func, Subquery
+        return Subquery(
+            queryset.order_by().annotate(value=Func(F(field), function=function)).values('value')[:1]
+        )
+
+    @staticmethod
+    def fingerprint(employee, start_date, end_date, today):
+        """Return (etag, last_modified) for one employee and date range"""
+        import hashlib
+        from employees.models import Employee
+        from holidays.models import Holiday
+        from leaves.models import Leave
+        from .models import Attendance
+
+        aggregate = AttendanceFingerprintService._aggregate
+        attendance = Attendance.objects.filter(employee_id=employee.id, date__gte=start_date, date__lte=end_date)
+        leaves = Leave.objects.filter(employee_id=employee.id, from_date__lte=end_date, to_date__gte=start_date)
+        holidays = Holiday.objects.filter(date__gte=start_date, date__lte=end_date)
+
+        stamps = Employee.objects.filter(pk=employee.pk).annotate(
+            attendance_updated=aggregate(attendance, 'MAX', 'updated_at'),
+            attendance_count=aggregate(attendance, 'COUNT', 'id'),
+            leave_updated=aggregate(leaves, 'MAX', 'updated_at'),
+            leave_count=aggregate(leaves, 'COUNT', 'id'),
+            holiday_updated=aggregate(holidays, 'MAX', 'updated_at'),
+            holiday_count=aggregate(holidays, 'COUNT', 'id'),
+        ).values(
+            'updated_at', 'attendance_updated', 'attendance_count',
+            'leave_updated', 'leave_count', 'holiday_updated', 'holiday_count',
+        ).first() or {}
+
+        settings_stamp = (
+            getattr(settings, 'ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS', 32400),
+            getattr(settings, 'ATTENDANCE_DEFAULT_WORKING_HOURS', '09:00'),
+        )
+        raw = '|'.join(
+            str(value) for value in (employee.pk, start_date, end_date, today, settings_stamp, sorted(stamps.items()))
+        )
+        etag = '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+        last_modified = max(
+            (
+                stamps.get(field) for field in ('updated_at', 'attendance_updated', 'leave_updated', 'holiday_updated')
+                if hasattr(stamps.get(field), 'timestamp')
+            ),
+            default=None
+        )
+        return etag, last_modified
+
+
+class AttendanceRecalculationService:
+    """
+    Recomputes derived attendance fields in bulk.
+
+    Rows are streamed in primary key order, recalculated in memory with
+    AttendanceCalculationService and written back with bulk_update, so no
+    full_clean, save() or post_save signal (and no Slack message) runs.
+    The month summaries of the employees a chunk changed are rebuilt in the
+    same transaction, so an interrupted run leaves them consistent with the
+    committed rows.
+    """
+
+    UPDATE_FIELDS = [
+        'office_seconds_worked', 'home_seconds_worked', 'in_time', 'out_time',
+        'seconds_actual_worked_time', 'seconds_actual_working_time', 'office_time_inside',
+        'seconds_extra_time', 'extra_time_status', 'admin_alert', 'admin_alert_message',
+        'day_type', 'orignal_total_time', 'is_late', 'late_minutes',
+    ]
+
+    @staticmethod
+    def queryset(start_date=None, end_date=None, company_id=None):
+        from .models import Attendance
+
+        queryset = Attendance.objects.all()
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        if company_id:
+            queryset = queryset.filter(employee__company_id=company_id)
+        return queryset
+
+    @staticmethod
+    def iter_chunks(queryset, chunk_size=500, after_pk=0):
+        """Yield lists of records ordered by pk, resuming after `after_pk`"""
+        while True:
+            chunk = list(
+                queryset.filter(pk__gt=after_pk).select_related('employee').order_by('pk')[:chunk_size]
+            )
+            if not chunk:
+                return
+            yield chunk
+            after_pk = chunk[-1].pk
+
+    @staticmethod
+    def _approved_leave_ranges(records):
+        """{employee_id: [(from_date, to_date), ...]} of approved leaves overlapping the records"""
+        from collections import defaultdict
+        from leaves.models import Leave
+
+        ranges = defaultdict(list)
+        if not records:
+            return ranges
+        rows = Leave.objects.filter(
+            employee_id__in={r.employee_id for r in records},
+            status=Leave.Status.APPROVED,
+            from_date__lte=max(r.date for r in records),
+            to_date__gte=min(r.date for r in records)
+        ).values_list('employee_id', 'from_date', 'to_date')
+        for employee_id, from_date, to_date in rows:
+            ranges[employee_id].append((from_date, to_date))
+        return ranges
+
+    @staticmethod
+    def recalculate_chunk(records, today, total_time=None):
+        """
+        Recalculate records in memory and bulk_update the ones that changed.
+        total_time, when given, replaces the stored scheduled seconds per day.
+        Returns the changed records.
+        """
+        from .models import Attendance
+
+        fields = AttendanceRecalculationService.UPDATE_FIELDS
+        leave_ranges = AttendanceRecalculationService._approved_leave_ranges(records)
+        now = timezone.now()
+
+        changed = []
+        for record in records:
+            before = tuple(getattr(record, field) for field in fields)
+            if total_time is not None:
+                record.orignal_total_time = total_time
+            # Same order as the views: derive times, classify the day, then
+            # recompute the admin alert for the new day type
+            record.apply_calculations()
+            AttendanceCalculationService.determine_day_type(
+                record, today=today,
+                has_approved_leave=any(
+                    start <= record.date <= end for start, end in leave_ranges.get(record.employee_id, ())
+                )
+            )
+            record.apply_calculations()
+            if tuple(getattr(record, field) for field in fields) != before:
+                record.updated_at = now
+                changed.append(record)
+
+        if changed:
+            Attendance.objects.bulk_update(changed, fields + ['updated_at'])
+        return changed
+
+    @staticmethod
+    def run(start_date=None, end_date=None, company_id=None, chunk_size=500, after_pk=0,
+            total_time=None, progress=None):
+        """
+        Recalculate every matching record.
+        progress(processed, updated, last_pk) is called after each committed chunk;
+        pass last_pk back as after_pk to resume an interrupted run.
+        """
+        from collections import defaultdict
+        from django.db import transaction
+
+        today = timezone.now().date()
+        queryset = AttendanceRecalculationService.queryset(start_date, end_date, company_id)
+        touched = defaultdict(set)
+        processed = updated = 0
+
+        for chunk in AttendanceRecalculationService.iter_chunks(queryset, chunk_size, after_pk):
+            with transaction.atomic():
+                changed = AttendanceRecalculationService.recalculate_chunk(chunk, today, total_time)
+                chunk_touched = defaultdict(set)
+                for record in changed:
+                    chunk_touched[(record.date.year, record.date.month)].add(record.employee_id)
+                for (year, month), employee_ids in sorted(chunk_touched.items()):
+                    AttendanceSummaryService.rebuild_month(year, month, employee_ids=employee_ids)
+            for key, employee_ids in chunk_touched.items():
+                touched[key] |= employee_ids
+            processed += len(chunk)
+            updated += len(changed)
+            if progress:
+                progress(processed, updated, chunk[-1].pk)
+
+        return {'processed': processed, 'updated': updated, 'months': len(touched)}
+
+
+class AttendanceExportService:
+    """
+    Streams attendance rows for exports.
+
+    Rows are read with values_list in keyset-paginated chunks ordered by
+    (date, id), so memory stays flat for any range. (MySQL/TiDB buffer a whole
+    result on the client even with .iterator(), so each chunk is its own query.)
+    """
+
+    COLUMNS = [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('employee_code', 'employee__employee_id'),
+        ('first_name', 'employee__first_name'),
+        ('last_name', 'employee__last_name'),
+        ('department', 'employee__department__name'),
+        ('company_id', 'employee__company_id'),
+        ('day_type', 'day_type'),
+        ('entry_type', 'entry_type'),
+        ('timesheet_status', 'timesheet_status'),
+        ('office_in_time', 'office_in_time'),
+        ('office_out_time', 'office_out_time'),
+        ('home_in_time', 'home_in_time'),
+        ('home_out_time', 'home_out_time'),
+        ('office_seconds_worked', 'office_seconds_worked'),
+        ('home_seconds_worked', 'home_seconds_worked'),
+        ('seconds_actual_worked_time', 'seconds_actual_worked_time'),
+        ('orignal_total_time', 'orignal_total_time'),
+        ('seconds_extra_time', 'seconds_extra_time'),
+        ('extra_time_status', 'extra_time_status'),
+        ('admin_alert', 'admin_alert'),
+    ]
+
+    FORMATS = ('csv', 'jsonl')
+
+    @staticmethod
+    def rows(start_date, end_date, company_id=None, department_id=None, chunk_size=2000):
+        """Yield one tuple per attendance row, in COLUMNS order"""
+        from django.db.models import Q
+        from .models import Attendance
+
+        queryset = Attendance.objects.filter(date__gte=start_date, date__lte=end_date)
+        if company_id:
+            queryset = queryset.filter(employee__company_id=company_id)
+        if department_id:
+            queryset = queryset.filter(employee__department_id=department_id)
+        fields = [lookup for _, lookup in AttendanceExportService.COLUMNS]
+
+        last = None
+        while True:
+            chunk = queryset
+            if last is not None:
+                chunk = chunk.filter(Q(date__gt=last[1]) | Q(date=last[1], id__gt=last[0]))
+            chunk = list(chunk.order_by('date', 'id').values_list(*fields)[:chunk_size])
+            if not chunk:
+                return
+            yield from chunk
+            last = chunk[-1]
+
+    @staticmethod
+    def _text(value):
+        if value is None:
+            return ''
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def iter_csv(rows):
+        """Yield CSV lines (header first)"""
+        import csv
+
+        class Echo:
+            """File-like object whose write() returns the line instead of storing it"""
+            def write(self, value):
+                return value
+
+        writer = csv.writer(Echo())
+        yield writer.writerow([name for name, _ in AttendanceExportService.COLUMNS])
+        for row in rows:
+            yield writer.writerow([AttendanceExportService._text(value) for value in row])
+
+    @staticmethod
+    def iter_jsonl(rows):
+        """Yield one JSON object per line"""
+        import json
+
+        names = [name for name, _ in AttendanceExportService.COLUMNS]
+        for row in rows:
+            yield json.dumps(dict(zip(names, row)), default=AttendanceExportService._text) + '\n'
+
+    @staticmethod
+    def stream(export_format, rows):
+        if export_format == 'jsonl':
+            return AttendanceExportService.iter_jsonl(rows)
+        return AttendanceExportService.iter_csv(rows)
+
+
+class AttendancePunchIngestionService:
+    """
+    Folds raw in/out punches (turnstiles, biometric readers) into Attendance rows.
+
+    Employees are resolved in one query, punches are grouped per employee-day,
+    the earliest IN and latest OUT per location are merged with the stored times,
+    and the rows are written with bulk_create/bulk_update in one transaction.
+    save() and its signals do not run; month summaries are rebuilt at the end.
+    Only the punched (employee, date) rows are locked; if a concurrent request
+    inserts one of them first, the batch is run once more and merges it.
+    """
+
+    LOCATIONS = ('OFFICE', 'HOME')
+    DIRECTIONS = ('IN', 'OUT')
+    CSV_COLUMNS = ('employee_id', 'timestamp', 'location', 'direction')
+
+    @staticmethod
+    def parse_csv(text):
+        """Punch dicts from CSV text with an employee_id,timestamp,location,direction header"""
+        import csv
+        import io
+        return list(csv.DictReader(io.StringIO(text)))
+
+    @staticmethod
+    def _parse_punch(punch):
+        """Return (employee_code, aware timestamp, location, direction) or raise ValueError"""
+        from django.utils.dateparse import parse_datetime
+
+        if not isinstance(punch, dict):
+            raise ValueError("Punch must be an object")
+        code = str(punch.get('employee_id') or '').strip()
+        if not code:
+            raise ValueError("employee_id is required")
+        raw_timestamp = str(punch.get('timestamp') or '').strip()
+        timestamp = parse_datetime(raw_timestamp) if raw_timestamp else None
+        if timestamp is None:
+            raise ValueError(f"Invalid timestamp: {raw_timestamp!r}")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp, timezone.get_current_timezone())
+        location = str(punch.get('location') or 'OFFICE').strip().upper()
+        if location not in AttendancePunchIngestionService.LOCATIONS:
+            raise ValueError(f"location must be one of {', '.join(AttendancePunchIngestionService.LOCATIONS)}")
+        direction = str(punch.get('direction') or '').strip().upper()
+        if direction not in AttendancePunchIngestionService.DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(AttendancePunchIngestionService.DIRECTIONS)}")
+        return code, timestamp, location, direction
+
+    @staticmethod
+    def ingest(punches, user=None):
+        """
+        Ingest a list of punch dicts.
+        Returns {"created", "updated", "failed", "results"} where results holds
+        one {"row", "status", ...} entry per input punch, in input order.
+        """
+        from collections import defaultdict
+        from django.db import IntegrityError
+        from employees.models import Employee
+
+        results = [None] * len(punches)
+        parsed = []
+        for row, punch in enumerate(punches):
+            try:
+                parsed.append((row,) + AttendancePunchIngestionService._parse_punch(punch))
+            except ValueError as e:
+                results[row] = {"row": row, "status": "error", "message": str(e)}
+
+        # 1. Employees in one query
+        employees = {
+            e.employee_id: e for e in Employee.objects.filter(employee_id__in={p[1] for p in parsed})
+        }
+
+        # 2. Fold punches per employee-day: earliest IN, latest OUT per location
+        groups = defaultdict(lambda: {'rows': [], 'times': {}})
+        for row, code, timestamp, location, direction in parsed:
+            employee = employees.get(code)
+            if employee is None:
+                results[row] = {"row": row, "status": "error", "message": f"Unknown employee_id: {code}"}
+                continue
+            group = groups[(employee.id, timezone.localtime(timestamp).date())]
+            group['employee'] = employee
+            group['rows'].append(row)
+            field = f"{location.lower()}_{direction.lower()}_time"
+            current = group['times'].get(field)
+            if current is None or (timestamp < current if direction == 'IN' else timestamp > current):
+                group['times'][field] = timestamp
+
+        for attempt in range(2):
+            try:
+                created, updated = AttendancePunchIngestionService._write(groups, user, results)
+                break
+            except IntegrityError:
+                # Another request inserted one of these employee-days after they
+                # were read; run again so it is locked and merged as an existing row
+                if attempt:
+                    raise
+
+        return {
+            "created": created,
+            "updated": updated,
+            "failed": sum(1 for r in results if r["status"] == "error"),
+            "results": results,
+        }
+
+    @staticmethod
+    def _write(groups, user, results):
+        """
+        Merge folded punches into Attendance rows in one transaction and fill
+        `results` for their input rows; returns (created, updated).
+        """
+        from collections import defaultdict
+        from functools import reduce
+        from operator import or_
+        from django.core.exceptions import ValidationError
+        from django.db import transaction
+        from django.db.models import Q
+        from .models import Attendance
+
+        today = timezone.now().date()
+        fields = AttendanceRecalculationService.UPDATE_FIELDS + [
+            'office_in_time', 'office_out_time', 'home_in_time', 'home_out_time', 'updated_by', 'updated_at',
+        ]
+        touched = defaultdict(set)
+        dates_by_employee = defaultdict(set)
+        for employee_id, day in groups:
+            dates_by_employee[employee_id].add(day)
+
+        with transaction.atomic():
+            # 3. Existing rows for exactly the punched employee-days, locked
+            existing = {}
+            if dates_by_employee:
+                pairs = reduce(or_, (
+                    Q(employee_id=employee_id, date__in=dates) for employee_id, dates in dates_by_employee.items()
+                ))
+                existing = {
+                    (a.employee_id, a.date): a
+                    for a in Attendance.objects.select_for_update().filter(pairs).select_related('employee')
+                }
+
+            to_create, to_update, records = [], [], []
+            for key, group in groups.items():
+                record = existing.get(key)
+                if record is None:
+                    record = Attendance(
+                        employee=group['employee'],
+                        date=key[1],
+                        office_working_hours=getattr(settings, 'ATTENDANCE_DEFAULT_WORKING_HOURS', '09:00'),
+                        orignal_total_time=getattr(settings, 'ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS', 32400),
+                        timesheet_status='APPROVED',
+                        timesheet_approved_by=user,
+                        timesheet_approved_at=timezone.now() if user else None,
+                        created_by=user,
+                        updated_by=user,
+                    )
+                for field, timestamp in group['times'].items():
+                    stored = getattr(record, field)
+                    if stored is None or (timestamp < stored if field.endswith('_in_time') else timestamp > stored):
+                        setattr(record, field, timestamp)
+                if user is not None:
+                    record.updated_by = user
+                records.append((key, group, record))
+
+            leave_ranges = AttendanceRecalculationService._approved_leave_ranges([r for _, _, r in records])
+            now = timezone.now()
+            for key, group, record in records:
+                record.apply_calculations()
+                AttendanceCalculationService.determine_day_type(
+                    record, today=today,
+                    has_approved_leave=any(
+                        start <= record.date <= end for start, end in leave_ranges.get(record.employee_id, ())
+                    )
+                )
+                record.apply_calculations()
+                # Validated after the calculations, so the derived in/out times are current
+                try:
+                    record.clean()
+                except ValidationError as e:
+                    for row in group['rows']:
+                        results[row] = {"row": row, "status": "error", "message": "; ".join(e.messages)}
+                    continue
+
+                record.updated_at = now
+                (to_update if record.pk else to_create).append(record)
+                touched[(record.date.year, record.date.month)].add(record.employee_id)
+                for row in group['rows']:
+                    results[row] = {
+                        "row": row,
+                        "status": "updated" if record.pk else "created",
+                        "employee_id": group['employee'].employee_id,
+                        "date": str(record.date),
+                    }
+
+            if to_create:
+                Attendance.objects.bulk_create(to_create, batch_size=500)
+            if to_update:
+                Attendance.objects.bulk_update(to_update, fields, batch_size=500)
+
+            for (year, month), employee_ids in sorted(touched.items()):
+                AttendanceSummaryService.rebuild_month(year, month, employee_ids=employee_ids)
+
+        return len(to_create), len(to_update)
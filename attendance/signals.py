@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from holidays.models import Holiday
+from leaves.models import Leave
+from .models import Attendance, AttendanceMonthSummary
+from .services import AttendanceSummaryService
+
+
+def _months_between(start_date, end_date):
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+@receiver(post_save, sender=Attendance)
+def apply_attendance_to_summary(sender, instance, created, raw=False, **kwargs):
+    """
+    Apply the difference of a saved record to its month summary.
+    Connected before the notifications app, so its handlers read updated counters.
+    """
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_summary_snapshot', False)
+    AttendanceSummaryService.record_saved(instance, previous)
+    instance._summary_snapshot = AttendanceSummaryService.snapshot(instance)
+
+
+@receiver(post_delete, sender=Attendance)
+def remove_attendance_from_summary(sender, instance, **kwargs):
+    """Subtract a deleted record from its month summary"""
+    AttendanceSummaryService.record_deleted(instance, getattr(instance, '_summary_snapshot', None))
+
+
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+def refresh_summary_on_leave_change(sender, instance, **kwargs):
+    """
+    Recompute the calendar counters of the months a leave covers, and of the
+    months it covered when loaded if its dates were edited.
+    Pending leaves never count, so only decided (or deleted approved) leaves trigger it.
+    """
+    previous = getattr(instance, '_loaded_dates', (None, None))
+    instance._loaded_dates = (instance.from_date, instance.to_date)
+    deleted = 'created' not in kwargs
+    if instance.status == Leave.Status.PENDING or (deleted and instance.status != Leave.Status.APPROVED):
+        return
+    months = set()
+    for start_date, end_date in (previous, instance._loaded_dates):
+        if start_date and end_date:
+            months.update(_months_between(start_date, end_date))
+    for year, month in sorted(months):
+        AttendanceSummaryService.refresh_calendar(instance.employee, year, month)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def refresh_summaries_on_holiday_change(sender, instance, **kwargs):
+    """
+    Recompute the calendar counters of every stored summary in the holiday's
+    month, and in its month as loaded if the holiday was moved.
+    Runs on commit, after the calendar index has been invalidated.
+    """
+    previous = getattr(instance, '_loaded_date', None)
+    instance._loaded_date = instance.date
+    months = {(day.year, day.month) for day in (previous, instance.date) if day}
+
+    def rebuild():
+        for year, month in sorted(months):
+            employee_ids = list(
+                AttendanceMonthSummary.objects.filter(year=year, month=month).values_list('employee_id', flat=True)
+            )
+            if employee_ids:
+                AttendanceSummaryService.rebuild_month(year, month, employee_ids=employee_ids, calendar_only=True)
+
+    transaction.on_commit(rebuild)
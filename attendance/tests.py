@@ -0,0 +1,727 @@
+from datetime import date, datetime, time
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from auth_app.models import User
+from departments.models import Department, Designation
+from employees.models import Employee
+from holidays.models import Holiday
+from holidays.services import CompanyCalendarService
+from leaves.models import Leave
+from . import daygrid
+from .models import Attendance, AttendanceMonthSummary
+
+
+class MonthlyGridTest(TestCase):
+    """Test cases for the org-wide monthly attendance grid"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        self.department = Department.objects.create(name="Engineering", code="ENG")
+        self.designation = Designation.objects.create(name="Developer", department=self.department)
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password="pass", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        Holiday.objects.create(name="Test Holiday", date=date(2025, 12, 25))
+
+    def create_employee(self, index):
+        """Create an employee with one office day in December 2025"""
+        employee = Employee.objects.create(
+            employee_id=f"EMP-T{index:03d}",
+            first_name=f"Emp{index}",
+            last_name="Test",
+            email=f"emp{index}@example.com",
+            phone="+919999999999",
+            department=self.department,
+            designation=self.designation,
+            joining_date=date(2025, 1, 1),
+        )
+        Attendance.objects.create(
+            employee=employee,
+            date=date(2025, 12, 1),
+            office_in_time=timezone.make_aware(datetime.combine(date(2025, 12, 1), time(9, 0))),
+            office_out_time=timezone.make_aware(datetime.combine(date(2025, 12, 1), time(18, 0))),
+        )
+        return employee
+
+    def count_grid_queries(self):
+        """Return the number of queries issued by one grid request"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        CompanyCalendarService.invalidate()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/attendance/monthly-grid/', {'month': 12, 'year': 2025})
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.data["data"]
+
+    def test_grid_returns_every_employee(self):
+        """Test the grid contains one row per employee with per-day records"""
+        self.create_employee(1)
+        self.create_employee(2)
+        _, data = self.count_grid_queries()
+        self.assertEqual(data["total_employees"], 2)
+        row = data["employees"][0]
+        self.assertEqual(len(row["attendance"]), 31)
+        self.assertEqual(row["attendance"][24]["day_type"], "NON_WORKING_DAY")
+        self.assertEqual(row["attendance"][0]["day_type"], "WORKING_DAY")
+
+    def test_grid_matches_monthly_view_for_pending_leave(self):
+        """Test a pending leave shows the same way in the grid and the monthly view"""
+        employee = self.create_employee(1)
+        Leave.objects.create(
+            employee=employee, from_date=date(2025, 12, 3), to_date=date(2025, 12, 3), reason="Errand"
+        )
+        _, data = self.count_grid_queries()
+        response = self.client.get(
+            '/api/attendance/monthly/', {'month': 12, 'year': 2025, 'userid': employee.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        monthly_day = response.data["data"]["attendance"][2]
+        grid_day = data["employees"][0]["attendance"][2]
+        self.assertIsNotNone(monthly_day["leave_id"])
+        self.assertEqual(grid_day["leave_id"], monthly_day["leave_id"])
+        self.assertEqual(grid_day["day_text"], monthly_day["day_text"])
+
+    def test_query_count_is_constant(self):
+        """Test the query count does not grow with headcount"""
+        self.create_employee(1)
+        small_count, _ = self.count_grid_queries()
+        for index in range(2, 6):
+            self.create_employee(index)
+        large_count, data = self.count_grid_queries()
+        self.assertEqual(data["total_employees"], 5)
+        self.assertEqual(small_count, large_count)
+
+
+class AttendanceMonthSummaryTest(TestCase):
+    """Test cases for the materialized monthly attendance summary"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        self.department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=self.department)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-S001",
+            first_name="Summary",
+            last_name="Test",
+            email="summary@example.com",
+            phone="+919999999999",
+            department=self.department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+
+    def add_attendance(self, day, hours):
+        """Create an approved office day of `hours` hours in December 2025"""
+        return Attendance.objects.create(
+            employee=self.employee,
+            date=date(2025, 12, day),
+            office_in_time=timezone.make_aware(datetime.combine(date(2025, 12, day), time(9, 0))),
+            office_out_time=timezone.make_aware(datetime.combine(date(2025, 12, day), time(9 + hours, 0))),
+        )
+
+    def summary(self):
+        return AttendanceMonthSummary.objects.get(employee=self.employee, year=2025, month=12)
+
+    def test_attendance_changes_are_applied_incrementally(self):
+        """Test create, update and delete adjust the stored counters"""
+        first = self.add_attendance(1, 9)
+        self.add_attendance(2, 8)
+        summary = self.summary()
+        self.assertEqual(summary.seconds_worked, 17 * 3600)
+        self.assertEqual(summary.seconds_to_compensate, 3600)
+        self.assertEqual(summary.present_records, 2)
+        self.assertEqual(summary.working_days, 23)
+
+        first = Attendance.objects.get(pk=first.pk)
+        first.office_out_time = timezone.make_aware(datetime.combine(date(2025, 12, 1), time(19, 0)))
+        first.save()
+        self.assertEqual(self.summary().seconds_worked, 18 * 3600)
+
+        first.delete()
+        summary = self.summary()
+        self.assertEqual(summary.seconds_worked, 8 * 3600)
+        self.assertEqual(summary.present_records, 1)
+
+    def test_leave_and_holiday_changes_refresh_calendar_counters(self):
+        """Test approving a leave and adding a holiday update the day counters"""
+        self.add_attendance(1, 9)
+        leave = Leave.objects.create(
+            employee=self.employee, from_date=date(2025, 12, 8), to_date=date(2025, 12, 9),
+            no_of_days=2, reason="Trip"
+        )
+        self.assertEqual(self.summary().leave_days, 0)
+        leave.status = Leave.Status.APPROVED
+        leave.save()
+        self.assertEqual(self.summary().leave_days, 2)
+        self.assertEqual(self.summary().working_days, 21)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(name="Test Holiday", date=date(2025, 12, 25))
+        summary = self.summary()
+        self.assertEqual(summary.working_days, 20)
+        self.assertEqual(summary.non_working_days, 9)
+        self.assertEqual(summary.expected_seconds(31, 32400), 20 * 32400)
+
+    def test_moved_leave_and_holiday_refresh_old_months(self):
+        """Test moving a leave or holiday to another month also refreshes the month it left"""
+        self.add_attendance(1, 9)
+        Attendance.objects.create(
+            employee=self.employee,
+            date=date(2025, 11, 3),
+            office_in_time=timezone.make_aware(datetime.combine(date(2025, 11, 3), time(9, 0))),
+            office_out_time=timezone.make_aware(datetime.combine(date(2025, 11, 3), time(18, 0))),
+        )
+        leave = Leave.objects.create(
+            employee=self.employee, from_date=date(2025, 12, 8), to_date=date(2025, 12, 9),
+            no_of_days=2, reason="Trip", status=Leave.Status.APPROVED
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(name="Test Holiday", date=date(2025, 12, 25))
+        self.assertEqual(self.summary().leave_days, 2)
+        self.assertEqual(self.summary().working_days, 20)
+
+        leave = Leave.objects.get(pk=leave.pk)
+        leave.from_date, leave.to_date = date(2025, 11, 10), date(2025, 11, 11)
+        leave.save()
+        holiday = Holiday.objects.get(name="Test Holiday")
+        holiday.date = date(2025, 11, 14)
+        with self.captureOnCommitCallbacks(execute=True):
+            holiday.save()
+
+        self.assertEqual(self.summary().leave_days, 0)
+        self.assertEqual(self.summary().working_days, 23)
+        november = AttendanceMonthSummary.objects.get(employee=self.employee, year=2025, month=11)
+        self.assertEqual(november.leave_days, 2)
+
+    def test_pending_leave_does_not_hide_approved_leave(self):
+        """Test summaries built from an all-status leave list count the approved leave"""
+        from .services import AttendanceSummaryService
+
+        pending = Leave(
+            employee=self.employee, from_date=date(2025, 12, 8), to_date=date(2025, 12, 8), reason="Draft",
+        )
+        approved = Leave(
+            employee=self.employee, from_date=date(2025, 12, 8), to_date=date(2025, 12, 9), reason="Trip",
+            status=Leave.Status.APPROVED,
+        )
+        counters = AttendanceSummaryService.calendar_counters(
+            self.employee, 2025, 12, {}, [pending, approved]
+        )
+        self.assertEqual(counters['leave_days'], 2)
+
+    def test_rebuild_command_matches_incremental_state(self):
+        """Test rebuilding from scratch gives the same counters"""
+        self.add_attendance(1, 9)
+        self.add_attendance(2, 10)
+        before = self.summary()
+        call_command('rebuild_attendance_summaries', year=2025, month=12, purge=True, stdout=StringIO())
+        after = self.summary()
+        for field in ('seconds_worked', 'seconds_extra', 'seconds_to_compensate', 'present_records',
+                      'working_days', 'non_working_days', 'expected_day_units'):
+            self.assertEqual(getattr(before, field), getattr(after, field))
+
+
+class ConditionalAttendanceGetTest(TestCase):
+    """Test cases for ETag handling on the monthly and weekly views"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.user = User.objects.create_user(username="etag", email="etag@example.com", password="pass")
+        self.employee = Employee.objects.create(
+            user=self.user,
+            employee_id="EMP-E001",
+            first_name="Etag",
+            last_name="Test",
+            email="etag@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+        self.attendance = Attendance.objects.create(
+            employee=self.employee,
+            date=date(2025, 12, 1),
+            office_in_time=timezone.make_aware(datetime.combine(date(2025, 12, 1), time(9, 0))),
+            office_out_time=timezone.make_aware(datetime.combine(date(2025, 12, 1), time(18, 0))),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_month_returns_304_with_one_query(self):
+        """Test a matching If-None-Match is answered from the fingerprint query alone"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        params = {'month': 12, 'year': 2025}
+        response = self.client.get('/api/attendance/monthly/', params)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/attendance/monthly/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        fingerprint_queries = [q for q in context.captured_queries if 'attendance_attendance' in q['sql']]
+        self.assertEqual(len(fingerprint_queries), 1)
+
+    def test_changes_invalidate_etag(self):
+        """Test attendance, leave and holiday changes produce a new ETag"""
+        params = {'week_start': '2025-12-01'}
+        etag = self.client.get('/api/attendance/weekly/', params)['ETag']
+
+        self.attendance.delete()
+        response = self.client.get('/api/attendance/weekly/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        Leave.objects.create(
+            employee=self.employee, from_date=date(2025, 12, 3), to_date=date(2025, 12, 3), reason="Errand"
+        )
+        response = self.client.get('/api/attendance/weekly/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        Holiday.objects.create(name="Test Holiday", date=date(2025, 12, 5))
+        response = self.client.get('/api/attendance/weekly/', params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class RecalculateAttendanceTest(TestCase):
+    """Test cases for the bulk attendance recalculation command"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-R001",
+            first_name="Recalc",
+            last_name="Test",
+            email="recalc@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+        for day in (1, 2, 3):
+            Attendance.objects.create(
+                employee=self.employee,
+                date=date(2025, 12, day),
+                office_in_time=timezone.make_aware(datetime.combine(date(2025, 12, day), time(9, 0))),
+                office_out_time=timezone.make_aware(datetime.combine(date(2025, 12, day), time(17, 0))),
+            )
+
+    @override_settings(ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS=8 * 3600)
+    def test_reset_total_time_without_signals(self):
+        """Test records are rewritten in bulk without post_save and summaries follow"""
+        from django.db.models.signals import post_save
+
+        saves = []
+
+        def receiver(sender, **kwargs):
+            saves.append(kwargs['instance'])
+
+        post_save.connect(receiver, sender=Attendance)
+        try:
+            out = StringIO()
+            call_command('recalculate_attendance', reset_total_time=True, chunk_size=2, stdout=out)
+        finally:
+            post_save.disconnect(receiver, sender=Attendance)
+
+        self.assertEqual(saves, [])
+        self.assertIn('Processed 2 records', out.getvalue())
+        self.assertEqual(set(Attendance.objects.values_list('seconds_extra_time', flat=True)), {0})
+        summary = AttendanceMonthSummary.objects.get(employee=self.employee, year=2025, month=12)
+        self.assertEqual(summary.seconds_to_compensate, 0)
+
+    @override_settings(ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS=8 * 3600)
+    def test_interrupted_run_keeps_summaries_current(self):
+        """Test summaries follow each committed chunk when a run stops early"""
+        from .services import AttendanceRecalculationService
+
+        def stop(processed, updated, last_pk):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            AttendanceRecalculationService.run(chunk_size=2, total_time=8 * 3600, progress=stop)
+
+        # Two of the three 8-hour days now expect 8 hours; the third still expects 9
+        summary = AttendanceMonthSummary.objects.get(employee=self.employee, year=2025, month=12)
+        self.assertEqual(summary.seconds_to_compensate, 3600)
+
+    def test_resume_after_pk(self):
+        """Test --after-pk skips already processed records"""
+        first_pk = Attendance.objects.order_by('pk').first().pk
+        out = StringIO()
+        call_command('recalculate_attendance', after_pk=first_pk, stdout=out)
+        self.assertIn('Recalculated 2 records', out.getvalue())
+
+
+class AttendanceExportTest(TestCase):
+    """Test cases for the streaming attendance export"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        admin = User.objects.create_user(username="export", email="export@example.com", password="pass", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        employee = Employee.objects.create(
+            employee_id="EMP-X001",
+            first_name="Export",
+            last_name="Test",
+            email="export-emp@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+        for day in range(1, 6):
+            Attendance.objects.create(
+                employee=employee,
+                date=date(2025, 12, day),
+                office_in_time=timezone.make_aware(datetime.combine(date(2025, 12, day), time(9, 0))),
+                office_out_time=timezone.make_aware(datetime.combine(date(2025, 12, day), time(18, 0))),
+            )
+
+    def test_csv_stream(self):
+        """Test the endpoint streams a CSV with one line per record"""
+        response = self.client.get('/api/attendance/export/', {'start_date': '2025-12-02', 'end_date': '2025-12-31'})
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'date', 'employee_code'])
+        self.assertEqual(len(lines), 5)
+        self.assertIn('EMP-X001', lines[1])
+
+    def test_jsonl_chunks_cover_every_row(self):
+        """Test keyset chunks return every row once, in date order"""
+        import json
+        from .services import AttendanceExportService
+
+        rows = AttendanceExportService.rows(date(2025, 12, 1), date(2025, 12, 31), chunk_size=2)
+        records = [json.loads(line) for line in AttendanceExportService.iter_jsonl(rows)]
+        self.assertEqual([r['date'] for r in records], [f'2025-12-0{d}' for d in range(1, 6)])
+        self.assertEqual(records[0]['seconds_actual_worked_time'], 9 * 3600)
+
+    def test_rejects_unknown_format(self):
+        """Test an unsupported export_format is a 400"""
+        response = self.client.get(
+            '/api/attendance/export/', {'start_date': '2025-12-01', 'end_date': '2025-12-31', 'export_format': 'xls'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PunchIngestionTest(TestCase):
+    """Test cases for bulk punch ingestion"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        admin = User.objects.create_user(username="punch", email="punch@example.com", password="pass", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-P001",
+            first_name="Punch",
+            last_name="Test",
+            email="punch-emp@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+
+    def test_punches_fold_into_one_row_per_day(self):
+        """Test earliest IN and latest OUT win and bad rows are reported"""
+        Attendance.objects.create(
+            employee=self.employee,
+            date=date(2025, 12, 2),
+            office_in_time=timezone.make_aware(datetime.combine(date(2025, 12, 2), time(9, 30))),
+        )
+        punches = [
+            {"employee_id": "EMP-P001", "timestamp": "2025-12-01T09:05:00", "location": "OFFICE", "direction": "IN"},
+            {"employee_id": "EMP-P001", "timestamp": "2025-12-01T13:00:00", "location": "OFFICE", "direction": "OUT"},
+            {"employee_id": "EMP-P001", "timestamp": "2025-12-01T08:55:00", "location": "OFFICE", "direction": "IN"},
+            {"employee_id": "EMP-P001", "timestamp": "2025-12-01T18:10:00", "location": "OFFICE", "direction": "OUT"},
+            {"employee_id": "EMP-P001", "timestamp": "2025-12-02T18:30:00", "location": "OFFICE", "direction": "OUT"},
+            {"employee_id": "EMP-NOPE", "timestamp": "2025-12-01T09:00:00", "location": "OFFICE", "direction": "IN"},
+            {"employee_id": "EMP-P001", "timestamp": "not a time", "location": "OFFICE", "direction": "IN"},
+        ]
+        response = self.client.post('/api/attendance/ingest-punches/', {"punches": punches}, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.data["data"]
+        self.assertEqual((data["created"], data["updated"], data["failed"]), (1, 1, 2))
+        self.assertEqual([r["status"] for r in data["results"]][4:], ["updated", "error", "error"])
+
+        first = Attendance.objects.get(employee=self.employee, date=date(2025, 12, 1))
+        self.assertEqual(timezone.localtime(first.office_in_time).time(), time(8, 55))
+        self.assertEqual(timezone.localtime(first.office_out_time).time(), time(18, 10))
+        self.assertEqual(first.seconds_actual_worked_time, 9 * 3600 + 15 * 60)
+        second = Attendance.objects.get(employee=self.employee, date=date(2025, 12, 2))
+        self.assertEqual(second.seconds_actual_worked_time, 9 * 3600)
+
+        summary = AttendanceMonthSummary.objects.get(employee=self.employee, year=2025, month=12)
+        self.assertEqual(summary.seconds_worked, 18 * 3600 + 15 * 60)
+
+    def test_integrity_error_is_retried(self):
+        """Test a conflicting concurrent insert makes the batch run again instead of failing"""
+        from django.db import IntegrityError
+        from .services import AttendancePunchIngestionService
+
+        bulk_create = Attendance.objects.bulk_create
+        calls = []
+
+        def racing_bulk_create(objs, **kwargs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise IntegrityError("UNIQUE constraint failed: attendance_attendance.employee_id, date")
+            return bulk_create(objs, **kwargs)
+
+        punches = [
+            {"employee_id": "EMP-P001", "timestamp": "2025-12-03T09:00:00", "location": "OFFICE", "direction": "IN"},
+            {"employee_id": "EMP-P001", "timestamp": "2025-12-03T17:00:00", "location": "OFFICE", "direction": "OUT"},
+        ]
+        with mock.patch.object(Attendance.objects, 'bulk_create', side_effect=racing_bulk_create):
+            result = AttendancePunchIngestionService.ingest(punches)
+
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual((result["created"], result["failed"]), (1, 0))
+        self.assertEqual(Attendance.objects.filter(employee=self.employee, date=date(2025, 12, 3)).count(), 1)
+
+
+class LateArrivalTest(TestCase):
+    """Test cases for the stored late flag, month counter and report"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        admin = User.objects.create_user(username="late", email="late@example.com", password="pass", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-L001",
+            first_name="Late",
+            last_name="Test",
+            email="late-emp@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+
+    def check_in(self, day, hour, minute):
+        return Attendance.objects.create(
+            employee=self.employee,
+            date=date(2025, 12, day),
+            office_working_hours="09:00",
+            office_in_time=timezone.make_aware(datetime.combine(date(2025, 12, day), time(hour, minute))),
+        )
+
+    def test_late_flag_and_counter(self):
+        """Test lateness is computed in local time and counted per month"""
+        on_time = self.check_in(1, 8, 55)
+        late = self.check_in(2, 9, 45)
+        self.assertFalse(on_time.is_late)
+        self.assertTrue(late.is_late)
+        self.assertEqual(late.late_minutes, 45)
+        summary = AttendanceMonthSummary.objects.get(employee=self.employee, year=2025, month=12)
+        self.assertEqual(summary.late_days, 1)
+
+        late.delete()
+        summary.refresh_from_db()
+        self.assertEqual(summary.late_days, 0)
+
+    def test_late_alert_on_fifth_late_day(self):
+        """Test the fifth late arrival of the month triggers the late alert"""
+        from unittest import mock
+
+        def late_alerts(outbox):
+            return [c for c in outbox.enqueue.call_args_list if c[0][0] == 'notify_late_alert']
+
+        with mock.patch('notifications.signals.NotificationOutboxService') as outbox:
+            for day in (1, 2, 3, 4):
+                self.check_in(day, 10, 0)
+            self.assertEqual(late_alerts(outbox), [])
+            self.check_in(5, 10, 0)
+        alerts = late_alerts(outbox)
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0][0][2], "01th, 02th, 03th, 04th, 05th")
+
+    def test_backfilled_day_counts_late_days_up_to_its_date(self):
+        """Test a backfilled late day is judged by the late days on or before it"""
+        from unittest import mock
+
+        for day in (10, 11, 12, 15, 16):
+            self.check_in(day, 10, 0)
+        with mock.patch('notifications.signals.NotificationOutboxService') as outbox:
+            self.check_in(3, 10, 0)
+        self.assertEqual([c[0][0] for c in outbox.enqueue.call_args_list], ['notify_daily_attendance'])
+
+    def test_late_arrivals_report(self):
+        """Test the report lists late employees with their dates"""
+        self.check_in(1, 9, 30)
+        self.check_in(2, 8, 30)
+        response = self.client.get('/api/attendance/late-arrivals/', {'month': 12, 'year': 2025})
+        self.assertEqual(response.status_code, 200)
+        rows = response.data["data"]["employees"]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["late_days"], 1)
+        self.assertEqual(rows[0]["dates"][0]["late_minutes"], 30)
+
+
+class KeysetPaginationTest(TestCase):
+    """Test cases for opt-in cursor pagination on the attendance list"""
+
+    def setUp(self):
+        """Set up test data"""
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        admin = User.objects.create_user(username="pager", email="pager@example.com", password="pass", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        employees = [
+            Employee.objects.create(
+                employee_id=f"EMP-P00{i}",
+                first_name="Pager",
+                last_name=str(i),
+                email=f"pager{i}@example.com",
+                phone="+919999999999",
+                department=department,
+                designation=designation,
+                joining_date=date(2025, 1, 1),
+            )
+            for i in range(3)
+        ]
+        Attendance.objects.bulk_create(
+            Attendance(employee=employee, date=date(2025, 12, day))
+            for day in range(1, 10) for employee in employees
+        )
+        self.expected = list(Attendance.objects.order_by('-date', 'employee_id', 'id').values_list('id', flat=True))
+
+    def test_pages_follow_keyset_order_without_count(self):
+        """Test next links walk every row once in ordering order with no COUNT query"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/attendance/', {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in context.captured_queries))
+
+        seen = [row['id'] for row in response.data['results']]
+        first_page = list(seen)
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            previous_url, next_url = response.data['previous'], response.data['next']
+        self.assertEqual(seen, self.expected)
+
+        response = self.client.get(previous_url)
+        self.assertEqual([row['id'] for row in response.data['results']], first_page)
+        self.assertIsNone(response.data['previous'])
+
+    def test_page_numbers_remain_default(self):
+        """Test requests without a cursor keep page-number pagination"""
+        response = self.client.get('/api/attendance/')
+        self.assertEqual(response.data['count'], len(self.expected))
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is a 404 rather than a server error"""
+        for cursor in ('not-base64!', 'eyJwIjpbMV19', 'eyJwIjpbInNvb24iLDEsMV19'):
+            response = self.client.get('/api/attendance/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class DayGridTest(SimpleTestCase):
+    """Test cases for the shared day-classification kernel"""
+
+    def classify_june(self):
+        # June 2025: the 1st is a Sunday, the 30th a Monday; the 10th is a holiday
+        grid = daygrid.MonthGrid(2025, 6, {date(2025, 6, 10)}, today=date(2025, 6, 20))
+        rows = [
+            dict(joining_date=None, leave=[date(2025, 6, 2), date(2025, 6, 3)],
+                 partial=[date(2025, 6, 3)], unpaid=[], worked=[date(2025, 6, 2), date(2025, 6, 4)]),
+            dict(joining_date=date(2025, 6, 16), leave=[date(2025, 6, 16)],
+                 partial=[], unpaid=[date(2025, 6, 16)], worked=[date(2025, 6, 17)]),
+        ]
+        codes = daygrid.classify(
+            grid,
+            grid.matrix(grid.joined(row['joining_date']) for row in rows),
+            **{
+                flag: grid.matrix(grid.mask(row[flag]) for row in rows)
+                for flag in ('leave', 'partial', 'unpaid', 'worked')
+            }
+        )
+        return [list(map(int, row)) for row in codes], daygrid.counts(codes)
+
+    def test_day_codes_follow_priority(self):
+        """Test joining, calendar, leave, future and worked flags are applied in order"""
+        codes, counts = self.classify_june()
+        first, second = codes
+
+        self.assertEqual(first[0], daygrid.NON_WORKING)      # Sunday
+        self.assertEqual(first[1], daygrid.LEAVE)            # leave wins over worked
+        self.assertEqual(first[2], daygrid.PARTIAL_LEAVE)
+        self.assertEqual(first[3], daygrid.WORKED)
+        self.assertEqual(first[4], daygrid.ABSENT)
+        self.assertEqual(first[9], daygrid.NON_WORKING)      # holiday
+        self.assertEqual(first[20], daygrid.NON_WORKING)     # Saturday in the future
+        self.assertEqual(first[22], daygrid.FUTURE)
+        self.assertEqual(second[14], daygrid.BEFORE_JOINING)
+        self.assertEqual(second[15], daygrid.UNPAID_LEAVE)
+        self.assertEqual(second[16], daygrid.WORKED)
+
+        # 21 weekdays minus one holiday; 14 of them are on or before the 20th
+        self.assertEqual(sum(counts[0]), 30)
+        self.assertEqual(counts[0][daygrid.FUTURE], 6)
+        self.assertEqual(counts[0][daygrid.ABSENT], 14 - 3)
+        self.assertEqual(counts[1][daygrid.BEFORE_JOINING], 15)
+
+    @skipUnless(daygrid.HAS_NUMPY, "numpy is not installed")
+    def test_fallback_matches_numpy(self):
+        """Test the pure-Python path gives the same codes and counts"""
+        with mock.patch.object(daygrid, 'HAS_NUMPY', False):
+            fallback = self.classify_june()
+        self.assertEqual(fallback, self.classify_june())
+
+    @skipUnless(daygrid.HAS_NUMPY, "numpy is not installed")
+    def test_numpy_returns_arrays(self):
+        """Test the NumPy path classifies a company-month as one array"""
+        grid = daygrid.MonthGrid(2025, 6)
+        codes = daygrid.classify(grid, grid.matrix([grid.joined(None)] * 3))
+        self.assertEqual(codes.shape, (3, 30))
+
+    def test_expected_units(self):
+        """Test expected half days per day code"""
+        grid = daygrid.MonthGrid(2025, 6)
+        codes = daygrid.classify(
+            grid, grid.joined(None),
+            leave=grid.mask([date(2025, 6, 2), date(2025, 6, 3), date(2025, 6, 4)]),
+            partial=grid.mask([date(2025, 6, 3)]),
+        )
+        units = daygrid.expected_units(codes, grid.mask([date(2025, 6, 4)]))
+        self.assertEqual(units[:5], [0, 0, 1, 2, 2])
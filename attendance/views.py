@@ -4,11 +4,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from datetime import datetime, timedelta
 from calendar import monthrange
+from config.pagination import KeysetPaginationMixin
+from collections import defaultdict
+import csv
 
 # Optional django-filter import
 try:
@@ -17,7 +24,7 @@ try:
 except ImportError:
     HAS_DJANGO_FILTER = False
 
-from .models import Attendance
+from .models import Attendance, AttendanceMonthSummary
 from .serializers import (
     AttendanceListSerializer,
     AttendanceDetailSerializer,
@@ -29,15 +36,18 @@ from .serializers import (
     WeeklyTimesheetSerializer,
     UpdateSessionSerializer
 )
-from holidays.models import Holiday
+from holidays.services import CompanyCalendarService
 from employees.models import Employee
-from .services import AttendanceCalculationService
+from .services import (
+    AttendanceCalculationService, AttendanceExportService, AttendanceFingerprintService,
+    AttendancePunchIngestionService, AttendanceSummaryService
+)
 from django.conf import settings
 from .constants import DATE_FORMAT, TIME_12HR_FORMAT
 from .serializers import format_datetime_to_iso, format_seconds_to_hms
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for Attendance management
     
@@ -61,6 +71,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
     ]
     ordering_fields = ['date', 'in_time', 'out_time', 'created_at']
     ordering = ['-date']
+    keyset_ordering = ['-date', 'employee', 'id']
     
     def get_serializer_class(self):
         """Use different serializers based on action"""
@@ -108,6 +119,26 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         self._determine_day_type(attendance)
         attendance.save()
     
+    def _conditional_response(self, request, employee, start_date, end_date, build_data):
+        """
+        Serve a per-employee date range with ETag/Last-Modified validators.
+        When If-None-Match matches, reply 304 without loading or serializing the range.
+        """
+        etag, last_modified = AttendanceFingerprintService.fingerprint(
+            employee, start_date, end_date, timezone.now().date()
+        )
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = Response(build_data(), status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
     def _determine_day_type(self, attendance):
         """Determine day_type based on date, holidays, and weekend"""
         AttendanceCalculationService.determine_day_type(attendance, today=timezone.now().date())
@@ -158,11 +189,11 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if holiday
-        holiday = Holiday.objects.filter(date=check_date, is_active=True).first()
-        if holiday:
+        holiday_name = CompanyCalendarService.holiday_name(check_date)
+        if holiday_name:
             return Response({
                 "error": 1,
-                "message": f"Cannot check-in on holidays. {holiday.name} is a holiday."
+                "message": f"Cannot check-in on holidays. {holiday_name} is a holiday."
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if employee has approved leave for this date
@@ -548,39 +579,333 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         num_days = monthrange(year, month)[1]
         end_date = datetime(year, month, num_days).date()
         
-        attendance_records = Attendance.objects.filter(
-            employee=employee,
+        def build_monthly_data():
+            attendance_records = Attendance.objects.filter(
+                employee=employee,
+                date__gte=start_date,
+                date__lte=end_date
+            ).order_by('date')
+            
+            # Get holidays for the month
+            holidays_list = CompanyCalendarService.holidays_in_range(start_date, end_date)
+            
+            # Get leaves for the month
+            from leaves.models import Leave
+            leaves_list = Leave.objects.filter(
+                employee=employee,
+                from_date__lte=end_date,
+                to_date__gte=start_date
+            ).order_by('from_date')
+            
+            # Serialize monthly data
+            return MonthlyAttendanceSerializer.serialize_monthly_data(
+                attendance_records,
+                employee,
+                month,
+                year,
+                holidays_list,
+                leaves_list
+            )
+        
+        return self._conditional_response(request, employee, start_date, end_date, build_monthly_data)
+
+    @swagger_auto_schema(
+        operation_description="Get the monthly attendance grid for all employees (Admin/HR only).",
+        manual_parameters=[
+            openapi.Parameter('month', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Month (1-12)"),
+            openapi.Parameter('year', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Year (e.g. 2025)"),
+            openapi.Parameter('department', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Optional: department ID"),
+            openapi.Parameter('company', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Optional: company ID"),
+        ],
+        responses={200: "Success Response"}
+    )
+    @action(detail=False, methods=['get'], url_path='monthly-grid', permission_classes=[IsAdminUser])
+    def monthly_grid(self, request):
+        """
+        Get monthly attendance for every employee in one response (Admin/HR only)
+        GET /api/attendance/monthly-grid/?month=12&year=2025&department=3&company=1
+        Attendance, holidays and leaves are fetched in bulk, so the number of
+        queries does not grow with headcount.
+        """
+        month = request.query_params.get('month')
+        year = request.query_params.get('year')
+        department = request.query_params.get('department')
+        company = request.query_params.get('company')
+
+        if not month or not year:
+            return Response({
+                "error": 1,
+                "message": "month and year query parameters are required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            month = int(month)
+            year = int(year)
+
+            if month < 1 or month > 12:
+                raise ValueError("Month must be between 1 and 12")
+
+            department = int(department) if department else None
+            company = int(company) if company else None
+        except ValueError as e:
+            return Response({
+                "error": 1,
+                "message": f"Invalid query parameter: {str(e)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        start_date = datetime(year, month, 1).date()
+        num_days = monthrange(year, month)[1]
+        end_date = datetime(year, month, num_days).date()
+
+        # 1. Employees in scope (joined on or before the end of the month)
+        employees = Employee.objects.filter(is_active=True).filter(
+            Q(joining_date__isnull=True) | Q(joining_date__lte=end_date)
+        ).select_related('designation').order_by('first_name', 'last_name', 'id')
+        if department:
+            employees = employees.filter(department_id=department)
+        if company:
+            employees = employees.filter(company_id=company)
+        employees = list(employees)
+        employee_ids = [e.id for e in employees]
+
+        # 2. Attendance for the whole population, grouped per employee
+        attendance_by_employee = defaultdict(list)
+        for record in Attendance.objects.filter(
+            employee_id__in=employee_ids,
             date__gte=start_date,
             date__lte=end_date
-        ).order_by('date')
-        
-        # Get holidays for the month
-        holidays_list = Holiday.objects.filter(
-            date__year=year,
-            date__month=month,
-            is_active=True
-        )
-        
-        # Get leaves for the month
+        ).order_by('date'):
+            attendance_by_employee[record.employee_id].append(record)
+
+        # 3. Holidays for the month, shared by every employee
+        holiday_dates = CompanyCalendarService.holidays_in_range(start_date, end_date)
+
+        # 4. Leaves of every status overlapping the month, grouped per employee,
+        #    the same set the single-employee monthly view shows
         from leaves.models import Leave
-        leaves_list = Leave.objects.filter(
-            employee=employee,
+        leaves_by_employee = defaultdict(list)
+        for leave in Leave.objects.filter(
+            employee_id__in=employee_ids,
             from_date__lte=end_date,
             to_date__gte=start_date
-        ).order_by('from_date')
-        
-        # Serialize monthly data
-        response_data = MonthlyAttendanceSerializer.serialize_monthly_data(
-            attendance_records,
-            employee,
-            month,
-            year,
-            holidays_list,
-            leaves_list
+        ).order_by('from_date'):
+            leaves_by_employee[leave.employee_id].append(leave)
+
+        # 5. Stored month summaries (missing ones are built from the data above)
+        summaries = AttendanceSummaryService.summaries_for_month(
+            employees, year, month, holiday_dates, leaves_by_employee, attendance_by_employee
         )
-        
-        return Response(response_data, status=status.HTTP_200_OK)
-    
+
+        # 6. Reuse the per-day classification of the single employee endpoint
+        grid = []
+        month_data = {}
+        for employee in employees:
+            month_data = MonthlyAttendanceSerializer.serialize_monthly_data(
+                attendance_by_employee[employee.id],
+                employee,
+                month,
+                year,
+                holiday_dates,
+                leaves_by_employee[employee.id],
+                summary=summaries[employee.id]
+            )["data"]
+            grid.append({
+                "userid": month_data["userid"],
+                "userName": month_data["userName"],
+                "userjobtitle": month_data["userjobtitle"],
+                "monthSummary": month_data["monthSummary"],
+                "compensationSummary": month_data["compensationSummary"],
+                "attendance": month_data["attendance"],
+            })
+
+        return Response({
+            "error": 0,
+            "data": {
+                "year": year,
+                "month": month,
+                "monthName": month_data.get("monthName", start_date.strftime('%B')),
+                "nextMonth": month_data.get("nextMonth"),
+                "previousMonth": month_data.get("previousMonth"),
+                "total_employees": len(grid),
+                "employees": grid
+            }
+        }, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="Late arrivals per employee for a month (Admin/HR only).",
+        manual_parameters=[
+            openapi.Parameter('month', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Month (1-12), default current"),
+            openapi.Parameter('year', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Year, default current"),
+            openapi.Parameter('department', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Optional: department ID"),
+            openapi.Parameter('company', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Optional: company ID"),
+        ],
+        responses={200: "Success Response"}
+    )
+    @action(detail=False, methods=['get'], url_path='late-arrivals', permission_classes=[IsAdminUser])
+    def late_arrivals(self, request):
+        """
+        Late arrivals this month (Admin/HR only)
+        GET /api/attendance/late-arrivals/?month=12&year=2025&department=3
+        Reads the month summaries' late counters and the indexed is_late flag: two queries.
+        """
+        today = timezone.now().date()
+        try:
+            month = int(request.query_params.get('month') or today.month)
+            year = int(request.query_params.get('year') or today.year)
+            if month < 1 or month > 12:
+                raise ValueError("Month must be between 1 and 12")
+            department = int(request.query_params['department']) if request.query_params.get('department') else None
+            company = int(request.query_params['company']) if request.query_params.get('company') else None
+        except ValueError as e:
+            return Response({
+                "error": 1,
+                "message": f"Invalid query parameter: {str(e)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        start_date = datetime(year, month, 1).date()
+        end_date = datetime(year, month, monthrange(year, month)[1]).date()
+
+        summaries = AttendanceMonthSummary.objects.filter(
+            year=year, month=month, late_days__gt=0
+        ).select_related('employee__department').order_by('-late_days', 'employee__first_name')
+        if department:
+            summaries = summaries.filter(employee__department_id=department)
+        if company:
+            summaries = summaries.filter(employee__company_id=company)
+        summaries = list(summaries)
+
+        late_by_employee = defaultdict(list)
+        for employee_id, late_date, office_in_time, late_minutes in Attendance.objects.filter(
+            is_late=True,
+            date__gte=start_date,
+            date__lte=end_date,
+            employee_id__in=[s.employee_id for s in summaries]
+        ).order_by('date').values_list('employee_id', 'date', 'office_in_time', 'late_minutes'):
+            late_by_employee[employee_id].append({
+                "date": late_date.strftime(DATE_FORMAT),
+                "in_time": format_datetime_to_iso(office_in_time) if office_in_time else "",
+                "late_minutes": late_minutes,
+            })
+
+        employees = []
+        for summary in summaries:
+            dates = late_by_employee[summary.employee_id]
+            employees.append({
+                "userid": str(summary.employee_id),
+                "employee_code": summary.employee.employee_id,
+                "userName": summary.employee.get_full_name(),
+                "department": summary.employee.department.name if summary.employee.department else "",
+                "late_days": summary.late_days,
+                "late_minutes_total": sum(d["late_minutes"] for d in dates),
+                "dates": dates,
+            })
+
+        return Response({
+            "error": 0,
+            "data": {
+                "year": year,
+                "month": month,
+                "total_employees": len(employees),
+                "employees": employees
+            }
+        }, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        operation_description="Stream attendance rows for a date range as CSV or JSONL (Admin/HR only).",
+        manual_parameters=[
+            openapi.Parameter('start_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="First date (YYYY-MM-DD)"),
+            openapi.Parameter('end_date', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Last date (YYYY-MM-DD)"),
+            openapi.Parameter('company', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Optional: company ID"),
+            openapi.Parameter('department', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Optional: department ID"),
+            openapi.Parameter('export_format', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="csv (default) or jsonl"),
+        ],
+        responses={200: "Streamed file"}
+    )
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Stream attendance as a file download (Admin/HR only)
+        GET /api/attendance/export/?start_date=2025-01-01&end_date=2025-12-31&company=1&export_format=jsonl
+        (`format` is reserved by DRF for renderer selection, hence `export_format`.)
+        """
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        export_format = request.query_params.get('export_format', 'csv').lower()
+
+        if not start_date or not end_date:
+            return Response({
+                "error": 1,
+                "message": "start_date and end_date query parameters are required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if export_format not in AttendanceExportService.FORMATS:
+            return Response({
+                "error": 1,
+                "message": f"export_format must be one of: {', '.join(AttendanceExportService.FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start_date = datetime.strptime(start_date, DATE_FORMAT).date()
+            end_date = datetime.strptime(end_date, DATE_FORMAT).date()
+            company = int(request.query_params['company']) if request.query_params.get('company') else None
+            department = int(request.query_params['department']) if request.query_params.get('department') else None
+            if end_date < start_date:
+                raise ValueError("end_date must not be before start_date")
+        except ValueError as e:
+            return Response({
+                "error": 1,
+                "message": f"Invalid query parameter: {str(e)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = AttendanceExportService.rows(start_date, end_date, company_id=company, department_id=department)
+        content_type = 'application/x-ndjson' if export_format == 'jsonl' else 'text/csv'
+        response = StreamingHttpResponse(AttendanceExportService.stream(export_format, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="attendance_{start_date}_{end_date}.{export_format}"'
+        return response
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Ingest raw turnstile/biometric punches in bulk (Admin/HR only). "
+            "Send JSON {\"punches\": [{employee_id, timestamp, location, direction}]} "
+            "or a CSV upload in `file` with the same columns."
+        ),
+        responses={200: "Per-row results"}
+    )
+    @action(detail=False, methods=['post'], url_path='ingest-punches', permission_classes=[IsAdminUser])
+    def ingest_punches(self, request):
+        """
+        Fold punches into attendance rows in one transaction (Admin/HR only)
+        POST /api/attendance/ingest-punches/
+        employee_id is the employee code; location is OFFICE/HOME; direction is IN/OUT.
+        """
+        upload = request.FILES.get('file')
+        if upload:
+            try:
+                punches = AttendancePunchIngestionService.parse_csv(upload.read().decode('utf-8-sig'))
+            except (UnicodeDecodeError, csv.Error) as e:
+                return Response({
+                    "error": 1,
+                    "message": f"Could not read CSV file: {str(e)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            punches = request.data.get('punches') if isinstance(request.data, dict) else request.data
+
+        if not isinstance(punches, list) or not punches:
+            return Response({
+                "error": 1,
+                "message": "Provide a non-empty punches list or a CSV file"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = getattr(settings, 'ATTENDANCE_PUNCH_BATCH_LIMIT', 20000)
+        if len(punches) > limit:
+            return Response({
+                "error": 1,
+                "message": f"At most {limit} punches per request"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        result = AttendancePunchIngestionService.ingest(punches, user=request.user)
+        return Response({"error": 0, "data": result}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='today')
     def today(self, request):
         """
@@ -749,21 +1074,31 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         # Calculate week range (Monday to Sunday)
         week_end_date = week_start_date + timedelta(days=6)
         
-        # Get attendance records for the week
-        attendance_records = Attendance.objects.filter(
-            employee=employee,
-            date__gte=week_start_date,
-            date__lte=week_end_date
-        ).order_by('date')
-        
-        # Serialize weekly data
-        response_data = WeeklyTimesheetSerializer.serialize_weekly_data(
-            attendance_records,
-            employee,
-            week_start_date
-        )
+        def build_weekly_data():
+            # Get attendance records for the week
+            attendance_records = Attendance.objects.filter(
+                employee=employee,
+                date__gte=week_start_date,
+                date__lte=week_end_date
+            ).order_by('date')
+            
+            # Get leaves overlapping the week
+            from leaves.models import Leave
+            leaves_list = Leave.objects.filter(
+                employee=employee,
+                from_date__lte=week_end_date,
+                to_date__gte=week_start_date
+            ).order_by('from_date')
+            
+            # Serialize weekly data
+            return WeeklyTimesheetSerializer.serialize_weekly_data(
+                attendance_records,
+                employee,
+                week_start_date,
+                leaves_list
+            )
         
-        return Response(response_data, status=status.HTTP_200_OK)
+        return self._conditional_response(request, employee, week_start_date, week_end_date, build_weekly_data)
     
     @action(detail=False, methods=['post'], url_path='submit-timesheet')
     def submit_weekly_timesheet(self, request):
@@ -0,0 +1,165 @@
+# config/pagination.py
+"""
+Opt-in keyset (cursor) pagination for the high-volume list endpoints.
+
+The default PageNumberPagination counts the whole queryset and OFFSETs to the
+requested page, so deep pages get slower. A viewset using KeysetPaginationMixin
+switches to keyset paging when the request carries `?cursor=...` or
+`?pagination=cursor`: rows are ordered by the viewset's `keyset_ordering`
+(its usual ordering plus the primary key) and each page starts right after the
+last row of the previous one, so page N costs the same as page 1 and there is
+no count query. Without those parameters the endpoint paginates as before.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages through a queryset by position instead of offset.
+
+    The cursor is the ordering values of a boundary row plus a direction flag,
+    so `next` continues after the last row of the page and `previous` reads
+    backwards from the first one.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering, page_size=None):
+        self.ordering = [
+            (name[1:], True) if name.startswith('-') else (name, False)
+            for name in ordering
+        ]
+        self.page_size = page_size or api_settings.PAGE_SIZE
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get(cls.mode_query_param) == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        opts = queryset.model._meta
+        self.fields = [(opts.get_field(name), descending) for name, descending in self.ordering]
+        position, reverse = self.decode_cursor(request)
+
+        order_by = [
+            ('-' if descending != reverse else '') + field.attname
+            for field, descending in self.fields
+        ]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self._beyond(position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        first = self._position(rows[0]) if rows else position
+        last = self._position(rows[-1]) if rows else position
+        if reverse:
+            self.next_position = last
+            self.previous_position = first if has_more else None
+        else:
+            self.next_position = last if has_more else None
+            self.previous_position = first if position is not None else None
+        return rows
+
+    def _beyond(self, position, reverse):
+        """Rows after `position` in the paging direction"""
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(self.fields, position):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{field.attname}__{lookup}': value})
+            equal[field.attname] = value
+        return condition
+
+    def _position(self, row):
+        return [getattr(row, field.attname) for field, _ in self.fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = data['p']
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for (field, _), value in zip(self.fields, values)]
+            if None in position:
+                raise ValueError
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in position
+        ]
+        data = {'p': values, 'r': 1} if reverse else {'p': values}
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode('ascii')
+        url = remove_query_param(self.request.build_absolute_uri(), self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Lets a list endpoint opt into KeysetPagination per request.
+
+    `keyset_ordering` must end with the primary key and should match a
+    composite index; `?ordering=` is ignored in cursor mode.
+    """
+    keyset_ordering = None
+
+    @property
+    def paginator(self):
+        request = getattr(self, 'request', None)
+        if (
+            not hasattr(self, '_paginator') and self.keyset_ordering
+            and request is not None and KeysetPagination.requested(request)
+        ):
+            self._paginator = KeysetPagination(self.keyset_ordering)
+        return super().paginator
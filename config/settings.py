@@ -242,6 +242,20 @@ if os.environ.get('RENDER') or (db_host and 'tidbcloud.com' in db_host):
         DATABASES['default']['OPTIONS']['ssl_mode'] = 'REQUIRED'
         DATABASES['default']['OPTIONS']['ssl'] = {}
 
+# -------------------- Cache --------------------
+# `default` is per process. `shared` lives in the database table created by
+# `python manage.py createcachetable`, so every server process and instance
+# sees the same keys (used where that matters, e.g. Slack retry deduplication).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.environ.get('SHARED_CACHE_TABLE', 'hrms_shared_cache'),
+    },
+}
+
 # -------------------- Auth & Password --------------------
 AUTH_USER_MODEL = "auth_app.User"
 AUTH_PASSWORD_VALIDATORS = [
@@ -289,3 +303,38 @@ LOGGING = {
 ATTENDANCE_DEFAULT_WORKING_HOURS = os.environ.get('ATTENDANCE_DEFAULT_WORKING_HOURS', '09:00')
 ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS = int(os.environ.get('ATTENDANCE_DEFAULT_TOTAL_TIME_SECONDS', '32400'))
 ATTENDANCE_HALF_DAY_THRESHOLD = float(os.environ.get('ATTENDANCE_HALF_DAY_THRESHOLD', '0.5'))
+ATTENDANCE_PUNCH_BATCH_LIMIT = int(os.environ.get('ATTENDANCE_PUNCH_BATCH_LIMIT', '20000'))
+
+# -------------------- Holidays --------------------
+HOLIDAY_CALENDAR_CACHE_SECONDS = int(os.environ.get('HOLIDAY_CALENDAR_CACHE_SECONDS', '300'))
+
+# -------------------- Notifications --------------------
+# With the outbox enabled, Slack messages are queued on commit and sent by
+# `python manage.py run_notification_worker`; disable it to send inline.
+NOTIFICATION_OUTBOX_ENABLED = os.environ.get('NOTIFICATION_OUTBOX_ENABLED', 'True') == 'True'
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', '8'))
+NOTIFICATION_OUTBOX_BACKOFF_SECONDS = int(os.environ.get('NOTIFICATION_OUTBOX_BACKOFF_SECONDS', '30'))
+NOTIFICATION_OUTBOX_MAX_BACKOFF_SECONDS = int(os.environ.get('NOTIFICATION_OUTBOX_MAX_BACKOFF_SECONDS', '3600'))
+NOTIFICATION_OUTBOX_CLAIM_TIMEOUT_SECONDS = int(os.environ.get('NOTIFICATION_OUTBOX_CLAIM_TIMEOUT_SECONDS', '300'))
+SLACK_CONFIG_CACHE_SECONDS = int(os.environ.get('SLACK_CONFIG_CACHE_SECONDS', '300'))
+SLACK_USER_MISS_CACHE_SECONDS = int(os.environ.get('SLACK_USER_MISS_CACHE_SECONDS', '86400'))
+SLACK_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get('SLACK_RATE_LIMIT_MAX_WAIT_SECONDS', '2'))
+SLACK_INTERACTION_WORKERS = int(os.environ.get('SLACK_INTERACTION_WORKERS', '4'))
+SLACK_INTERACTION_QUEUE_SIZE = int(os.environ.get('SLACK_INTERACTION_QUEUE_SIZE', '32'))
+SLACK_INTERACTION_DEDUP_SECONDS = int(os.environ.get('SLACK_INTERACTION_DEDUP_SECONDS', '3600'))
+SLACK_DEBUG_LOG_FILE = os.environ.get('SLACK_DEBUG_LOG_FILE', 'slack_debug.log')
+
+# -------------------- Dashboard --------------------
+DASHBOARD_CACHE_SECONDS = int(os.environ.get('DASHBOARD_CACHE_SECONDS', '300'))
+
+# -------------------- Payroll --------------------
+# Processes used by `run_payroll` to compute salaries (0 or 1 = inline)
+PAYROLL_RUN_WORKERS = int(os.environ.get('PAYROLL_RUN_WORKERS', '0'))
+PAYROLL_RUN_CHUNK_SIZE = int(os.environ.get('PAYROLL_RUN_CHUNK_SIZE', '250'))
+# A running payroll run with no progress for this long is treated as dead and may be claimed again
+PAYROLL_RUN_STALE_SECONDS = int(os.environ.get('PAYROLL_RUN_STALE_SECONDS', '900'))
+PAYROLL_SIMULATION_CACHE_SECONDS = int(os.environ.get('PAYROLL_SIMULATION_CACHE_SECONDS', '300'))
+# Render payslip PDFs at the end of each payroll run (otherwise on first download)
+PAYROLL_RUN_RENDER_PDFS = os.environ.get('PAYROLL_RUN_RENDER_PDFS', 'False') == 'True'
+# First month of the fiscal year used for year-to-date payroll totals (4 = April)
+PAYROLL_FISCAL_YEAR_START_MONTH = int(os.environ.get('PAYROLL_FISCAL_YEAR_START_MONTH', '4'))
@@ -0,0 +1,284 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, F, Q, Sum
+
+from attendance.models import Attendance, ManualAttendanceRequest, Timesheet
+from attendance.services import AttendanceSummaryService
+from employees.models import Employee
+from holidays.services import CompanyCalendarService
+from leaves.models import Leave, LeaveBalance
+
+
+class EmployeeDashboardService:
+    """
+    Builds the employee landing dashboard.
+
+    The payload comes from the materialized month summary, one attendance query for
+    the 7-day graph, one LeaveBalance fetch and the in-memory holiday calendar. It
+    is cached per employee and day for DASHBOARD_CACHE_SECONDS in the shared cache,
+    so every web worker sees the same entry, and dropped whenever the employee's
+    attendance, leaves or balances change, or any holiday does (see
+    dashboard/signals.py). Bulk writes that skip signals (recalculate_attendance,
+    punch ingestion) are picked up when the entry expires.
+    """
+
+    GRAPH_DAYS = 7
+
+    @staticmethod
+    def cache_key(employee_id, today):
+        return f"dashboard:summary:{employee_id}:{today.isoformat()}"
+
+    @classmethod
+    def invalidate(cls, employee_id, today):
+        caches['shared'].delete(cls.cache_key(employee_id, today))
+
+    @classmethod
+    def invalidate_all(cls, today, batch_size=500):
+        """Drop every employee's dashboard for `today` (holidays are shown to everyone)"""
+        employee_ids = list(Employee.objects.values_list('id', flat=True))
+        for start in range(0, len(employee_ids), batch_size):
+            caches['shared'].delete_many([
+                cls.cache_key(employee_id, today) for employee_id in employee_ids[start:start + batch_size]
+            ])
+
+    @classmethod
+    def get_summary(cls, employee, today):
+        key = cls.cache_key(employee.pk, today)
+        data = caches['shared'].get(key)
+        if data is None:
+            data = cls.build(employee, today)
+            caches['shared'].set(key, data, getattr(settings, 'DASHBOARD_CACHE_SECONDS', 300))
+        return data
+
+    @classmethod
+    def build(cls, employee, today):
+        # 1. User Info
+        data = {
+            "user": {
+                "first_name": employee.first_name,
+                "full_name": employee.full_name,
+                "date": today.strftime("%B %d, %Y")
+            }
+        }
+
+        # 2. Monthly Attendance Summary (one row of the materialized month summary)
+        month_start = today.replace(day=1)
+        month_summary = AttendanceSummaryService.get_summary(employee, today.year, today.month)
+        effective_present = month_summary.present_records + (month_summary.half_day_records * 0.5)
+        business_days_till_today = CompanyCalendarService.working_days_between(month_start, today)
+        attendance_percentage = (effective_present / business_days_till_today * 100) if business_days_till_today > 0 else 0
+
+        # 3. Leave Balance Summary (one fetch, Casual Leave also carries the RH balance)
+        balances = list(LeaveBalance.objects.filter(employee=employee, year=today.year))
+        total_remaining = sum(float(b.available) for b in balances)
+        casual_balance = next((b for b in balances if b.leave_type == 'Casual Leave'), None)
+        if casual_balance:
+            total_remaining += float(casual_balance.rh_available)
+
+        data["overview"] = {
+            "monthly_attendance_pct": f"{int(attendance_percentage)}%",
+            "attendance_trend": "+2.4%",
+            "leave_balance": f"{int(total_remaining)} Days",
+            "tasks_completed": 28,
+            "tasks_trend": "+5%",
+            "employee_score": 4.8
+        }
+
+        # 4. Productivity Last 7 Days (one query for the whole window)
+        first_day = today - timedelta(days=cls.GRAPH_DAYS - 1)
+        worked_by_date = dict(
+            Attendance.objects.filter(employee=employee, date__range=(first_day, today))
+            .values_list('date', 'seconds_actual_worked_time')
+        )
+        last_7_days_graph = []
+        total_worked_seconds = 0
+        days_counted = 0
+        for offset in range(cls.GRAPH_DAYS):
+            day = first_day + timedelta(days=offset)
+            worked_seconds = worked_by_date.get(day) or 0
+            worked_hours = round(worked_seconds / 3600.0, 1)
+            last_7_days_graph.append({
+                "date": day.strftime("%b %d"),
+                "hours": worked_hours
+            })
+            if worked_hours > 0:
+                total_worked_seconds += worked_seconds
+                days_counted += 1
+
+        avg_hours = round((total_worked_seconds / 3600.0 / days_counted), 1) if days_counted > 0 else 0
+        data["productivity"] = {
+            "daily_average": f"{avg_hours}h",
+            "graph_data": last_7_days_graph
+        }
+
+        # 5. Detailed Leave Balance (Breakdown)
+        leave_breakdown = [{"label": b.leave_type, "value": float(b.available)} for b in balances]
+        if casual_balance:
+            leave_breakdown.append({
+                "label": "Restricted Holiday",
+                "value": float(casual_balance.rh_available)
+            })
+
+        data["leave_chart"] = {
+            "total_left": int(total_remaining),
+            "breakdown": leave_breakdown
+        }
+
+        # 6. Upcoming Holidays
+        data["upcoming_holidays"] = [
+            {
+                "name": name,
+                "type": "Company-wide Holiday",
+                "date": h_date.strftime("%b %d")
+            } for h_date, name in CompanyCalendarService.upcoming_holidays(today, 3)
+        ]
+
+        # 7. Performance Card
+        data["performance_widget"] = {
+            "title": "Top Performer!",
+            "message": f"Great job, {employee.first_name}! Your efficiency this week is 15% higher than the team average.",
+            "efficiency_gain": "15%"
+        }
+        return data
+
+
+class OrgDashboardService:
+    """
+    Organisation-wide numbers for HR.
+
+    Every section is a single GROUP BY / aggregate query over Employee,
+    Attendance, Leave and the approval tables, so the cost does not grow with
+    a Python loop over employees.
+    """
+
+    @staticmethod
+    def _scope(queryset, company_id, prefix=''):
+        queryset = queryset.filter(**{f'{prefix}is_active': True})
+        if company_id:
+            queryset = queryset.filter(**{f'{prefix}company_id': company_id})
+        return queryset
+
+    @classmethod
+    def headcount(cls, company_id=None):
+        employees = cls._scope(Employee.objects.all(), company_id).order_by()
+        by_department = list(
+            employees.values('department_id', name=F('department__name'))
+            .annotate(count=Count('id')).order_by('-count', 'name')
+        )
+        by_designation = list(
+            employees.values('designation_id', name=F('designation__name'))
+            .annotate(count=Count('id')).order_by('-count', 'name')
+        )
+        return {
+            "total": sum(row['count'] for row in by_department),
+            "by_department": by_department,
+            "by_designation": by_designation,
+        }
+
+    @classmethod
+    def today(cls, today, total, company_id=None):
+        attendance = cls._scope(Attendance.objects.filter(date=today), company_id, 'employee__')
+        # A HOME check-in stores home_in_time and leaves office_in_time empty
+        checked = Q(office_in_time__isnull=False) | Q(home_in_time__isnull=False)
+        wfh = Q(is_working_from_home=True) | Q(office_in_time__isnull=True)
+        counts = attendance.aggregate(
+            present=Count('id', filter=checked & ~wfh),
+            wfh=Count('id', filter=checked & wfh),
+        )
+        checked_in = attendance.filter(checked).values('employee_id')
+        on_leave = cls._scope(
+            Leave.objects.filter(status=Leave.Status.APPROVED, from_date__lte=today, to_date__gte=today),
+            company_id, 'employee__',
+        ).exclude(employee_id__in=checked_in).values('employee_id').distinct().count()
+
+        is_working_day = CompanyCalendarService.is_working_day(today)
+        absent = max(total - counts['present'] - counts['wfh'] - on_leave, 0) if is_working_day else 0
+        return {
+            "date": today.isoformat(),
+            "is_working_day": is_working_day,
+            "present": counts['present'],
+            "wfh": counts['wfh'],
+            "on_leave": on_leave,
+            "absent": absent,
+        }
+
+    @classmethod
+    def department_attendance(cls, today, by_department, company_id=None):
+        """Month-to-date attendance % per department (half days count 0.5)"""
+        month_start = today.replace(day=1)
+        working_days = CompanyCalendarService.working_days_between(month_start, today)
+        rows = cls._scope(
+            Attendance.objects.filter(date__gte=month_start, date__lte=today), company_id, 'employee__'
+        ).order_by().values('employee__department_id').annotate(
+            present=Count('id', filter=Q(day_type='WORKING_DAY')),
+            half=Count('id', filter=Q(day_type='HALF_DAY')),
+        )
+        present_by_department = {
+            row['employee__department_id']: row['present'] + row['half'] * 0.5 for row in rows
+        }
+
+        result = []
+        for department in by_department:
+            expected = department['count'] * working_days
+            present = present_by_department.get(department['department_id'], 0)
+            result.append({
+                "department_id": department['department_id'],
+                "name": department['name'],
+                "attendance_pct": round(present / expected * 100, 1) if expected else 0,
+            })
+        return result
+
+    @classmethod
+    def pending_approvals(cls, company_id=None):
+        return {
+            "leaves": cls._scope(Leave.objects.filter(status=Leave.Status.PENDING), company_id, 'employee__').count(),
+            "timesheets": cls._scope(Timesheet.objects.filter(status='pending'), company_id, 'employee__').count(),
+            "manual_attendance": cls._scope(
+                ManualAttendanceRequest.objects.filter(status='pending'), company_id, 'employee__'
+            ).count(),
+        }
+
+    @classmethod
+    def top_undertime(cls, today, company_id=None, limit=10):
+        """Employees with the most approved time to compensate this month, today excluded"""
+        rows = cls._scope(
+            Attendance.objects.filter(
+                date__gte=today.replace(day=1),
+                date__lt=today,
+                timesheet_status='APPROVED',
+                seconds_extra_time__lt=0,
+            ),
+            company_id, 'employee__',
+        ).order_by().values(
+            'employee_id',
+            code=F('employee__employee_id'),
+            first_name=F('employee__first_name'),
+            last_name=F('employee__last_name'),
+            department=F('employee__department__name'),
+        ).annotate(
+            seconds_to_compensate=Sum(F('seconds_extra_time') * -1),
+        ).order_by('-seconds_to_compensate', 'employee_id')[:limit]
+
+        return [
+            {
+                "employee_id": row['code'],
+                "name": f"{row['first_name']} {row['last_name']}".strip(),
+                "department": row['department'],
+                "seconds_to_compensate": row['seconds_to_compensate'],
+                "hours_to_compensate": round(row['seconds_to_compensate'] / 3600.0, 1),
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    def build(cls, today, company_id=None, limit=10):
+        headcount = cls.headcount(company_id)
+        return {
+            "headcount": headcount,
+            "today": cls.today(today, headcount['total'], company_id),
+            "department_attendance": cls.department_attendance(today, headcount['by_department'], company_id),
+            "pending_approvals": cls.pending_approvals(company_id),
+            "top_undertime": cls.top_undertime(today, company_id, limit),
+        }
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from attendance.models import Attendance
+from employees.models import Employee
+from holidays.models import Holiday
+from leaves.models import Leave, LeaveBalance
+from .services import EmployeeDashboardService
+
+
+def _invalidate(employee_id):
+    today = timezone.now().date()
+    EmployeeDashboardService.invalidate(employee_id, today)
+    # Again on commit, so a dashboard built from pre-commit data is not kept.
+    transaction.on_commit(lambda: EmployeeDashboardService.invalidate(employee_id, today))
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=Leave)
+@receiver(post_delete, sender=Leave)
+@receiver(post_save, sender=LeaveBalance)
+@receiver(post_delete, sender=LeaveBalance)
+def invalidate_dashboard_on_change(sender, instance, **kwargs):
+    """Drop the cached dashboard of the employee whose attendance or leaves changed"""
+    _invalidate(instance.employee_id)
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_dashboard_on_employee_change(sender, instance, created, **kwargs):
+    if not created:
+        _invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_dashboards_on_holiday_change(sender, instance, **kwargs):
+    """Every dashboard lists the upcoming holidays, so drop all of today's entries"""
+    today = timezone.now().date()
+    EmployeeDashboardService.invalidate_all(today)
+    transaction.on_commit(lambda: EmployeeDashboardService.invalidate_all(today))
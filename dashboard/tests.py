@@ -1,3 +1,183 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import caches
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendance.models import Attendance
+from auth_app.models import User
+from departments.models import Department, Designation
+from employees.models import Employee
+from holidays.models import Holiday
+from holidays.services import CompanyCalendarService
+from leaves.models import LeaveBalance
+
+
+class DashboardSummaryTest(TestCase):
+    """Test cases for the cached employee dashboard"""
+
+    def setUp(self):
+        """Set up test data"""
+        caches['shared'].clear()
+        CompanyCalendarService.invalidate()
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.user = User.objects.create_user(username="dash", email="dash@example.com", password="pass")
+        self.employee = Employee.objects.create(
+            user=self.user,
+            employee_id="EMP-D001",
+            first_name="Dash",
+            last_name="Board",
+            email="dash-emp@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+        self.today = timezone.now().date()
+        LeaveBalance.objects.create(
+            employee=self.employee, leave_type='Casual Leave', year=self.today.year,
+            total_allocated=12, used=2, rh_allocated=2,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def check_in(self, day):
+        return Attendance.objects.create(
+            employee=self.employee,
+            date=day,
+            office_working_hours="09:00",
+            office_in_time=timezone.make_aware(datetime.combine(day, time(9, 0))),
+            office_out_time=timezone.make_aware(datetime.combine(day, time(17, 0))),
+        )
+
+    def test_summary_is_cached(self):
+        """Test the second request is answered from the cache"""
+        first = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data["data"]["leave_chart"]["total_left"], 12)
+        self.assertEqual(len(first.data["data"]["productivity"]["graph_data"]), 7)
+
+        # One read of the shared cache, nothing rebuilt
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(second.data, first.data)
+
+    def test_attendance_and_balance_writes_invalidate(self):
+        """Test the dashboard reflects new attendance and balance changes"""
+        self.client.get('/api/dashboard/summary/')
+        self.check_in(self.today)
+        graph = self.client.get('/api/dashboard/summary/').data["data"]["productivity"]["graph_data"]
+        self.assertGreater(graph[-1]["hours"], 0)
+
+        balance = LeaveBalance.objects.get(employee=self.employee)
+        balance.used = 5
+        balance.save()
+        chart = self.client.get('/api/dashboard/summary/').data["data"]["leave_chart"]
+        self.assertEqual(chart["total_left"], 9)
+
+    def test_summary_is_shared_across_processes(self):
+        """Test a worker that did not build the entry still serves it"""
+        first = self.client.get('/api/dashboard/summary/')
+        caches['default'].clear()
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/dashboard/summary/')
+        self.assertEqual(second.data, first.data)
+
+    def test_holiday_writes_invalidate(self):
+        """Test a new upcoming holiday shows on an already cached dashboard"""
+        self.client.get('/api/dashboard/summary/')
+        holiday = Holiday.objects.create(name="Founders Day", date=self.today + timedelta(days=1))
+        holidays = self.client.get('/api/dashboard/summary/').data["data"]["upcoming_holidays"]
+        self.assertIn("Founders Day", [h["name"] for h in holidays])
+
+        holiday.delete()
+        holidays = self.client.get('/api/dashboard/summary/').data["data"]["upcoming_holidays"]
+        self.assertNotIn("Founders Day", [h["name"] for h in holidays])
+
+
+class OrgSummaryTest(TestCase):
+    """Test cases for the HR organisation dashboard"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        self.engineering = Department.objects.create(name="Engineering", code="ENG")
+        self.sales = Department.objects.create(name="Sales", code="SAL")
+        developer = Designation.objects.create(name="Developer", department=self.engineering)
+        seller = Designation.objects.create(name="Seller", department=self.sales)
+        admin = User.objects.create_user(username="hr", email="hr@example.com", password="pass", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.day = date(2025, 12, 3)  # Wednesday
+
+        self.employees = []
+        for index, (department, designation) in enumerate(
+            [(self.engineering, developer), (self.engineering, developer), (self.sales, seller), (self.sales, seller)]
+        ):
+            self.employees.append(Employee.objects.create(
+                employee_id=f"EMP-O00{index}",
+                first_name=f"Org{index}",
+                last_name="Test",
+                email=f"org{index}@example.com",
+                phone="+919999999999",
+                department=department,
+                designation=designation,
+                joining_date=date(2025, 1, 1),
+            ))
+
+    def check_in(self, employee, day, hours=8, wfh=False):
+        # Mirrors the check-in endpoint: a HOME check-in only fills the home times
+        start = timezone.make_aware(datetime.combine(day, time(9, 0)))
+        end = timezone.make_aware(datetime.combine(day, time(9 + hours, 0)))
+        return Attendance.objects.create(
+            employee=employee,
+            date=day,
+            office_working_hours="09:00",
+            is_working_from_home=wfh,
+            office_in_time=None if wfh else start,
+            office_out_time=None if wfh else end,
+            home_in_time=start if wfh else None,
+            home_out_time=end if wfh else None,
+        )
+
+    def test_org_summary_counts(self):
+        """Test headcount, today's split, approvals and undertime"""
+        from leaves.models import Leave
+
+        self.check_in(self.employees[0], self.day)
+        self.check_in(self.employees[1], self.day, wfh=True)
+        self.check_in(self.employees[0], date(2025, 12, 1), hours=6)
+        self.check_in(self.employees[2], date(2025, 12, 2), hours=9)
+        Leave.objects.create(
+            employee=self.employees[2], leave_type='Casual Leave', from_date=self.day, to_date=self.day,
+            reason="Trip", status=Leave.Status.APPROVED,
+        )
+        Leave.objects.create(
+            employee=self.employees[3], leave_type='Casual Leave', from_date=date(2025, 12, 20),
+            to_date=date(2025, 12, 20), reason="Later",
+        )
+
+        with self.assertNumQueries(9):
+            response = self.client.get('/api/dashboard/org-summary/', {'date': '2025-12-03'})
+        self.assertEqual(response.status_code, 200)
+        data = response.data["data"]
+
+        self.assertEqual(data["headcount"]["total"], 4)
+        self.assertEqual({row["name"]: row["count"] for row in data["headcount"]["by_department"]},
+                         {"Engineering": 2, "Sales": 2})
+        self.assertEqual(
+            {key: data["today"][key] for key in ("present", "wfh", "on_leave", "absent")},
+            {"present": 1, "wfh": 1, "on_leave": 1, "absent": 1},
+        )
+        self.assertEqual(data["pending_approvals"]["leaves"], 1)
+        pct = {row["name"]: row["attendance_pct"] for row in data["department_attendance"]}
+        self.assertEqual(pct["Engineering"], 50.0)  # 3 of 2 people x 3 working days
+        self.assertEqual([row["employee_id"] for row in data["top_undertime"]], ["EMP-O000"])
 
-# Create your tests here.
+    def test_requires_staff(self):
+        """Test employees cannot open the org dashboard"""
+        user = User.objects.create_user(username="plain", email="plain@example.com", password="pass")
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/api/dashboard/org-summary/').status_code, 403)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import DashboardSummaryView
+from .views import DashboardSummaryView, OrgSummaryView
 
 urlpatterns = [
     path('summary/', DashboardSummaryView.as_view(), name='dashboard-summary'),
+    path('org-summary/', OrgSummaryView.as_view(), name='dashboard-org-summary'),
 ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0003_alter_department_manager_and_more'),
+        ('employees', '0004_alter_employee_photo'),
+        ('organizations', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['-created_at', '-id'], name='employees_e_created_eb172e_idx'),
+        ),
+    ]
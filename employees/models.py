@@ -237,6 +237,7 @@ class Employee(models.Model):
             models.Index(fields=['email']),
             models.Index(fields=['employment_status']),
             models.Index(fields=['department', 'designation']),
+            models.Index(fields=['-created_at', '-id']),
         ]
         verbose_name = 'Employee'
         verbose_name_plural = 'Employees'
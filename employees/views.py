@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.filters import SearchFilter, OrderingFilter
+from config.pagination import KeysetPaginationMixin
 
 
 # Optional django-filter import
@@ -30,7 +31,7 @@ from rest_framework.exceptions import PermissionDenied
 
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for Employee management
     
@@ -61,6 +62,7 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         'joining_date', 'created_at'
     ]
     ordering = ['-created_at']
+    keyset_ordering = ['-created_at', '-id']
     
     # def get_serializer_class(self):
     #     """Use different serializers based on action"""
@@ -81,6 +81,14 @@ class Holiday(models.Model):
             models.Index(fields=['is_active']),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Date as loaded, so moving a holiday also refreshes its old month's summaries
+        if 'date' in field_names:
+            instance._loaded_date = values[field_names.index('date')]
+        return instance
+
     def __str__(self):
         return f"{self.name} ({self.date})"
 
@@ -0,0 +1,130 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Holiday
+
+
+class _YearIndex:
+    """Active holidays of one (year, region), held in memory"""
+
+    def __init__(self, rows):
+        self.names = {}
+        for holiday_date, name in rows:
+            self.names[holiday_date] = name
+        self.dates = sorted(self.names)
+        self.weekday_dates = [d for d in self.dates if d.weekday() < 5]
+        self.loaded_at = time.monotonic()
+
+
+class CompanyCalendarService:
+    """
+    Shared business-day calendar.
+
+    Active Holiday rows are loaded once per (year, region) into a process-local
+    index. Lookups are answered from memory: single days in O(1), ranges in
+    O(log n) using bisect over the sorted holiday dates.
+
+    region=None means every active holiday (the historical behaviour);
+    a region name means national holidays plus the ones for that region.
+    Entries are dropped when a Holiday is saved or deleted, and expire after
+    HOLIDAY_CALENDAR_CACHE_SECONDS so other worker processes pick up edits.
+    """
+
+    _lock = threading.Lock()
+    _index = {}
+
+    @classmethod
+    def _year(cls, year, region=None):
+        key = (year, region)
+        ttl = getattr(settings, 'HOLIDAY_CALENDAR_CACHE_SECONDS', 300)
+        entry = cls._index.get(key)
+        if entry is not None and time.monotonic() - entry.loaded_at < ttl:
+            return entry
+
+        holidays = Holiday.objects.filter(date__year=year, is_active=True)
+        if region is not None:
+            holidays = holidays.filter(region__in=['', region])
+        entry = _YearIndex(holidays.order_by('date', 'name').values_list('date', 'name'))
+
+        with cls._lock:
+            cls._index[key] = entry
+        return entry
+
+    @classmethod
+    def invalidate(cls):
+        """Drop every loaded year so the next lookup reloads from the database"""
+        with cls._lock:
+            cls._index.clear()
+
+    @staticmethod
+    def is_weekend(day):
+        return day.weekday() >= 5  # Saturday=5, Sunday=6
+
+    @classmethod
+    def holiday_name(cls, day, region=None):
+        """Name of the active holiday on `day`, or None"""
+        return cls._year(day.year, region).names.get(day)
+
+    @classmethod
+    def is_holiday(cls, day, region=None):
+        return day in cls._year(day.year, region).names
+
+    @classmethod
+    def is_working_day(cls, day, region=None):
+        return not cls.is_weekend(day) and not cls.is_holiday(day, region)
+
+    @classmethod
+    def holidays_in_range(cls, start_date, end_date, region=None):
+        """Return {date: name} for active holidays between start_date and end_date (inclusive)"""
+        result = {}
+        for year in range(start_date.year, end_date.year + 1):
+            entry = cls._year(year, region)
+            lo = bisect.bisect_left(entry.dates, start_date)
+            hi = bisect.bisect_right(entry.dates, end_date)
+            for holiday_date in entry.dates[lo:hi]:
+                result[holiday_date] = entry.names[holiday_date]
+        return result
+
+    @classmethod
+    def working_days_between(cls, start_date, end_date, region=None):
+        """Count Monday-Friday dates that are not holidays, both ends inclusive"""
+        if end_date < start_date:
+            return 0
+
+        working_days = count_weekdays(start_date, end_date)
+        for year in range(start_date.year, end_date.year + 1):
+            entry = cls._year(year, region)
+            lo = bisect.bisect_left(entry.weekday_dates, start_date)
+            hi = bisect.bisect_right(entry.weekday_dates, end_date)
+            working_days -= hi - lo
+        return working_days
+
+    @classmethod
+    def upcoming_holidays(cls, from_date, limit, region=None):
+        """Return up to `limit` (date, name) pairs on or after from_date (this and next year)"""
+        upcoming = []
+        for year in (from_date.year, from_date.year + 1):
+            entry = cls._year(year, region)
+            lo = bisect.bisect_left(entry.dates, from_date)
+            for holiday_date in entry.dates[lo:]:
+                upcoming.append((holiday_date, entry.names[holiday_date]))
+                if len(upcoming) >= limit:
+                    return upcoming
+        return upcoming
+
+
+def count_weekdays(start_date, end_date):
+    """Number of Monday-Friday dates between start_date and end_date (inclusive), in O(1)"""
+    if end_date < start_date:
+        return 0
+    total_days = (end_date - start_date).days + 1
+    full_weeks, extra_days = divmod(total_days, 7)
+    count = full_weeks * 5
+    first_weekday = start_date.weekday()
+    for offset in range(extra_days):
+        if (first_weekday + offset) % 7 < 5:
+            count += 1
+    return count
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Holiday
+from .services import CompanyCalendarService
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_calendar_on_holiday_change(sender, instance, **kwargs):
+    """
+    Drop the in-memory holiday index whenever a holiday changes.
+    Invalidated again on commit so a concurrent reload cannot keep pre-commit data.
+    """
+    CompanyCalendarService.invalidate()
+    transaction.on_commit(CompanyCalendarService.invalidate)
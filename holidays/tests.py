@@ -1,6 +1,9 @@
+from datetime import date
+
 from django.test import TestCase
 from django.utils import timezone
 from .models import Holiday
+from .services import CompanyCalendarService
 
 
 class HolidayModelTest(TestCase):
@@ -27,3 +30,40 @@ class HolidayModelTest(TestCase):
         self.assertEqual(str(self.holiday), expected)
 
 
+class CompanyCalendarServiceTest(TestCase):
+    """Test cases for the in-memory company calendar"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        Holiday.objects.create(name="Christmas", date=date(2025, 12, 25))  # Thursday
+        Holiday.objects.create(name="Boxing Day", date=date(2025, 12, 27))  # Saturday
+
+    def test_working_days_between(self):
+        """Test weekends and weekday holidays are excluded"""
+        # December 2025 has 23 weekdays, one of them a holiday
+        self.assertEqual(
+            CompanyCalendarService.working_days_between(date(2025, 12, 1), date(2025, 12, 31)), 22
+        )
+        self.assertEqual(
+            CompanyCalendarService.working_days_between(date(2025, 12, 29), date(2026, 1, 2)), 5
+        )
+
+    def test_lookups_hit_database_once_per_year(self):
+        """Test repeated lookups are answered from memory"""
+        with self.assertNumQueries(1):
+            for day in range(1, 32):
+                CompanyCalendarService.is_working_day(date(2025, 12, day))
+            self.assertEqual(CompanyCalendarService.holiday_name(date(2025, 12, 25)), "Christmas")
+            self.assertEqual(
+                list(CompanyCalendarService.holidays_in_range(date(2025, 12, 1), date(2025, 12, 26))),
+                [date(2025, 12, 25)]
+            )
+
+    def test_holiday_save_invalidates_index(self):
+        """Test saving or deleting a holiday is visible immediately"""
+        self.assertTrue(CompanyCalendarService.is_working_day(date(2025, 12, 26)))
+        holiday = Holiday.objects.create(name="Extra Day", date=date(2025, 12, 26))
+        self.assertFalse(CompanyCalendarService.is_working_day(date(2025, 12, 26)))
+        holiday.delete()
+        self.assertTrue(CompanyCalendarService.is_working_day(date(2025, 12, 26)))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_employee_keyset_index'),
+        ('inventory', '0003_devicecomment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['-created_at', '-id'], name='inventory_d_created_0de1d8_idx'),
+        ),
+    ]
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.utils import timezone
 from django.db.models import Count, Q
+from config.pagination import KeysetPaginationMixin
 
 # Optional django-filter import
 try:
@@ -119,7 +120,7 @@ class DeviceTypeViewSet(viewsets.ModelViewSet):
         })
 
 
-class DeviceViewSet(viewsets.ModelViewSet):
+class DeviceViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet for Device management
     
@@ -147,6 +148,7 @@ class DeviceViewSet(viewsets.ModelViewSet):
         'purchase_date', 'created_at'
     ]
     ordering = ['-created_at']
+    keyset_ordering = ['-created_at', '-id']
 
     def get_serializer_class(self):
         """Use different serializers based on action"""
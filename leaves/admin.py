@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Leave, LeaveQuota, LeaveBalance, RestrictedHoliday
+from .models import Leave, LeaveQuota, LeaveBalance, LeaveLedgerEntry, RestrictedHoliday
 
 @admin.register(Leave)
 class LeaveAdmin(admin.ModelAdmin):
@@ -94,3 +94,22 @@ class RestrictedHolidayAdmin(admin.ModelAdmin):
             'fields': ('name', 'date', 'description', 'is_active')
         }),
     )
+
+
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('balance', 'entry_type', 'leave', 'pending_delta', 'used_delta',
+                    'rh_pending_delta', 'rh_used_delta', 'created_at')
+    list_filter = ('entry_type', 'balance__year', 'balance__leave_type')
+    search_fields = ('balance__employee__first_name', 'balance__employee__email', 'note')
+    raw_id_fields = ('balance', 'leave')
+
+    # Append-only: entries are written by the balance signals, never edited
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,36 @@
+"""
+Management command to rebuild LeaveBalance counters from the leave ledger.
+
+pending / used / rh_pending / rh_used are set to the sum of each balance's
+LeaveLedgerEntry rows; balances that already match are left alone.
+
+Usage:
+    # Report and fix every balance
+    python manage.py reconcile_leave_balances
+
+    # Only report the differences for one year
+    python manage.py reconcile_leave_balances --year 2025 --dry-run
+"""
+from django.core.management.base import BaseCommand
+from leaves.services import LeaveLedgerService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild leave balance counters from LeaveLedgerEntry rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Only balances of this year')
+        parser.add_argument('--dry-run', action='store_true', help='Report differences without writing')
+
+    def handle(self, *args, **options):
+        mismatched = LeaveLedgerService.reconcile(year=options['year'], dry_run=options['dry_run'])
+
+        for balance, stored, ledger in mismatched:
+            self.stdout.write(
+                f'{balance.employee_id} {balance.leave_type} {balance.year}: '
+                f'stored (pending, used, rh_pending, rh_used)={tuple(str(v) for v in stored)} '
+                f'ledger={tuple(str(v) for v in ledger)}'
+            )
+
+        verb = 'would be fixed' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{len(mismatched)} balances {verb}'))
@@ -0,0 +1,53 @@
+"""
+Management command to create next year's leave balances.
+
+Allocations come from the LeaveQuota rows effective on 1 January of the target
+year, plus the carry-forward of the previous year's unused balance (capped by
+carry_forward_limit). Existing balances are left untouched, so re-running is safe.
+
+Usage:
+    # Create balances for next year
+    python manage.py rollover_leave_year
+
+    # Preview a specific year for one company
+    python manage.py rollover_leave_year --year 2026 --company 1 --dry-run
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from leaves.services import LeaveRolloverService
+
+
+class Command(BaseCommand):
+    help = 'Create LeaveBalance rows for a new year from quotas and carry-forward'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Year to create (default: next year)')
+        parser.add_argument('--company', type=int, help='Only employees of this company ID')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be created without writing')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT (default: 1000)')
+
+    def handle(self, *args, **options):
+        year = options['year'] or timezone.now().year + 1
+        result = LeaveRolloverService.run(
+            year,
+            company_id=options['company'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+
+        if options['dry_run']:
+            for balance in result['planned'][:20]:
+                self.stdout.write(
+                    f'{balance.employee_id} {balance.leave_type}: {balance.total_allocated} '
+                    f'(carried forward {balance.carried_forward})'
+                )
+            if len(result['planned']) > 20:
+                self.stdout.write(f"... and {len(result['planned']) - 20} more")
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(result['planned'])} balances would be created for {year} ({result['existing']} already exist)"
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result['created']} balances for {year} ({result['existing']} already existed)"
+        ))
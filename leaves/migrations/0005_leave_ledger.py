@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_opening_entries(apps, schema_editor):
+    """Seed the ledger with each existing balance's counters"""
+    LeaveBalance = apps.get_model('leaves', 'LeaveBalance')
+    LeaveLedgerEntry = apps.get_model('leaves', 'LeaveLedgerEntry')
+    entries = [
+        LeaveLedgerEntry(
+            balance_id=balance.id,
+            entry_type='opening',
+            pending_delta=balance.pending,
+            used_delta=balance.used,
+            rh_pending_delta=balance.rh_pending,
+            rh_used_delta=balance.rh_used,
+            note='Balance before the ledger was introduced',
+        )
+        for balance in LeaveBalance.objects.all().iterator()
+        if balance.pending or balance.used or balance.rh_pending or balance.rh_used
+    ]
+    LeaveLedgerEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0004_leavebalance_rh_pending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('opening', 'Opening balance'), ('applied', 'Leave applied'), ('approved', 'Leave approved'), ('rejected', 'Leave rejected'), ('cancelled', 'Leave cancelled'), ('adjustment', 'Manual adjustment')], max_length=20)),
+                ('transition_key', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('pending_delta', models.DecimalField(decimal_places=1, default=0, max_digits=5)),
+                ('used_delta', models.DecimalField(decimal_places=1, default=0, max_digits=5)),
+                ('rh_pending_delta', models.IntegerField(default=0)),
+                ('rh_used_delta', models.IntegerField(default=0)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('balance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='leaves.leavebalance')),
+                ('leave', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='leaves.leave')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(create_opening_entries, migrations.RunPython.noop),
+    ]
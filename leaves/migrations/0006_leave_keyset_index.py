@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_employee_keyset_index'),
+        ('leaves', '0005_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leave',
+            index=models.Index(fields=['-created_at', '-id'], name='leaves_leav_created_eca7fa_idx'),
+        ),
+    ]
@@ -69,6 +69,22 @@ class Leave(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as loaded, so the ledger can see the transition without re-reading the row
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        # Dates as loaded, so month summaries of a moved leave's old months are refreshed too
+        if 'from_date' in field_names and 'to_date' in field_names:
+            instance._loaded_dates = (
+                values[field_names.index('from_date')], values[field_names.index('to_date')]
+            )
+        return instance
 
     def __str__(self):
         return f"{self.employee} - {self.leave_type} ({self.from_date} to {self.to_date})"
@@ -184,10 +200,23 @@ class LeaveBalance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    COUNTER_FIELDS = ('pending', 'used', 'rh_pending', 'rh_used')
+
     class Meta:
         ordering = ['-year', 'employee']
         unique_together = ['employee', 'leave_type', 'year']
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Counters as loaded, so a plain save() can be recorded as a ledger adjustment
+        if all(field in field_names for field in cls.COUNTER_FIELDS):
+            instance._ledger_snapshot = instance.counters()
+        return instance
+
+    def counters(self):
+        return tuple(getattr(self, field) for field in self.COUNTER_FIELDS)
+
     @property
     def available(self):
         """Calculate available leaves"""
@@ -202,6 +231,49 @@ class LeaveBalance(models.Model):
         return f"{self.employee} - {self.leave_type} ({self.year}): {self.available}/{self.total_allocated}"
 
 
+class LeaveLedgerEntry(models.Model):
+    """
+    Append-only history of LeaveBalance counter changes.
+
+    Every change to pending/used/rh_pending/rh_used is written here, so a
+    balance always equals the sum of its entries (see reconcile_leave_balances).
+    Leave transitions carry a unique transition_key naming the statuses left
+    and entered, which makes applying the same transition twice (e.g.
+    concurrent approvals) a no-op.
+    """
+
+    class EntryType(models.TextChoices):
+        OPENING = 'opening', _('Opening balance')
+        APPLIED = 'applied', _('Leave applied')
+        APPROVED = 'approved', _('Leave approved')
+        REJECTED = 'rejected', _('Leave rejected')
+        CANCELLED = 'cancelled', _('Leave cancelled')
+        ADJUSTMENT = 'adjustment', _('Manual adjustment')
+
+    balance = models.ForeignKey(LeaveBalance, on_delete=models.CASCADE, related_name='ledger_entries')
+    leave = models.ForeignKey(
+        Leave,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ledger_entries'
+    )
+    entry_type = models.CharField(max_length=20, choices=EntryType.choices)
+    transition_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    pending_delta = models.DecimalField(max_digits=5, decimal_places=1, default=0)
+    used_delta = models.DecimalField(max_digits=5, decimal_places=1, default=0)
+    rh_pending_delta = models.IntegerField(default=0)
+    rh_used_delta = models.IntegerField(default=0)
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.balance} - {self.get_entry_type_display()}"
+
+
 class RestrictedHoliday(models.Model):
     """
     Restricted Holidays (RH) that employees can choose to take.
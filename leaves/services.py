@@ -0,0 +1,311 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, F, IntegerField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class LeaveDateIndex:
+    """
+    Date -> leave lookup built once per request.
+
+    Expands each leave into the days it covers (clipped to the optional window),
+    with Restricted Holiday dates and partial-day flags resolved up front, so a
+    day lookup is a dict access instead of a scan over every leave.
+    Like the linear scan it replaces, the first leave in iteration order wins
+    when leaves overlap.
+    """
+
+    EMPTY = (None, False, False, None)
+
+    def __init__(self, leaves, start_date=None, end_date=None):
+        self._days = {}
+        for leave in leaves:
+            rh_dates = {str(d) for d in (leave.rh_dates or [])}
+            day = max(leave.from_date, start_date) if start_date else leave.from_date
+            last = min(leave.to_date, end_date) if end_date else leave.to_date
+            while day <= last:
+                if day not in self._days:
+                    if str(day) in rh_dates:
+                        self._days[day] = (leave, True, False, None)
+                    elif leave.day_status:
+                        self._days[day] = (leave, False, True, leave.day_status)
+                    else:
+                        self._days[day] = (leave, False, False, None)
+                day += timedelta(days=1)
+
+    @classmethod
+    def build(cls, leaves, start_date=None, end_date=None):
+        """Return `leaves` unchanged if it already is an index, else index it"""
+        if isinstance(leaves, cls):
+            return leaves
+        return cls(leaves, start_date, end_date)
+
+    def lookup(self, day):
+        """(leave, is_rh, is_partial, partial_type) for `day`"""
+        return self._days.get(day, self.EMPTY)
+
+    def leave_on(self, day):
+        """Leave covering `day`, or None"""
+        return self._days.get(day, self.EMPTY)[0]
+
+    def items(self):
+        """(date, leave) pairs for every indexed day"""
+        return ((day, entry[0]) for day, entry in self._days.items())
+
+    def __contains__(self, day):
+        return day in self._days
+
+    def __len__(self):
+        return len(self._days)
+
+
+class LeaveLedgerService:
+    """
+    Keeps LeaveBalance counters in step with leave status changes.
+
+    Each transition appends a LeaveLedgerEntry and moves the counters with one
+    F() UPDATE in the same transaction, so concurrent approvals cannot lose
+    updates. Transitions of one leave are serialized by locking its row; the
+    step applied runs from the status the ledger last recorded to the status
+    the row holds now, so when two requests race (Approve vs Reject) the
+    ledger follows whichever write landed last. The entry's transition_key
+    names both statuses and is unique, so repeating a step is a no-op.
+    """
+
+    # entry type -> status the leave is in once the entry is applied
+    ENTRY_STATUS = {
+        'applied': 'Pending',
+        'approved': 'Approved',
+        'rejected': 'Rejected',
+        'cancelled': 'Cancelled',
+    }
+
+    PENDING = 'Pending'
+    APPROVED = 'Approved'
+    REJECTED = 'Rejected'
+    CANCELLED = 'Cancelled'
+
+    # (old status, new status) -> (entry type, pending sign, used sign)
+    TRANSITIONS = {
+        (None, PENDING): ('applied', 1, 0),
+        (None, APPROVED): ('approved', 0, 1),
+        (PENDING, APPROVED): ('approved', -1, 1),
+        (PENDING, REJECTED): ('rejected', -1, 0),
+        (PENDING, CANCELLED): ('cancelled', -1, 0),
+        (APPROVED, CANCELLED): ('cancelled', 0, -1),
+    }
+
+    @staticmethod
+    def balance_key(leave):
+        """(leave_type, year) of the balance a leave counts against; RH is tracked on Casual Leave"""
+        leave_type = 'Casual Leave' if leave.leave_type == 'Restricted Holiday' else leave.leave_type
+        return leave_type, leave.from_date.year
+
+    @classmethod
+    def deltas(cls, leave, pending_sign, used_sign):
+        if leave.leave_type == 'Restricted Holiday':
+            days = int(leave.no_of_days)
+            return {'rh_pending_delta': pending_sign * days, 'rh_used_delta': used_sign * days}
+        days = Decimal(leave.no_of_days)
+        return {'pending_delta': pending_sign * days, 'used_delta': used_sign * days}
+
+    @staticmethod
+    def _apply(balance_id, deltas):
+        changes = {
+            field.replace('_delta', ''): F(field.replace('_delta', '')) + value
+            for field, value in deltas.items() if value
+        }
+        if changes:
+            from .models import LeaveBalance
+            LeaveBalance.objects.filter(pk=balance_id).update(updated_at=timezone.now(), **changes)
+
+    @classmethod
+    def record_transition(cls, leave, old_status, new_status):
+        """
+        Apply a leave status change to its balance; returns the ledger entry or None.
+
+        `old_status` is only used for leaves with no transition in the ledger
+        yet; otherwise the step is taken from the ledger and the locked row.
+        """
+        from .models import Leave, LeaveBalance, LeaveLedgerEntry
+
+        leave_type, year = cls.balance_key(leave)
+        balance_id = LeaveBalance.objects.filter(
+            employee_id=leave.employee_id, leave_type=leave_type, year=year
+        ).values_list('id', flat=True).first()
+        if balance_id is None:
+            return None
+
+        with transaction.atomic():
+            current = Leave.objects.select_for_update().filter(
+                pk=leave.pk
+            ).values_list('status', flat=True).first()
+            if current is None:
+                return None
+            last_entry = LeaveLedgerEntry.objects.filter(
+                leave_id=leave.pk, transition_key__isnull=False
+            ).order_by('-id').values_list('entry_type', flat=True).first()
+            if last_entry is not None:
+                old_status = cls.ENTRY_STATUS[last_entry]
+            new_status = current
+
+            rule = cls.TRANSITIONS.get((old_status, new_status))
+            if rule is None:
+                return None
+            entry_type, pending_sign, used_sign = rule
+
+            deltas = cls.deltas(leave, pending_sign, used_sign)
+            try:
+                with transaction.atomic():
+                    entry = LeaveLedgerEntry.objects.create(
+                        balance_id=balance_id,
+                        leave=leave,
+                        entry_type=entry_type,
+                        transition_key=f"leave:{leave.pk}:{old_status or 'new'}:{new_status}",
+                        **deltas
+                    )
+            except IntegrityError:
+                # Already applied by a concurrent request
+                return None
+            cls._apply(balance_id, deltas)
+        return entry
+
+    @classmethod
+    def record_adjustment(cls, balance, before, entry_type='adjustment', note=''):
+        """Ledger entry for counters changed by saving the balance row itself"""
+        from .models import LeaveLedgerEntry
+
+        deltas = {
+            f'{field}_delta': after - previous
+            for field, previous, after in zip(balance.COUNTER_FIELDS, before, balance.counters())
+        }
+        if not any(deltas.values()):
+            return None
+        return LeaveLedgerEntry.objects.create(balance=balance, entry_type=entry_type, note=note, **deltas)
+
+    @classmethod
+    def reconcile(cls, year=None, dry_run=False):
+        """
+        Recompute every balance's counters as the sum of its ledger entries.
+        Returns the list of (balance, stored counters, ledger counters) that differed.
+        """
+        from .models import LeaveBalance
+
+        decimal_zero = Value(Decimal('0'), output_field=DecimalField(max_digits=7, decimal_places=1))
+        balances = LeaveBalance.objects.annotate(
+            ledger_pending=Coalesce(Sum('ledger_entries__pending_delta'), decimal_zero),
+            ledger_used=Coalesce(Sum('ledger_entries__used_delta'), decimal_zero),
+            ledger_rh_pending=Coalesce(Sum('ledger_entries__rh_pending_delta'), Value(0, output_field=IntegerField())),
+            ledger_rh_used=Coalesce(Sum('ledger_entries__rh_used_delta'), Value(0, output_field=IntegerField())),
+        ).order_by('id')
+        if year:
+            balances = balances.filter(year=year)
+
+        mismatched = []
+        for balance in balances:
+            ledger = tuple(getattr(balance, f'ledger_{field}') for field in balance.COUNTER_FIELDS)
+            stored = balance.counters()
+            if ledger != stored:
+                mismatched.append((balance, stored, ledger))
+                for field, value in zip(balance.COUNTER_FIELDS, ledger):
+                    setattr(balance, field, value)
+
+        if mismatched and not dry_run:
+            # bulk_update skips post_save, so the fix is not itself recorded as an adjustment
+            LeaveBalance.objects.bulk_update(
+                [balance for balance, _, _ in mismatched], list(LeaveBalance.COUNTER_FIELDS), batch_size=500
+            )
+        return mismatched
+
+
+class LeaveRolloverService:
+    """
+    Creates next year's LeaveBalance rows for every active employee.
+
+    Uses a fixed number of queries regardless of head count: the quotas effective
+    on 1 January, the previous year's balances, the balances that already exist
+    for the new year, and one bulk_create between two counts of the new rows,
+    all three in one transaction. For each (employee, leave_type) with a quota:
+        carried_forward = min(max(previous available, 0), carry_forward_limit)
+        total_allocated = yearly_quota + carried_forward
+    Restricted Holidays are allocated on the Casual Leave row (rh_quota).
+    Existing rows are never touched, so the job can be re-run safely.
+    """
+
+    @staticmethod
+    def effective_quotas(year, company_id=None):
+        """{(employee_id, leave_type): LeaveQuota} in force on 1 January of `year`"""
+        from django.db.models import Q
+        from .models import LeaveQuota
+
+        first_day = date(year, 1, 1)
+        quotas = LeaveQuota.objects.filter(
+            Q(effective_to__isnull=True) | Q(effective_to__gte=first_day),
+            effective_from__lte=first_day,
+            employee__is_active=True,
+        )
+        if company_id:
+            quotas = quotas.filter(employee__company_id=company_id)
+
+        effective = {}
+        # Latest effective_from wins when several quotas overlap
+        for quota in quotas.order_by('employee_id', 'leave_type', '-effective_from', '-id'):
+            effective.setdefault((quota.employee_id, quota.leave_type), quota)
+        return effective
+
+    @classmethod
+    def plan(cls, year, company_id=None):
+        """Unsaved LeaveBalance rows for `year`, plus the number of rows that already exist"""
+        from .models import LeaveBalance
+
+        quotas = cls.effective_quotas(year, company_id)
+        employee_ids = {employee_id for employee_id, _ in quotas}
+
+        previous = {
+            (row[0], row[1]): row[2] - row[3] - row[4]
+            for row in LeaveBalance.objects.filter(year=year - 1, employee_id__in=employee_ids)
+            .values_list('employee_id', 'leave_type', 'total_allocated', 'used', 'pending')
+        }
+        existing = set(
+            LeaveBalance.objects.filter(year=year, employee_id__in=employee_ids)
+            .values_list('employee_id', 'leave_type')
+        )
+
+        balances = []
+        for key, quota in quotas.items():
+            if key in existing:
+                continue
+            employee_id, leave_type = key
+            carried = min(max(previous.get(key, 0), 0), quota.carry_forward_limit)
+            balances.append(LeaveBalance(
+                employee_id=employee_id,
+                leave_type=leave_type,
+                year=year,
+                carried_forward=carried,
+                total_allocated=quota.yearly_quota + carried,
+                rh_allocated=quota.rh_quota if leave_type == 'Casual Leave' else 0,
+            ))
+        return balances, len(existing)
+
+    @classmethod
+    def run(cls, year, company_id=None, dry_run=False, batch_size=1000):
+        """Create the balances; returns {planned, created, existing}"""
+        from .models import LeaveBalance
+
+        balances, existing = cls.plan(year, company_id)
+        created = 0
+        if not dry_run and balances:
+            # ignore_conflicts drops rows another process inserted since plan()
+            # without saying which, so count the rows before and after
+            rows = LeaveBalance.objects.filter(year=year, employee_id__in={b.employee_id for b in balances})
+            with transaction.atomic():
+                before = rows.count()
+                # bulk_create skips post_save: new rows start with zero counters,
+                # so there is nothing for the ledger to record.
+                LeaveBalance.objects.bulk_create(balances, batch_size=batch_size, ignore_conflicts=True)
+                created = rows.count() - before
+            existing += len(balances) - created
+        return {'planned': balances, 'created': created, 'existing': existing}
@@ -1,106 +1,54 @@
-from django.db.models.signals import post_save, pre_save
+import logging
+
+from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import Leave, LeaveBalance
+from .models import Leave, LeaveBalance, LeaveLedgerEntry
+from .services import LeaveLedgerService
+
+logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=Leave)
-def update_balance_on_leave_create(sender, instance, created, **kwargs):
+def update_balance_on_leave_change(sender, instance, created, raw=False, **kwargs):
     """
-    Automatically update leave balance when a new leave is created.
-    Deducts from 'pending' balance immediately (optimistic approach).
+    Keep the leave balance in step with the leave's status.
+    A new leave is added to 'pending' (or 'used' if created approved); later
+    transitions (Pending → Approved/Rejected/Cancelled, Approved → Cancelled)
+    move the days between the counters through the ledger.
     """
+    if raw:
+        return
+
     if created:
-        try:
-            # RH balance is tracked on the Casual Leave record
-            target_type = instance.leave_type
-            if target_type == 'Restricted Holiday':
-                target_type = 'Casual Leave'
+        old_status = None
+    elif hasattr(instance, '_loaded_status'):
+        old_status = instance._loaded_status
+    else:
+        logger.warning(f"Leave {instance.pk} saved without its previous status; balance not updated")
+        return
 
-            balance = LeaveBalance.objects.get(
-                employee=instance.employee,
-                leave_type=target_type,
-                year=instance.from_date.year
-            )
-            
-            if instance.leave_type == 'Restricted Holiday':
-                 # Only update RH specific pending
-                 balance.rh_pending += int(instance.no_of_days)
-            else:
-                balance.pending += instance.no_of_days
-                
-            balance.save()
-            
-        except LeaveBalance.DoesNotExist:
-            pass
+    if old_status != instance.status:
+        LeaveLedgerService.record_transition(instance, old_status, instance.status)
+    instance._loaded_status = instance.status
 
 
-@receiver(pre_save, sender=Leave)
-def update_balance_on_status_change(sender, instance, **kwargs):
+@receiver(post_save, sender=LeaveBalance)
+def record_balance_adjustment(sender, instance, created, raw=False, **kwargs):
     """
-    Automatically update leave balance when leave status changes.
-    Handles: Pending → Approved, Pending → Rejected, Approved → Cancelled
+    Counters written by saving the balance itself (admin edits, seeding) are
+    recorded as opening/adjustment entries so the ledger stays complete.
     """
-    if not instance.pk:
-        # New leave, handled by post_save
+    if raw:
+        return
+
+    if created:
+        before = (0, 0, 0, 0)
+        entry_type = LeaveLedgerEntry.EntryType.OPENING
+    elif hasattr(instance, '_ledger_snapshot'):
+        before = instance._ledger_snapshot
+        entry_type = LeaveLedgerEntry.EntryType.ADJUSTMENT
+    else:
         return
-    
-    try:
-        # Get the old leave object to compare status
-        old_leave = Leave.objects.get(pk=instance.pk)
-        old_status = old_leave.status
-        new_status = instance.status
-        
-        # Only update if status actually changed
-        if old_status == new_status:
-            return
-        
-        # Get the balance
-        target_type = instance.leave_type
-        if target_type == 'Restricted Holiday':
-            target_type = 'Casual Leave'
 
-        balance = LeaveBalance.objects.get(
-            employee=instance.employee,
-            leave_type=target_type,
-            year=instance.from_date.year
-        )
-        
-        # Handle status transitions
-        if old_status == 'Pending' and new_status == 'Approved':
-            # Move from pending to used
-            if instance.leave_type == 'Restricted Holiday':
-                 balance.rh_pending -= int(instance.no_of_days)
-                 balance.rh_used += int(instance.no_of_days)
-            else:
-                 balance.pending -= instance.no_of_days
-                 balance.used += instance.no_of_days
-        
-        elif old_status == 'Pending' and new_status == 'Rejected':
-            # Restore balance (remove from pending)
-            if instance.leave_type == 'Restricted Holiday':
-                 balance.rh_pending -= int(instance.no_of_days)
-            else:
-                 balance.pending -= instance.no_of_days
-        
-        elif old_status == 'Approved' and new_status == 'Cancelled':
-            # Restore balance (remove from used)
-            if instance.leave_type == 'Restricted Holiday':
-                 balance.rh_used -= int(instance.no_of_days)
-            else:
-                 balance.used -= instance.no_of_days
-        
-        elif old_status == 'Pending' and new_status == 'Cancelled':
-            # Restore balance (remove from pending)
-            if instance.leave_type == 'Restricted Holiday':
-                 balance.rh_pending -= int(instance.no_of_days)
-            else:
-                 balance.pending -= instance.no_of_days
-        
-        balance.save()
-        
-    except Leave.DoesNotExist:
-        # Shouldn't happen, but handle gracefully
-        pass
-    except LeaveBalance.DoesNotExist:
-        # Balance doesn't exist, can't update
-        pass
+    LeaveLedgerService.record_adjustment(instance, before, entry_type=entry_type)
+    instance._ledger_snapshot = instance.counters()
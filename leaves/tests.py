@@ -1,3 +1,217 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from attendance.serializers import get_leave_for_date
+from departments.models import Department, Designation
+from employees.models import Employee
+from .models import Leave, LeaveBalance, LeaveLedgerEntry, LeaveQuota
+from .services import LeaveDateIndex, LeaveLedgerService, LeaveRolloverService
+
+
+class LeaveDateIndexTest(SimpleTestCase):
+    """Test cases for the date -> leave index"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.leaves = [
+            Leave(id=1, from_date=date(2025, 12, 1), to_date=date(2025, 12, 5), status='Approved',
+                  rh_dates=['2025-12-03']),
+            Leave(id=2, from_date=date(2025, 12, 5), to_date=date(2025, 12, 5), status='Pending',
+                  day_status='First Half'),
+            Leave(id=3, from_date=date(2025, 12, 10), to_date=date(2025, 12, 10), status='Approved',
+                  day_status='Second Half'),
+            Leave(id=4, from_date=date(2025, 11, 20), to_date=date(2026, 1, 10), status='Rejected'),
+        ]
+
+    def test_matches_linear_scan(self):
+        """Test every day resolves exactly like get_leave_for_date on a list"""
+        index = LeaveDateIndex(self.leaves, date(2025, 12, 1), date(2025, 12, 31))
+        day = date(2025, 12, 1)
+        while day <= date(2025, 12, 31):
+            self.assertEqual(index.lookup(day), get_leave_for_date(day, self.leaves), day)
+            self.assertEqual(get_leave_for_date(day, index), get_leave_for_date(day, self.leaves), day)
+            day += timedelta(days=1)
+
+    def test_window_clips_long_leaves(self):
+        """Test leaves are only expanded inside the requested window"""
+        index = LeaveDateIndex(self.leaves[3:], date(2025, 12, 1), date(2025, 12, 7))
+        self.assertEqual(len(index), 7)
+        self.assertIsNone(index.leave_on(date(2025, 12, 8)))
+
+
+class LeaveLedgerTest(TestCase):
+    """Test cases for ledger-backed leave balance updates"""
+
+    def setUp(self):
+        """Set up test data"""
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-LL01",
+            first_name="Ledger",
+            last_name="Test",
+            email="ledger@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+        self.balance = LeaveBalance.objects.create(
+            employee=self.employee, leave_type='Casual Leave', year=2025, total_allocated=12, rh_allocated=2,
+        )
+
+    def apply(self, leave_type='Casual Leave', days=2):
+        return Leave.objects.create(
+            employee=self.employee, leave_type=leave_type, from_date=date(2025, 12, 1),
+            to_date=date(2025, 12, days), no_of_days=days, reason="Ledger",
+        )
+
+    def set_status(self, leave_id, new_status):
+        leave = Leave.objects.get(pk=leave_id)
+        leave.status = new_status
+        leave.save(update_fields=['status'])
+
+    def counters(self):
+        self.balance.refresh_from_db()
+        return tuple(float(value) for value in self.balance.counters())
+
+    def test_transitions_move_counters(self):
+        """Test apply, approve and cancel move days between pending and used"""
+        leave = self.apply()
+        self.assertEqual(self.counters(), (2, 0, 0, 0))
+        self.set_status(leave.pk, 'Approved')
+        self.assertEqual(self.counters(), (0, 2, 0, 0))
+        self.set_status(leave.pk, 'Cancelled')
+        self.assertEqual(self.counters(), (0, 0, 0, 0))
+        self.assertEqual(
+            list(LeaveLedgerEntry.objects.filter(leave=leave).values_list('entry_type', flat=True)),
+            ['applied', 'approved', 'cancelled'],
+        )
+
+    def test_concurrent_approval_is_applied_once(self):
+        """Test two requests approving the same loaded leave count it once"""
+        leave = self.apply()
+        first = Leave.objects.get(pk=leave.pk)
+        second = Leave.objects.get(pk=leave.pk)
+        first.status = second.status = 'Approved'
+        first.save(update_fields=['status'])
+        second.save(update_fields=['status'])
+        self.assertEqual(self.counters(), (0, 2, 0, 0))
+
+    def test_racing_approve_and_reject_follow_final_status(self):
+        """Test the ledger follows the status that was written last when approve and reject race"""
+        leave = self.apply()
+        # Both requests write the row before either signal handler runs
+        Leave.objects.filter(pk=leave.pk).update(status='Approved')
+        Leave.objects.filter(pk=leave.pk).update(status='Rejected')
+        LeaveLedgerService.record_transition(leave, 'Pending', 'Approved')
+        LeaveLedgerService.record_transition(leave, 'Pending', 'Rejected')
+        self.assertEqual(self.counters(), (0, 0, 0, 0))
+        self.assertEqual(
+            list(LeaveLedgerEntry.objects.filter(leave=leave).values_list('entry_type', flat=True)),
+            ['applied', 'rejected'],
+        )
+
+    def test_restricted_holiday_uses_casual_rh_counters(self):
+        """Test RH leaves are tracked on the Casual Leave balance's RH counters"""
+        leave = self.apply(leave_type='Restricted Holiday', days=1)
+        self.assertEqual(self.counters(), (0, 0, 1, 0))
+        self.set_status(leave.pk, 'Approved')
+        self.assertEqual(self.counters(), (0, 0, 0, 1))
+
+    def test_reconcile_rebuilds_from_ledger(self):
+        """Test manual saves are recorded and out-of-band writes are repaired"""
+        self.apply()
+        balance = LeaveBalance.objects.get(pk=self.balance.pk)
+        balance.used = 3
+        balance.save()
+        self.assertTrue(LeaveLedgerEntry.objects.filter(entry_type='adjustment', used_delta=3).exists())
+
+        LeaveBalance.objects.filter(pk=self.balance.pk).update(pending=9)
+        out = StringIO()
+        call_command('reconcile_leave_balances', '--dry-run', stdout=out)
+        self.assertIn('1 balances would be fixed', out.getvalue())
+        self.assertEqual(self.counters(), (9, 3, 0, 0))
+
+        call_command('reconcile_leave_balances', stdout=StringIO())
+        self.assertEqual(self.counters(), (2, 3, 0, 0))
+
+
+class LeaveRolloverTest(TestCase):
+    """Test cases for the year-end leave rollover"""
+
+    def setUp(self):
+        """Set up test data"""
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-RO01",
+            first_name="Roll",
+            last_name="Over",
+            email="rollover@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2024, 1, 1),
+        )
+        # Superseded quota and the one in force on 1 January 2026
+        LeaveQuota.objects.create(
+            employee=self.employee, leave_type='Casual Leave', yearly_quota=10, carry_forward_limit=5,
+            effective_from=date(2024, 1, 1), effective_to=date(2025, 6, 30),
+        )
+        LeaveQuota.objects.create(
+            employee=self.employee, leave_type='Casual Leave', yearly_quota=12, carry_forward_limit=3,
+            rh_quota=2, effective_from=date(2025, 7, 1),
+        )
+        LeaveQuota.objects.create(
+            employee=self.employee, leave_type='Sick Leave', yearly_quota=6, carry_forward_limit=0,
+            effective_from=date(2025, 1, 1),
+        )
+        LeaveBalance.objects.create(
+            employee=self.employee, leave_type='Casual Leave', year=2025, total_allocated=12, used=7,
+        )
+
+    def test_rollover_allocates_and_carries_forward(self):
+        """Test new balances use the effective quota and the capped carry-forward"""
+        out = StringIO()
+        call_command('rollover_leave_year', '--year', '2026', '--dry-run', stdout=out)
+        self.assertIn('2 balances would be created for 2026', out.getvalue())
+        self.assertFalse(LeaveBalance.objects.filter(year=2026).exists())
+
+        # Three plan queries, then count, insert and count inside a savepoint
+        with self.assertNumQueries(8):
+            result = LeaveRolloverService.run(2026)
+        self.assertEqual(result['created'], 2)
+        casual = LeaveBalance.objects.get(employee=self.employee, leave_type='Casual Leave', year=2026)
+        self.assertEqual(casual.carried_forward, 3)
+        self.assertEqual(casual.total_allocated, 15)
+        self.assertEqual(casual.rh_allocated, 2)
+        sick = LeaveBalance.objects.get(employee=self.employee, leave_type='Sick Leave', year=2026)
+        self.assertEqual((sick.total_allocated, sick.rh_allocated), (6, 0))
+
+    def test_rows_inserted_concurrently_are_not_counted(self):
+        """Test balances another process inserted after planning count as existing, not created"""
+        from unittest import mock
+
+        plan = LeaveRolloverService.plan
+
+        def racing_plan(year, company_id=None):
+            balances, existing = plan(year, company_id)
+            LeaveBalance.objects.create(employee=self.employee, leave_type='Sick Leave', year=year)
+            return balances, existing
+
+        with mock.patch.object(LeaveRolloverService, 'plan', side_effect=racing_plan):
+            result = LeaveRolloverService.run(2026)
+        self.assertEqual((result['created'], result['existing']), (1, 1))
+
+    def test_rollover_is_idempotent(self):
+        """Test a second run leaves existing balances alone"""
+        LeaveRolloverService.run(2026)
+        LeaveBalance.objects.filter(year=2026, leave_type='Sick Leave').update(used=1)
+        out = StringIO()
+        call_command('rollover_leave_year', '--year', '2026', stdout=out)
+        self.assertIn('Created 0 balances for 2026 (2 already existed)', out.getvalue())
+        self.assertEqual(LeaveBalance.objects.get(year=2026, leave_type='Sick Leave').used, 1)
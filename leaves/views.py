@@ -8,8 +8,9 @@ from drf_yasg import openapi
 from django.utils.dateparse import parse_date
 from django.utils import timezone
 from datetime import timedelta, date
+from config.pagination import KeysetPaginationMixin
 from .models import Leave, LeaveBalance, LeaveQuota, RestrictedHoliday
-from holidays.models import Holiday
+from holidays.services import CompanyCalendarService
 from .serializers import (
     LeaveSerializer, LeaveCalculationSerializer, LeaveBalanceSerializer,
     LeaveQuotaSerializer, RestrictedHolidaySerializer
@@ -19,10 +20,11 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-class LeaveViewSet(viewsets.ModelViewSet):
+class LeaveViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
     queryset = Leave.objects.all()
     serializer_class = LeaveSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ['-created_at', '-id']
 
     def get_queryset(self):
         """
@@ -118,18 +120,15 @@ class LeaveViewSet(viewsets.ModelViewSet):
         weekends = 0
         days_details = []
 
-        # Fetch holidays in range
-        holidays_in_range = Holiday.objects.filter(
-            date__range=[start_date, end_date], 
-            is_active=True
-        ).values_list('date', flat=True)
+        # Holidays in range from the shared calendar index
+        holidays_in_range = CompanyCalendarService.holidays_in_range(start_date, end_date)
 
         while current_date <= end_date:
             day_type = "working"
             sub_type = ""
             
             # Check for Weekend (Sat=5, Sun=6)
-            if current_date.weekday() in [5, 6]:
+            if CompanyCalendarService.is_weekend(current_date):
                 weekends += 1
                 day_type = "weekend"
                 sub_type = "Saturday" if current_date.weekday() == 5 else "Sunday"
@@ -366,29 +365,6 @@ class LeaveViewSet(viewsets.ModelViewSet):
             "data": balance_data
         })
 
-    def perform_create(self, serializer):
-        """Override to update balance when leave is created"""
-        # OLD CODE: leave = serializer.save(employee=self.request.user)
-        # NEW CODE (2025-12-22): Save with Employee
-        user = self.request.user
-        if not hasattr(user, 'employee_profile'):
-            raise serializers.ValidationError("User must have an employee profile")
-        
-        leave = serializer.save(employee=user.employee_profile)
-        
-        # Update pending balance
-        current_year = timezone.now().year
-        try:
-            balance = LeaveBalance.objects.get(
-                employee=user.employee_profile,  # Changed from self.request.user
-                leave_type=leave.leave_type,
-                year=current_year
-            )
-            balance.pending += leave.no_of_days
-            balance.save()
-        except LeaveBalance.DoesNotExist:
-            pass
-    
     def perform_update(self, serializer):
         """Save leave updates - balance updates handled by signals"""
         serializer.save()
@@ -1,3 +1,24 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import NotificationOutbox
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'method', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'method')
+    search_fields = ('method', 'last_error')
+    readonly_fields = ('claimed_by', 'claimed_at', 'sent_at', 'created_at', 'updated_at')
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected notifications now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=NotificationOutbox.Status.SENT).update(
+            status=NotificationOutbox.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            claimed_by='',
+            claimed_at=None,
+        )
+        self.message_user(request, f'{updated} notifications queued for retry')
@@ -0,0 +1,58 @@
+"""
+Management command that delivers queued Slack notifications from the outbox.
+
+Usage:
+    # Run forever, polling every 2 seconds when the queue is empty
+    python manage.py run_notification_worker
+
+    # Drain whatever is due and exit (e.g. from cron)
+    python manage.py run_notification_worker --once
+
+    # Bigger batches, slower polling
+    python manage.py run_notification_worker --batch-size 200 --sleep 5
+
+Several workers may run side by side; each row is claimed by exactly one of them.
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.services import NotificationOutboxService
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending NotificationOutbox rows with retries and dead-lettering'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Rows claimed per batch (default 50)')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when nothing is due (default 2)')
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        worker_id = NotificationOutboxService.new_worker_id()
+        totals = {}
+        self.stdout.write(f'Notification worker {worker_id} started')
+
+        while not self.stopping:
+            close_old_connections()
+            counts = NotificationOutboxService.process_batch(worker_id, options['batch_size'])
+            if counts:
+                for status, count in counts.items():
+                    totals[status] = totals.get(status, 0) + count
+                self.stdout.write(', '.join(f'{status}: {count}' for status, count in sorted(counts.items())))
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        summary = ', '.join(f'{status}: {count}' for status, count in sorted(totals.items())) or 'nothing due'
+        self.stdout.write(self.style.SUCCESS(f'Notification worker stopped ({summary})'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
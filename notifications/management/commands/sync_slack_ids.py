@@ -0,0 +1,48 @@
+"""
+Management command to fill Employee.slack_user_id from each company's Slack workspace.
+
+One paged `users.list` call per workspace replaces the per-employee
+`users.lookupByEmail` calls made while sending.
+
+Usage:
+    # Every active company with a Slack configuration
+    python manage.py sync_slack_ids
+
+    # One company (by slug), leaving already linked employees untouched
+    python manage.py sync_slack_ids --company acme --only-missing
+"""
+from django.core.management.base import BaseCommand, CommandError
+from notifications.services import SlackUserSyncService
+from organizations.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Resolve Slack user IDs for employees in bulk via users.list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', help='Only this company slug')
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Skip employees that already have a Slack user ID',
+        )
+
+    def handle(self, *args, **options):
+        companies = Company.objects.filter(is_active=True, slack_config__isnull=False)
+        if options['company']:
+            companies = companies.filter(slug=options['company'])
+            if not companies.exists():
+                raise CommandError(f"No active company with Slack configured for slug '{options['company']}'")
+
+        updated = 0
+        for company in companies.order_by('name'):
+            result = SlackUserSyncService.sync_company(company, only_missing=options['only_missing'])
+            if result is None:
+                continue
+            updated += result['updated']
+            self.stdout.write(
+                f"{company.name}: {result['matched']} matched, {result['updated']} updated, "
+                f"{result['missing']} without a Slack account"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} Slack user IDs'))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from organizations.models import Company
 
 # Create your models here.
@@ -13,3 +14,42 @@ class SlackConfiguration(models.Model):
 
     def __str__(self):
         return f"Slack Config for {self.company.name}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    Slack notifications waiting to be delivered by `run_notification_worker`.
+
+    `method` names a SlackNotificationService helper; `args`/`kwargs` are JSON,
+    with model instances stored as {"__model__": "app.Model", "pk": ...}.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        SENT = 'sent', 'Sent'
+        SKIPPED = 'skipped', 'Skipped'
+        DEAD = 'dead', 'Dead letter'
+
+    method = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['claimed_by']),
+        ]
+
+    def __str__(self):
+        return f"{self.method} ({self.status}, {self.attempts} attempts)"
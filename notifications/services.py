@@ -0,0 +1,434 @@
+import atexit
+import datetime
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections, models, transaction
+from django.utils import timezone
+
+from employees.models import Employee
+from .models import NotificationOutbox
+from .slack_utils import (
+    SlackClientRegistry, SlackNotificationService, SlackRateLimitedError, raise_transient_errors,
+    remember_slack_user_miss, slack_user_miss_key,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutboxService:
+    """
+    Queue Slack notifications instead of sending them inside the request.
+
+    Signal handlers call `enqueue(method, *args)` where `method` is the name of a
+    SlackNotificationService helper. The row is written once the surrounding
+    transaction commits, and `run_notification_worker` delivers it later:
+    failures are retried with exponential backoff, and rows that keep failing
+    (or reference deleted objects) are parked as dead letters for the admin.
+    """
+
+    METHOD_PREFIXES = ('notify_', 'send_')
+    DEFERRED = 'deferred'
+
+    # ---- payload encoding ----
+
+    @classmethod
+    def encode(cls, value):
+        if isinstance(value, models.Model):
+            return {'__model__': value._meta.label_lower, 'pk': value.pk}
+        if isinstance(value, datetime.datetime):
+            return {'__datetime__': value.isoformat()}
+        if isinstance(value, datetime.date):
+            return {'__date__': value.isoformat()}
+        if isinstance(value, (list, tuple)):
+            return [cls.encode(item) for item in value]
+        if isinstance(value, dict):
+            return {key: cls.encode(item) for key, item in value.items()}
+        return value
+
+    @classmethod
+    def decode(cls, value):
+        if isinstance(value, list):
+            return [cls.decode(item) for item in value]
+        if isinstance(value, dict):
+            if '__model__' in value:
+                model = apps.get_model(value['__model__'])
+                return model.objects.get(pk=value['pk'])
+            if '__datetime__' in value:
+                return datetime.datetime.fromisoformat(value['__datetime__'])
+            if '__date__' in value:
+                return datetime.date.fromisoformat(value['__date__'])
+            return {key: cls.decode(item) for key, item in value.items()}
+        return value
+
+    # ---- producer side ----
+
+    @classmethod
+    def enqueue(cls, method, *args, **kwargs):
+        """
+        Queue SlackNotificationService.<method>(*args, **kwargs) for delivery after commit.
+        With NOTIFICATION_OUTBOX_ENABLED=False the helper is called inline instead.
+        """
+        if not getattr(settings, 'NOTIFICATION_OUTBOX_ENABLED', True):
+            return getattr(SlackNotificationService, method)(*args, **kwargs)
+
+        encoded_args = cls.encode(list(args))
+        encoded_kwargs = cls.encode(kwargs)
+        transaction.on_commit(
+            lambda: NotificationOutbox.objects.create(method=method, args=encoded_args, kwargs=encoded_kwargs)
+        )
+
+    # ---- worker side ----
+
+    @staticmethod
+    def new_worker_id():
+        return f"{socket.gethostname()[:30]}-{os.getpid()}"
+
+    @staticmethod
+    def release_stale_claims(now=None):
+        """Put rows claimed by a worker that died mid-batch back in the queue"""
+        now = now or timezone.now()
+        timeout = getattr(settings, 'NOTIFICATION_OUTBOX_CLAIM_TIMEOUT_SECONDS', 300)
+        return NotificationOutbox.objects.filter(
+            status=NotificationOutbox.Status.PROCESSING,
+            claimed_at__lt=now - timedelta(seconds=timeout),
+        ).update(status=NotificationOutbox.Status.PENDING, claimed_by='', claimed_at=None)
+
+    @classmethod
+    def claim_batch(cls, worker_id, batch_size=50):
+        """
+        Claim up to batch_size due rows for this worker.
+
+        Rows are claimed with a conditional UPDATE carrying a unique token rather than
+        SELECT ... FOR UPDATE SKIP LOCKED, so several workers can run against any backend.
+        """
+        now = timezone.now()
+        cls.release_stale_claims(now)
+        due_ids = list(
+            NotificationOutbox.objects.filter(
+                status=NotificationOutbox.Status.PENDING,
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not due_ids:
+            return []
+
+        token = f"{worker_id[:48]}-{uuid.uuid4().hex[:12]}"
+        NotificationOutbox.objects.filter(
+            id__in=due_ids, status=NotificationOutbox.Status.PENDING
+        ).update(status=NotificationOutbox.Status.PROCESSING, claimed_by=token, claimed_at=now)
+        return list(NotificationOutbox.objects.filter(
+            claimed_by=token, status=NotificationOutbox.Status.PROCESSING
+        ).order_by('id'))
+
+    @staticmethod
+    def backoff_seconds(attempts):
+        base = getattr(settings, 'NOTIFICATION_OUTBOX_BACKOFF_SECONDS', 30)
+        cap = getattr(settings, 'NOTIFICATION_OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+        delay = min(base * 2 ** max(attempts - 1, 0), cap)
+        return delay + random.uniform(0, delay * 0.1)
+
+    @staticmethod
+    def _finish(entry, **fields):
+        # Only the worker that still holds the claim may write the outcome.
+        fields.setdefault('claimed_by', '')
+        fields.setdefault('claimed_at', None)
+        fields['updated_at'] = timezone.now()
+        NotificationOutbox.objects.filter(pk=entry.pk, claimed_by=entry.claimed_by).update(**fields)
+        for name, value in fields.items():
+            setattr(entry, name, value)
+
+    @classmethod
+    def _fail(cls, entry, error, dead=False):
+        attempts = entry.attempts + 1
+        max_attempts = getattr(settings, 'NOTIFICATION_OUTBOX_MAX_ATTEMPTS', 8)
+        if dead or attempts >= max_attempts:
+            logger.error(f"Notification {entry.pk} ({entry.method}) dead-lettered after {attempts} attempts: {error}")
+            cls._finish(entry, status=NotificationOutbox.Status.DEAD, attempts=attempts, last_error=str(error)[:2000])
+            return NotificationOutbox.Status.DEAD
+
+        retry_at = timezone.now() + timedelta(seconds=cls.backoff_seconds(attempts))
+        logger.warning(f"Notification {entry.pk} ({entry.method}) failed, retrying at {retry_at}: {error}")
+        cls._finish(
+            entry,
+            status=NotificationOutbox.Status.PENDING,
+            attempts=attempts,
+            next_attempt_at=retry_at,
+            last_error=str(error)[:2000],
+        )
+        return NotificationOutbox.Status.PENDING
+
+    @classmethod
+    def _defer(cls, entry, retry_at):
+        # Rate limited: not a failure, so the attempt is not counted.
+        cls._finish(
+            entry,
+            status=NotificationOutbox.Status.PENDING,
+            next_attempt_at=retry_at,
+            last_error=f"Rate limited, retrying at {retry_at.isoformat()}",
+        )
+        return cls.DEFERRED
+
+    @classmethod
+    def dispatch(cls, entry):
+        """Deliver one claimed row and record the outcome; returns the new status"""
+        handler = getattr(SlackNotificationService, entry.method, None)
+        if not entry.method.startswith(cls.METHOD_PREFIXES) or not callable(handler):
+            return cls._fail(entry, f"Unknown notification method '{entry.method}'", dead=True)
+
+        try:
+            args = cls.decode(entry.args)
+            kwargs = cls.decode(entry.kwargs)
+        except (ObjectDoesNotExist, LookupError, ValueError) as e:
+            return cls._fail(entry, f"Could not load payload: {e}", dead=True)
+
+        try:
+            with raise_transient_errors():
+                delivered = handler(*args, **kwargs)
+        except SlackRateLimitedError as e:
+            return cls._defer(entry, timezone.now() + timedelta(seconds=e.retry_after))
+        except Exception as e:
+            return cls._fail(entry, e)
+
+        if delivered is False:
+            # The helper decided not to send (no company, Slack config or Slack user);
+            # retrying would give the same answer.
+            cls._finish(
+                entry,
+                status=NotificationOutbox.Status.SKIPPED,
+                attempts=entry.attempts + 1,
+                last_error='Not delivered: no company, Slack configuration or Slack user',
+            )
+            return NotificationOutbox.Status.SKIPPED
+
+        cls._finish(
+            entry,
+            status=NotificationOutbox.Status.SENT,
+            attempts=entry.attempts + 1,
+            sent_at=timezone.now(),
+            last_error='',
+        )
+        return NotificationOutbox.Status.SENT
+
+    @classmethod
+    def process_batch(cls, worker_id, batch_size=50):
+        """
+        Claim and deliver one batch; returns {status: count}.
+
+        Rows of the same helper are sent back to back so the rate limiter paces them
+        as one run. Once a helper is rate limited, its remaining rows in the batch are
+        put back for the Retry-After time instead of being tried one by one.
+        """
+        counts = {}
+        deferred_until = {}
+        entries = sorted(cls.claim_batch(worker_id, batch_size), key=lambda entry: entry.method)
+        for entry in entries:
+            if entry.method in deferred_until:
+                status = cls._defer(entry, deferred_until[entry.method])
+            else:
+                status = cls.dispatch(entry)
+                if status == cls.DEFERRED:
+                    deferred_until[entry.method] = entry.next_attempt_at
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+
+class SlackUserSyncService:
+    """
+    Resolve Employee.slack_user_id for a whole company at once.
+
+    Pages through `users.list` once per workspace, matches employees by email in
+    memory and writes the IDs with a single bulk_update. Employees without a Slack
+    account are remembered in the shared cache so sends never look them up again.
+    """
+
+    PAGE_SIZE = 200
+
+    @classmethod
+    def fetch_email_map(cls, client):
+        """Return {lowercased email: Slack user ID} for the active humans of a workspace"""
+        emails = {}
+        cursor = None
+        while True:
+            response = client.users_list(limit=cls.PAGE_SIZE, cursor=cursor)
+            for member in response.get('members', []):
+                if member.get('deleted') or member.get('is_bot') or member.get('id') == 'USLACKBOT':
+                    continue
+                email = (member.get('profile') or {}).get('email')
+                if email:
+                    emails[email.lower()] = member['id']
+            cursor = (response.get('response_metadata') or {}).get('next_cursor')
+            if not cursor:
+                return emails
+
+    @classmethod
+    def sync_company(cls, company, only_missing=False):
+        """
+        Match the company's employees against its Slack workspace.
+        Returns {matched, updated, missing}, or None when the company has no Slack configuration.
+        """
+        config = SlackClientRegistry.config_for(company)
+        if config is None:
+            return None
+        email_map = cls.fetch_email_map(SlackClientRegistry.client_for(config.bot_token))
+
+        employees = Employee.objects.filter(company=company).only('id', 'email', 'slack_user_id')
+        if only_missing:
+            employees = employees.filter(models.Q(slack_user_id__isnull=True) | models.Q(slack_user_id=''))
+
+        changed = []
+        matched = missing = 0
+        for employee in employees.iterator(chunk_size=2000):
+            slack_id = email_map.get((employee.email or '').lower())
+            if slack_id is None:
+                missing += 1
+                remember_slack_user_miss(company, employee.email)
+                continue
+            matched += 1
+            caches['shared'].delete(slack_user_miss_key(company, employee.email))
+            if employee.slack_user_id != slack_id:
+                employee.slack_user_id = slack_id
+                changed.append(employee)
+
+        Employee.objects.bulk_update(changed, ['slack_user_id'], batch_size=500)
+        return {'matched': matched, 'updated': len(changed), 'missing': missing}
+
+
+class SlackInteractionExecutor:
+    """
+    Fixed-size thread pool for Slack events and button clicks.
+
+    At most SLACK_INTERACTION_WORKERS payloads run at once and at most
+    SLACK_INTERACTION_QUEUE_SIZE more wait; beyond that `submit` refuses the work
+    so the view can answer 503 and let Slack retry, instead of starting a thread
+    (and a database connection) per request.
+    """
+
+    _lock = threading.Lock()
+    _executor = None
+    _slots = None
+
+    @classmethod
+    def _pool(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    workers = getattr(settings, 'SLACK_INTERACTION_WORKERS', 4)
+                    queue_size = getattr(settings, 'SLACK_INTERACTION_QUEUE_SIZE', 32)
+                    cls._slots = threading.BoundedSemaphore(workers + queue_size)
+                    cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='slack-interaction')
+        return cls._executor
+
+    @classmethod
+    def submit(cls, func, payload):
+        """Run func(payload) in the pool; returns False when the pool is full"""
+        executor = cls._pool()
+        if not cls._slots.acquire(blocking=False):
+            return False
+        try:
+            executor.submit(cls._run, func, payload)
+        except RuntimeError:
+            cls._slots.release()
+            return False
+        return True
+
+    @classmethod
+    def _run(cls, func, payload):
+        close_old_connections()
+        try:
+            func(payload)
+        except Exception as e:
+            logger.error(f"Slack interaction processing error: {e}")
+        finally:
+            close_old_connections()
+            cls._slots.release()
+
+    @classmethod
+    def shutdown(cls, wait=True):
+        with cls._lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=wait)
+            cls._executor = None
+            cls._slots = None
+
+
+class SlackInteractionDeduplicator:
+    """
+    Remembers Slack event_id / action_ts values in the shared (database)
+    cache so retried deliveries are acknowledged without being processed
+    twice, whichever server process or instance they reach.
+    """
+
+    @staticmethod
+    def key_for(payload):
+        if payload.get('event_id'):
+            return f"slack:seen:event:{payload['event_id']}"
+        actions = payload.get('actions') or []
+        if actions and actions[0].get('action_ts'):
+            team_id = (payload.get('team') or {}).get('id', '')
+            return f"slack:seen:action:{team_id}:{actions[0]['action_ts']}"
+        return None
+
+    @classmethod
+    def claim(cls, payload):
+        """True the first time a payload is seen (or when it carries no idempotency key)"""
+        key = cls.key_for(payload)
+        if key is None:
+            return True
+        return caches['shared'].add(key, 1, getattr(settings, 'SLACK_INTERACTION_DEDUP_SECONDS', 3600))
+
+    @classmethod
+    def release(cls, payload):
+        """Forget a payload that was not processed, so Slack's retry is accepted"""
+        key = cls.key_for(payload)
+        if key is not None:
+            caches['shared'].delete(key)
+
+
+class SlackDebugLog:
+    """
+    Raw Slack request log written from a background thread.
+
+    The view only puts a record on an in-memory queue; a QueueListener appends it
+    to SLACK_DEBUG_LOG_FILE. An empty setting turns the log off.
+    """
+
+    _lock = threading.Lock()
+    _logger = None
+    _listener = None
+
+    @classmethod
+    def _get_logger(cls):
+        if cls._logger is None:
+            with cls._lock:
+                if cls._logger is None:
+                    records = queue.SimpleQueue()
+                    file_handler = logging.FileHandler(settings.SLACK_DEBUG_LOG_FILE)
+                    cls._listener = logging.handlers.QueueListener(records, file_handler)
+                    cls._listener.start()
+                    atexit.register(cls._listener.stop)
+
+                    debug_logger = logging.getLogger('notifications.slack_debug')
+                    debug_logger.propagate = False
+                    debug_logger.setLevel(logging.INFO)
+                    debug_logger.addHandler(logging.handlers.QueueHandler(records))
+                    cls._logger = debug_logger
+        return cls._logger
+
+    @classmethod
+    def write(cls, text):
+        if not getattr(settings, 'SLACK_DEBUG_LOG_FILE', ''):
+            return
+        cls._get_logger().info('%s', text)
@@ -1,14 +1,248 @@
 import os
+import ssl
+import time
 import logging
+import threading
+import contextvars
+from contextlib import contextmanager
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from django.conf import settings
+from django.core.cache import caches
 from employees.models import Employee
 
 logger = logging.getLogger(__name__)
 
 from .models import SlackConfiguration
 
+TRANSIENT_SLACK_ERRORS = {'ratelimited', 'service_unavailable', 'internal_error', 'fatal_error', 'request_timeout'}
+
+_raise_transient = contextvars.ContextVar('slack_raise_transient', default=False)
+
+
+class SlackTransientError(Exception):
+    """A Slack call failed in a way that is worth retrying (rate limit, 5xx)"""
+
+
+class SlackRateLimitedError(SlackTransientError):
+    """The call would exceed a Slack rate limit; try again after `retry_after` seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def raise_transient_errors():
+    """
+    Inside this block, rate limits and Slack-side failures raise SlackTransientError
+    instead of being logged and swallowed, so the outbox worker can retry them.
+    """
+    token = _raise_transient.set(True)
+    try:
+        yield
+    finally:
+        _raise_transient.reset(token)
+
+
+def _check_transient(error):
+    if not _raise_transient.get():
+        return
+    response = error.response
+    status = getattr(response, 'status_code', None) or 0
+    if status == 429:
+        raise SlackRateLimitedError(response.get('error') or 'ratelimited', _retry_after(response)) from error
+    if status >= 500 or response.get('error') in TRANSIENT_SLACK_ERRORS:
+        raise SlackTransientError(response.get('error') or f"HTTP {status}") from error
+
+
+def _retry_after(response):
+    headers = {key.lower(): value for key, value in (getattr(response, 'headers', None) or {}).items()}
+    try:
+        return max(float(headers.get('retry-after', 1)), 0)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class _TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        """Take a token and return 0, or return the seconds until one is available"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class SlackRateLimiter:
+    """
+    Process-wide token buckets per (workspace, API method).
+
+    Each bucket refills at the method's per-minute rate and allows short bursts.
+    A 429 from Slack empties the bucket until its Retry-After has passed.
+    Limits can be overridden with SLACK_RATE_LIMITS = {'chat.postMessage': (per_minute, burst)}.
+    """
+
+    DEFAULT_LIMITS = {
+        'chat.postMessage': (60, 10),
+        'users.lookupByEmail': (50, 10),
+        'users.list': (20, 5),
+    }
+    FALLBACK_LIMIT = (20, 5)
+
+    _lock = threading.Lock()
+    _buckets = {}
+
+    @classmethod
+    def _bucket(cls, workspace, method):
+        key = (workspace, method)
+        bucket = cls._buckets.get(key)
+        if bucket is None:
+            limits = {**cls.DEFAULT_LIMITS, **getattr(settings, 'SLACK_RATE_LIMITS', {})}
+            bucket = cls._buckets.setdefault(key, _TokenBucket(*limits.get(method, cls.FALLBACK_LIMIT)))
+        return bucket
+
+    @classmethod
+    def acquire(cls, workspace, method, max_wait=None):
+        """
+        Block until a call may be made. If that would take longer than max_wait
+        seconds, raise SlackRateLimitedError instead so the caller can requeue.
+        """
+        while True:
+            with cls._lock:
+                wait = cls._bucket(workspace, method).reserve(time.monotonic())
+            if wait <= 0:
+                return
+            if max_wait is not None and wait > max_wait:
+                raise SlackRateLimitedError(f"{method} rate limited", wait)
+            time.sleep(wait)
+
+    @classmethod
+    def penalize(cls, workspace, method, retry_after):
+        """Stop calls to `method` until Slack's Retry-After has passed"""
+        with cls._lock:
+            bucket = cls._bucket(workspace, method)
+            bucket.tokens = 0.0
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._buckets.clear()
+
+
+class RateLimitedWebClient(WebClient):
+    """WebClient whose every API call goes through SlackRateLimiter"""
+
+    def api_call(self, api_method, **kwargs):
+        # The outbox worker requeues instead of waiting long; inline sends wait their turn.
+        max_wait = getattr(settings, 'SLACK_RATE_LIMIT_MAX_WAIT_SECONDS', 2) if _raise_transient.get() else None
+        SlackRateLimiter.acquire(self.token, api_method, max_wait=max_wait)
+        try:
+            return super().api_call(api_method, **kwargs)
+        except SlackApiError as e:
+            if getattr(e.response, 'status_code', None) == 429:
+                SlackRateLimiter.penalize(self.token, api_method, _retry_after(e.response))
+            raise
+
+
+def slack_user_miss_key(company, email):
+    """
+    Cache key remembering that `email` has no Slack account in the company's workspace.
+    Misses live in the shared cache so the sync command, web and worker processes all see them.
+    """
+    return f"slack:user-miss:{company.pk if company else 0}:{(email or '').lower()}"
+
+
+def remember_slack_user_miss(company, email):
+    ttl = getattr(settings, 'SLACK_USER_MISS_CACHE_SECONDS', 86400)
+    caches['shared'].set(slack_user_miss_key(company, email), True, ttl)
+
+
+class SlackClientRegistry:
+    """
+    Process-wide cache of SlackConfiguration rows and WebClients.
+
+    Configurations are cached per company (and per Slack team for the interaction
+    endpoint), including "no configuration" answers, and dropped when a
+    SlackConfiguration is saved or deleted. They also expire after
+    SLACK_CONFIG_CACHE_SECONDS so other worker processes pick up edits.
+
+    One WebClient is kept per bot token and every client shares a single SSL
+    context, so the CA bundle is loaded once per process instead of per message.
+    Clients are RateLimitedWebClients, so calls are paced per workspace and method.
+    """
+
+    _lock = threading.Lock()
+    _configs = {}
+    _teams = {}
+    _clients = {}
+    _ssl_context = None
+
+    @classmethod
+    def _cached(cls, cache, key, loader):
+        ttl = getattr(settings, 'SLACK_CONFIG_CACHE_SECONDS', 300)
+        entry = cache.get(key)
+        if entry is not None and time.monotonic() - entry[1] < ttl:
+            return entry[0]
+        value = loader()
+        with cls._lock:
+            cache[key] = (value, time.monotonic())
+        return value
+
+    @classmethod
+    def config_for(cls, company):
+        """SlackConfiguration of the company, or None"""
+        return cls._cached(
+            cls._configs,
+            company.pk,
+            lambda: SlackConfiguration.objects.select_related('company').filter(company_id=company.pk).first(),
+        )
+
+    @classmethod
+    def config_for_team(cls, team_id):
+        """SlackConfiguration of the Slack workspace, or None"""
+        return cls._cached(
+            cls._teams,
+            team_id,
+            lambda: SlackConfiguration.objects.select_related('company').filter(slack_team_id=team_id).first(),
+        )
+
+    @classmethod
+    def client_for(cls, token):
+        client = cls._clients.get(token)
+        if client is not None:
+            return client
+        with cls._lock:
+            client = cls._clients.get(token)
+            if client is None:
+                if cls._ssl_context is None:
+                    cls._ssl_context = ssl.create_default_context()
+                client = RateLimitedWebClient(token=token, ssl=cls._ssl_context)
+                cls._clients[token] = client
+        return client
+
+    @classmethod
+    def invalidate(cls):
+        """Forget every cached configuration and client"""
+        with cls._lock:
+            cls._configs.clear()
+            cls._teams.clear()
+            cls._clients.clear()
+
+
 class SlackNotificationService:
     def __init__(self, company=None):
         self.company = company
@@ -17,29 +251,36 @@ class SlackNotificationService:
         self.management_channel = None
 
         if company:
-            try:
-                self.config = SlackConfiguration.objects.get(company=company)
-                self.client = WebClient(token=self.config.bot_token)
+            self.config = SlackClientRegistry.config_for(company)
+            if self.config:
+                self.client = SlackClientRegistry.client_for(self.config.bot_token)
                 self.management_channel = self.config.management_channel_id
-            except SlackConfiguration.DoesNotExist:
+            else:
                 logger.error(f"SlackConfiguration not found for company: {company.name}")
         else:
             # Fallback to env vars for backward compatibility during transition if needed
             # but ideally we should move away from this.
             token = os.environ.get('SLACK_BOT_TOKEN')
             if token:
-                self.client = WebClient(token=token)
+                self.client = SlackClientRegistry.client_for(token)
                 self.management_channel = os.environ.get('SLACK_MANAGEMENT_CHANNEL_ID')
 
     def get_slack_id_by_email(self, email):
         """
         Looks up a Slack User ID by their email address.
+        Emails known to have no Slack account are answered from the shared cache.
         """
+        if not self.client or caches['shared'].get(slack_user_miss_key(self.company, email)):
+            return None
         try:
             response = self.client.users_lookupByEmail(email=email)
             if response["ok"]:
                 return response["user"]["id"]
         except SlackApiError as e:
+            _check_transient(e)
+            if e.response.get('error') == 'users_not_found':
+                remember_slack_user_miss(self.company, email)
+                return None
             logger.error(f"Error looking up Slack user by email {email}: {e.response['error']}")
         return None
 
@@ -79,6 +320,7 @@ class SlackNotificationService:
             )
             return True
         except SlackApiError as e:
+            _check_transient(e)
             logger.error(f"Error sending Slack message: {e.response['error']}")
             return False
 
@@ -387,6 +629,7 @@ class SlackNotificationService:
             )
             return True
         except SlackApiError as e:
+            _check_transient(e)
             logger.error(f"Error sending attendance report: {e.response['error']}")
             return False
 
@@ -1,3 +1,393 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web import SlackResponse
+
+from departments.models import Department, Designation
+from employees.models import Employee
+from organizations.models import Company
+from .models import NotificationOutbox, SlackConfiguration
+from .services import (
+    NotificationOutboxService, SlackInteractionDeduplicator, SlackInteractionExecutor, SlackUserSyncService,
+)
+from .views import SlackInteractionsView
+from .slack_utils import (
+    RateLimitedWebClient, SlackClientRegistry, SlackNotificationService, SlackRateLimitedError,
+    SlackRateLimiter, SlackTransientError, raise_transient_errors,
+)
+
+
+class NotificationOutboxTest(TestCase):
+    """Test cases for queuing and delivering Slack notifications through the outbox"""
+
+    def setUp(self):
+        """Set up test data"""
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-N001",
+            first_name="Notify",
+            last_name="Test",
+            email="notify@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+
+    def queue(self, method='notify_welcome', *args):
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationOutboxService.enqueue(method, *(args or (self.employee,)))
+        return NotificationOutbox.objects.latest('id')
+
+    def test_enqueue_waits_for_commit(self):
+        """Test nothing is written until the transaction commits, and models are stored by key"""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            NotificationOutboxService.enqueue('notify_missing_attendance', self.employee, date(2025, 12, 1))
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.status, NotificationOutbox.Status.PENDING)
+        self.assertEqual(entry.args, [
+            {'__model__': 'employees.employee', 'pk': self.employee.pk},
+            {'__date__': '2025-12-01'},
+        ])
+        self.assertEqual(NotificationOutboxService.decode(entry.args), [self.employee, date(2025, 12, 1)])
+
+    @override_settings(NOTIFICATION_OUTBOX_ENABLED=False)
+    def test_disabled_outbox_sends_inline(self):
+        """Test the helper is called directly when the outbox is switched off"""
+        with mock.patch.object(SlackNotificationService, 'notify_welcome', return_value=True) as notify:
+            NotificationOutboxService.enqueue('notify_welcome', self.employee)
+        notify.assert_called_once_with(self.employee)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_dispatch_marks_sent_and_skipped(self):
+        """Test delivered rows are marked sent and helpers that decline are marked skipped"""
+        sent = self.queue()
+        skipped = self.queue()
+        with mock.patch.object(SlackNotificationService, 'notify_welcome', side_effect=[True, False]) as notify:
+            counts = NotificationOutboxService.process_batch('test-worker')
+
+        self.assertEqual(counts, {NotificationOutbox.Status.SENT: 1, NotificationOutbox.Status.SKIPPED: 1})
+        notify.assert_called_with(self.employee)
+        sent.refresh_from_db()
+        skipped.refresh_from_db()
+        self.assertEqual(sent.status, NotificationOutbox.Status.SENT)
+        self.assertIsNotNone(sent.sent_at)
+        self.assertEqual(sent.claimed_by, '')
+        self.assertEqual(skipped.status, NotificationOutbox.Status.SKIPPED)
+
+    @override_settings(NOTIFICATION_OUTBOX_MAX_ATTEMPTS=2, NOTIFICATION_OUTBOX_BACKOFF_SECONDS=60)
+    def test_failures_back_off_then_dead_letter(self):
+        """Test a failing row is retried later and dead-lettered after the last attempt"""
+        entry = self.queue()
+        with mock.patch.object(SlackNotificationService, 'notify_welcome', side_effect=SlackTransientError('ratelimited')):
+            NotificationOutboxService.process_batch('test-worker')
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, NotificationOutbox.Status.PENDING)
+            self.assertEqual(entry.attempts, 1)
+            self.assertGreaterEqual(entry.next_attempt_at, timezone.now() + timedelta(seconds=59))
+            self.assertEqual(NotificationOutboxService.claim_batch('test-worker'), [])
+
+            NotificationOutbox.objects.filter(pk=entry.pk).update(next_attempt_at=timezone.now())
+            NotificationOutboxService.process_batch('test-worker')
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, NotificationOutbox.Status.DEAD)
+        self.assertEqual(entry.attempts, 2)
+        self.assertIn('ratelimited', entry.last_error)
+
+    def test_missing_object_and_unknown_method_dead_letter(self):
+        """Test payloads that can never be delivered go straight to the dead letters"""
+        gone = NotificationOutbox.objects.create(
+            method='notify_welcome', args=[{'__model__': 'employees.employee', 'pk': 999999}]
+        )
+        unknown = NotificationOutbox.objects.create(method='get_or_set_slack_id', args=[])
+        NotificationOutboxService.process_batch('test-worker')
+
+        for entry in (gone, unknown):
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, NotificationOutbox.Status.DEAD)
+            self.assertEqual(entry.attempts, 1)
+
+    @override_settings(NOTIFICATION_OUTBOX_CLAIM_TIMEOUT_SECONDS=60)
+    def test_stale_claims_are_released(self):
+        """Test rows held by a crashed worker are claimed again after the timeout"""
+        entry = self.queue()
+        self.assertEqual(len(NotificationOutboxService.claim_batch('crashed-worker')), 1)
+        self.assertEqual(NotificationOutboxService.claim_batch('other-worker'), [])
+
+        NotificationOutbox.objects.filter(pk=entry.pk).update(claimed_at=timezone.now() - timedelta(minutes=5))
+        claimed = NotificationOutboxService.claim_batch('other-worker')
+        self.assertEqual([e.pk for e in claimed], [entry.pk])
+        self.assertTrue(claimed[0].claimed_by.startswith('other-worker'))
+
+    def test_transient_slack_errors_raise_only_for_worker(self):
+        """Test rate limits are swallowed inline but raised inside raise_transient_errors()"""
+        response = SlackResponse(
+            client=None, http_verb='POST', api_url='', req_args={},
+            data={'ok': False, 'error': 'ratelimited'}, headers={}, status_code=429,
+        )
+        service = SlackNotificationService()
+        service.client = mock.Mock()
+        service.client.chat_postMessage.side_effect = SlackApiError('ratelimited', response)
+
+        self.assertFalse(service.send_message('C123', 'hello'))
+        with raise_transient_errors():
+            with self.assertRaises(SlackTransientError):
+                service.send_message('C123', 'hello')
+
+    def test_rate_limited_rows_are_deferred_without_an_attempt(self):
+        """Test the rest of a rate-limited run is put back for the Retry-After time"""
+        entries = [self.queue() for _ in range(3)]
+        side_effect = [True, SlackRateLimitedError('ratelimited', 30)]
+        with mock.patch.object(SlackNotificationService, 'notify_welcome', side_effect=side_effect) as notify:
+            counts = NotificationOutboxService.process_batch('test-worker')
+
+        self.assertEqual(counts, {NotificationOutbox.Status.SENT: 1, NotificationOutboxService.DEFERRED: 2})
+        self.assertEqual(notify.call_count, 2)
+        for entry in entries[1:]:
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, NotificationOutbox.Status.PENDING)
+            self.assertEqual(entry.attempts, 0)
+            self.assertGreaterEqual(entry.next_attempt_at, timezone.now() + timedelta(seconds=29))
+
+    def test_worker_command_drains_queue(self):
+        """Test the management command delivers due rows and exits with --once"""
+        self.queue()
+        out = StringIO()
+        with mock.patch.object(SlackNotificationService, 'notify_welcome', return_value=True):
+            call_command('run_notification_worker', '--once', stdout=out)
+        self.assertIn('sent: 1', out.getvalue())
+        self.assertEqual(NotificationOutbox.objects.get().status, NotificationOutbox.Status.SENT)
+
+
+class SlackClientRegistryTest(TestCase):
+    """Test cases for the cached per-company Slack configuration and clients"""
+
+    def setUp(self):
+        """Set up test data"""
+        SlackClientRegistry.invalidate()
+        self.company = Company.objects.create(name="Acme", slug="acme")
+        self.config = SlackConfiguration.objects.create(
+            company=self.company, bot_token="xoxb-one", management_channel_id="C1", slack_team_id="T1"
+        )
+
+    def test_burst_uses_one_query_and_one_client(self):
+        """Test repeated services for a company share the config lookup and client"""
+        with self.assertNumQueries(1):
+            services = [SlackNotificationService(company=self.company) for _ in range(5)]
+        self.assertEqual(len({id(service.client) for service in services}), 1)
+        self.assertEqual(services[0].management_channel, "C1")
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.assertEqual(SlackClientRegistry.config_for_team("T1").company, self.company)
+
+    def test_missing_configuration_is_cached(self):
+        """Test a company without Slack costs one query, not one per message"""
+        other = Company.objects.create(name="Other", slug="other")
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.assertIsNone(SlackNotificationService(company=other).client)
+
+    def test_saving_configuration_invalidates(self):
+        """Test a token change is picked up by the next service"""
+        first = SlackNotificationService(company=self.company).client
+        self.config.bot_token = "xoxb-two"
+        self.config.save()
+        service = SlackNotificationService(company=self.company)
+        self.assertIsNot(service.client, first)
+        self.assertEqual(service.client.token, "xoxb-two")
+
+
+class SlackUserSyncTest(TestCase):
+    """Test cases for bulk Slack ID resolution and cached misses"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        caches['shared'].clear()
+        SlackClientRegistry.invalidate()
+        self.company = Company.objects.create(name="Acme", slug="acme")
+        SlackConfiguration.objects.create(
+            company=self.company, bot_token="xoxb-sync", management_channel_id="C1", slack_team_id="T9"
+        )
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.employees = [
+            Employee.objects.create(
+                employee_id=f"EMP-Y00{index}",
+                first_name=f"Sync{index}",
+                last_name="Test",
+                email=f"sync{index}@example.com",
+                phone="+919999999999",
+                department=department,
+                designation=designation,
+                company=self.company,
+                joining_date=date(2025, 1, 1),
+            )
+            for index in range(3)
+        ]
+        self.client = mock.Mock()
+        self.client.users_list.side_effect = [
+            {'members': [
+                {'id': 'U0', 'profile': {'email': 'SYNC0@example.com'}},
+                {'id': 'UBOT', 'is_bot': True, 'profile': {'email': 'sync2@example.com'}},
+            ], 'response_metadata': {'next_cursor': 'page2'}},
+            {'members': [{'id': 'U1', 'profile': {'email': 'sync1@example.com'}}], 'response_metadata': {'next_cursor': ''}},
+        ]
+
+    def test_sync_pages_and_bulk_updates(self):
+        """Test IDs are matched by email across pages and misses are cached"""
+        with mock.patch.object(SlackClientRegistry, 'client_for', return_value=self.client):
+            result = SlackUserSyncService.sync_company(self.company)
+
+        self.assertEqual(result, {'matched': 2, 'updated': 2, 'missing': 1})
+        self.assertEqual(self.client.users_list.call_count, 2)
+        self.assertEqual(self.client.users_list.call_args[1]['cursor'], 'page2')
+        ids = dict(Employee.objects.filter(company=self.company).values_list('email', 'slack_user_id'))
+        self.assertEqual(ids, {'sync0@example.com': 'U0', 'sync1@example.com': 'U1', 'sync2@example.com': None})
+
+        # Another process (web, worker) has its own per-process cache
+        cache.clear()
+        with mock.patch.object(SlackClientRegistry, 'client_for', return_value=self.client):
+            service = SlackNotificationService(company=self.company)
+        self.assertIsNone(service.get_or_set_slack_id(self.employees[2]))
+        self.assertFalse(self.client.users_lookupByEmail.called)
+
+    def test_lookup_miss_is_cached(self):
+        """Test an email unknown to Slack is looked up only once"""
+        response = SlackResponse(
+            client=None, http_verb='POST', api_url='', req_args={},
+            data={'ok': False, 'error': 'users_not_found'}, headers={}, status_code=200,
+        )
+        self.client.users_lookupByEmail.side_effect = SlackApiError('users_not_found', response)
+        with mock.patch.object(SlackClientRegistry, 'client_for', return_value=self.client):
+            service = SlackNotificationService(company=self.company)
+        for _ in range(3):
+            self.assertFalse(service.send_message(self.employees[0], 'hello'))
+        self.assertEqual(self.client.users_lookupByEmail.call_count, 1)
+
+    def test_command_reports_counts(self):
+        """Test the management command syncs configured companies"""
+        out = StringIO()
+        with mock.patch.object(SlackClientRegistry, 'client_for', return_value=self.client):
+            call_command('sync_slack_ids', stdout=out)
+        self.assertIn('Acme: 2 matched, 2 updated, 1 without a Slack account', out.getvalue())
+
+
+class SlackRateLimiterTest(TestCase):
+    """Test cases for the per-workspace, per-method token buckets"""
+
+    def setUp(self):
+        """Set up test data"""
+        SlackRateLimiter.reset()
+
+    def tearDown(self):
+        SlackRateLimiter.reset()
+
+    @override_settings(SLACK_RATE_LIMITS={'test.method': (60, 2)})
+    def test_bucket_allows_burst_then_limits(self):
+        """Test the burst is served immediately and the next call reports its wait"""
+        SlackRateLimiter.acquire('xoxb-a', 'test.method', max_wait=0)
+        SlackRateLimiter.acquire('xoxb-a', 'test.method', max_wait=0)
+        with self.assertRaises(SlackRateLimitedError) as raised:
+            SlackRateLimiter.acquire('xoxb-a', 'test.method', max_wait=0)
+        self.assertAlmostEqual(raised.exception.retry_after, 1, delta=0.1)
+
+        # Other workspaces and methods have their own buckets
+        SlackRateLimiter.acquire('xoxb-b', 'test.method', max_wait=0)
+        SlackRateLimiter.acquire('xoxb-a', 'chat.postMessage', max_wait=0)
+
+    def test_retry_after_blocks_the_method(self):
+        """Test a 429 from Slack stops further calls until Retry-After has passed"""
+        response = SlackResponse(
+            client=None, http_verb='POST', api_url='', req_args={},
+            data={'ok': False, 'error': 'ratelimited'}, headers={'Retry-After': '7'}, status_code=429,
+        )
+        service = SlackNotificationService()
+        service.client = RateLimitedWebClient(token='xoxb-limited')
+        with mock.patch('slack_sdk.WebClient.api_call', side_effect=SlackApiError('ratelimited', response)) as call:
+            with raise_transient_errors():
+                with self.assertRaises(SlackRateLimitedError) as raised:
+                    service.send_message('C1', 'hello')
+                self.assertEqual(raised.exception.retry_after, 7)
+
+                with self.assertRaises(SlackRateLimitedError) as raised:
+                    service.send_message('C1', 'again')
+                self.assertGreater(raised.exception.retry_after, 6)
+        self.assertEqual(call.call_count, 1)
+
+
+@override_settings(SLACK_DEBUG_LOG_FILE='')
+class SlackInteractionsViewTest(TestCase):
+    """Test cases for deduplication and back-pressure on the Slack interactions endpoint"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        caches['shared'].clear()
+        self.event = {'type': 'event_callback', 'event_id': 'Ev123', 'team_id': 'T1', 'event': {'type': 'message'}}
+
+    def test_retried_event_is_processed_once(self):
+        """Test a Slack retry with the same event_id is acknowledged but not processed again"""
+        with mock.patch.object(SlackInteractionExecutor, 'submit', return_value=True) as submit:
+            first = self.client.post('/slack/interactions/', self.event, content_type='application/json')
+            retry = self.client.post('/slack/interactions/', self.event, content_type='application/json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(submit.call_count, 1)
+
+    def test_dedup_is_shared_across_processes(self):
+        """Test a retry is caught even when the per-process cache has not seen the first delivery"""
+        self.assertTrue(SlackInteractionDeduplicator.claim(self.event))
+        cache.clear()
+        self.assertFalse(SlackInteractionDeduplicator.claim(self.event))
+
+    def test_full_pool_asks_slack_to_retry(self):
+        """Test a full pool answers 503 and the retry is still processed"""
+        with mock.patch.object(SlackInteractionExecutor, 'submit', return_value=False):
+            busy = self.client.post('/slack/interactions/', self.event, content_type='application/json')
+        self.assertEqual(busy.status_code, 503)
+
+        with mock.patch.object(SlackInteractionExecutor, 'submit', return_value=True) as submit:
+            self.client.post('/slack/interactions/', self.event, content_type='application/json')
+        self.assertEqual(submit.call_count, 1)
+
+    @override_settings(SLACK_INTERACTION_WORKERS=1, SLACK_INTERACTION_QUEUE_SIZE=1)
+    def test_executor_is_bounded(self):
+        """Test the executor refuses work beyond its workers plus queue"""
+        SlackInteractionExecutor.shutdown()
+        self.addCleanup(SlackInteractionExecutor.shutdown)
+        release = threading.Event()
+        done = []
+
+        def work(payload):
+            release.wait(5)
+            done.append(payload)
+
+        with mock.patch('notifications.services.close_old_connections'):
+            self.assertTrue(SlackInteractionExecutor.submit(work, 1))
+            self.assertTrue(SlackInteractionExecutor.submit(work, 2))
+            self.assertFalse(SlackInteractionExecutor.submit(work, 3))
+            release.set()
+            SlackInteractionExecutor.shutdown(wait=True)
+        self.assertEqual(sorted(done), [1, 2])
+
+    def test_process_event_runs_on_pool(self):
+        """Test the view hands the payload to process_event through the executor"""
+        with mock.patch.object(SlackInteractionExecutor, 'submit', return_value=True) as submit:
+            self.client.post('/slack/interactions/', self.event, content_type='application/json')
+        func, payload = submit.call_args[0]
+        self.assertEqual(func.__func__, SlackInteractionsView.process_event)
+        self.assertEqual(payload['event_id'], 'Ev123')
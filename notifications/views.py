@@ -1,5 +1,4 @@
 import json
-import threading
 import logging
 import requests
 from django.http import JsonResponse, HttpResponse
@@ -9,6 +8,7 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
 from leaves.models import Leave
+from .services import SlackDebugLog, SlackInteractionDeduplicator, SlackInteractionExecutor
 # Note: Timesheet import removed as the attendance app was deleted.
 # We will skip timesheet actions in the check.
 
@@ -28,13 +28,10 @@ class SlackInteractionsView(APIView):
         return HttpResponse("🚀 Slack Interaction Endpoint is Active! Path: " + request.path)
 
     def post(self, request, *args, **kwargs):
-        log_entry = f"\n--- {timezone.now()} ---\nPath: {request.path}\nMethod: {request.method}\nData: {request.data}\nHeaders: {dict(request.headers)}\n"
         print(f"🔥 SLACK HIT: {request.path}")
-        try:
-            with open("slack_debug.log", "a") as f:
-                f.write(log_entry)
-        except Exception as e:
-            print(f"Logging error: {e}")
+        SlackDebugLog.write(
+            f"\n--- {timezone.now()} ---\nPath: {request.path}\nMethod: {request.method}\nData: {request.data}\nHeaders: {dict(request.headers)}\n"
+        )
         if request.data.get("type") == "url_verification":
             return JsonResponse({"challenge": request.data.get("challenge")})
 
@@ -55,31 +52,36 @@ class SlackInteractionsView(APIView):
         if not payload:
             return response
 
-        # Process async (Slack-safe)
-        threading.Thread(
-            target=target_method,
-            args=(payload,),
-            daemon=True
-        ).start()
+        # Slack retries deliveries it did not see acknowledged in time; process each once
+        if not SlackInteractionDeduplicator.claim(payload):
+            logger.info("Duplicate Slack delivery acknowledged without processing.")
+            return response
+
+        # Process async on the bounded pool (Slack-safe); when it is full, ask Slack to retry
+        if not SlackInteractionExecutor.submit(target_method, payload):
+            SlackInteractionDeduplicator.release(payload)
+            logger.warning("Slack interaction pool is full, asking Slack to retry.")
+            busy = HttpResponse("Busy", status=503)
+            busy["Retry-After"] = "5"
+            return busy
 
         return response
 
     def process_event(self, payload):
         """ Handles Slack Event API (e.g. messages) """
         try:
-            from .models import SlackConfiguration
+            from .slack_utils import SlackClientRegistry
             
             team_id = payload.get("team_id")
             if not team_id:
                 logger.error("No team_id found in Slack event payload.")
                 return
             
-            try:
-                config = SlackConfiguration.objects.get(slack_team_id=team_id)
-                company = config.company
-            except SlackConfiguration.DoesNotExist:
+            config = SlackClientRegistry.config_for_team(team_id)
+            if config is None:
                 logger.error(f"SlackConfiguration not found for team_id: {team_id}")
                 return
+            company = config.company
 
             event_type = payload.get("type")
             if event_type != "event_callback":
@@ -136,19 +138,18 @@ class SlackInteractionsView(APIView):
 
     def process_action(self, payload):
         try:
-            from .models import SlackConfiguration
+            from .slack_utils import SlackClientRegistry
             
             team_id = payload.get("team", {}).get("id")
             if not team_id:
                 logger.error("No team_id found in Slack payload.")
                 return
             
-            try:
-                config = SlackConfiguration.objects.get(slack_team_id=team_id)
-                company = config.company
-            except SlackConfiguration.DoesNotExist:
+            config = SlackClientRegistry.config_for_team(team_id)
+            if config is None:
                 logger.error(f"SlackConfiguration not found for team_id: {team_id}")
                 return
+            company = config.company
 
             actions = payload.get("actions", [])
             if not actions:
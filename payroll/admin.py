@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import SalaryStructure, Payslip, PayrollConfig
+from .models import SalaryStructure, Payslip, PayrollConfig, PayrollRun, PayrollYTD
+from .services import PayrollRunService
 
 @admin.register(SalaryStructure)
 class SalaryStructureAdmin(admin.ModelAdmin):
@@ -18,3 +19,40 @@ class PayslipAdmin(admin.ModelAdmin):
 class PayrollConfigAdmin(admin.ModelAdmin):
     list_display = ('key', 'updated_at')
     search_fields = ('key',)
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'company', 'month', 'year', 'status', 'processed', 'total_employees',
+                    'created_count', 'skipped_count', 'error_count', 'progress_at')
+    list_filter = ('status', 'year', 'month', 'company')
+    readonly_fields = ('status', 'total_employees', 'processed', 'created_count', 'skipped_count',
+                       'error_count', 'errors', 'progress_at', 'started_at', 'finished_at',
+                       'triggered_by', 'created_at')
+    actions = ['queue_runs']
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.triggered_by = request.user
+        super().save_model(request, obj, form, change)
+
+    # Runs are processed by `run_payroll --queued`, not inside the admin request
+    @admin.action(description='Queue selected runs for payslip generation')
+    def queue_runs(self, request, queryset):
+        requeued = PayrollRunService.enqueue(queryset)
+        waiting = queryset.filter(status=PayrollRun.Status.PENDING).count()
+        self.message_user(request, f'{waiting} runs queued ({requeued} failed runs requeued)')
+
+
+@admin.register(PayrollYTD)
+class PayrollYTDAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'fiscal_year', 'payslip_count', 'gross_earnings', 'tds', 'net_salary', 'updated_at')
+    list_filter = ('fiscal_year',)
+    search_fields = ('employee__first_name', 'employee__last_name', 'employee__employee_id')
+
+    # Maintained from payslips; use rebuild_payroll_ytd to recompute
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,31 @@
+"""
+Management command to recompute PayrollYTD rows from issued payslips.
+
+Run it once after deploying PayrollYTD, and after any bulk change to payslips
+(queryset updates and bulk_create bypass the signals that keep YTD in step).
+
+Usage:
+    # Every fiscal year that has payslips
+    python manage.py rebuild_payroll_ytd
+
+    # One fiscal year (2025 = April 2025 to March 2026 with the default start month)
+    python manage.py rebuild_payroll_ytd --fiscal-year 2025
+"""
+from django.core.management.base import BaseCommand
+from payroll.services import PayrollYTDService
+
+
+class Command(BaseCommand):
+    help = 'Recompute year-to-date payroll totals from issued payslips'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fiscal-year', type=int, help='Fiscal year to rebuild (default: all)')
+
+    def handle(self, *args, **options):
+        fiscal_years = [options['fiscal_year']] if options['fiscal_year'] else PayrollYTDService.fiscal_years()
+        total = 0
+        for fiscal_year in fiscal_years:
+            written = PayrollYTDService.rebuild(fiscal_year)
+            total += written
+            self.stdout.write(f"{fiscal_year}: {written} employees")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} YTD rows for {len(fiscal_years)} fiscal years"))
@@ -0,0 +1,90 @@
+"""
+Management command to generate draft payslips for a company-month.
+
+Creates a PayrollRun and processes it: every active employee without a payslip
+for the month gets one; employees that already have one are skipped, so the
+command can be re-run safely. Per-employee failures are listed on the run.
+
+Usage:
+    # Last month, every company
+    python manage.py run_payroll
+
+    # One company, computed and rendered to PDF across 4 processes
+    python manage.py run_payroll --month 3 --year 2026 --company 1 --workers 4 --pdfs
+
+    # Resume an existing pending, failed or stale run
+    python manage.py run_payroll --run 12
+
+    # Process runs queued from the admin, and running runs whose process died (e.g. from cron)
+    python manage.py run_payroll --queued
+"""
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from organizations.models import Company
+from payroll.models import PayrollRun
+from payroll.services import PayrollRunService
+
+
+class Command(BaseCommand):
+    help = 'Generate draft payslips for every active employee for a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=int, help='Month 1-12 (default: last month)')
+        parser.add_argument('--year', type=int, help='Year (default: year of last month)')
+        parser.add_argument('--company', type=int, help='Only employees of this company ID')
+        parser.add_argument('--run', type=int, help='Process an existing PayrollRun instead of creating one')
+        parser.add_argument('--queued', action='store_true',
+                            help='Process every pending run and every stale running run, oldest first')
+        parser.add_argument('--workers', type=int, help='Processes used to compute salaries (default: PAYROLL_RUN_WORKERS)')
+        parser.add_argument('--chunk-size', type=int, help='Employees per progress update (default: PAYROLL_RUN_CHUNK_SIZE)')
+        parser.add_argument('--pdfs', action='store_true', default=None,
+                            help='Render payslip PDFs after the run (default: PAYROLL_RUN_RENDER_PDFS)')
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            runs = list(PayrollRunService.queued())
+            if not runs:
+                self.stdout.write("No queued payroll runs")
+            for run in runs:
+                self.process_run(run, options)
+            return
+
+        if options['run']:
+            run = PayrollRun.objects.filter(pk=options['run']).first()
+            if not run:
+                raise CommandError(f"Payroll run {options['run']} does not exist")
+        else:
+            last_month = timezone.now().date().replace(day=1) - timedelta(days=1)
+            month = options['month'] or last_month.month
+            year = options['year'] or last_month.year
+            if not 1 <= month <= 12:
+                raise CommandError("--month must be between 1 and 12")
+
+            company = None
+            if options['company']:
+                company = Company.objects.filter(pk=options['company']).first()
+                if not company:
+                    raise CommandError(f"Company {options['company']} does not exist")
+            run = PayrollRunService.create(month, year, company=company)
+
+        self.process_run(run, options)
+
+    def process_run(self, run, options):
+        run = PayrollRunService.execute(
+            run, workers=options['workers'], chunk_size=options['chunk_size'], render_pdfs=options['pdfs']
+        )
+
+        for error in run.errors[:20]:
+            self.stdout.write(self.style.WARNING(f"{error['employee'] or 'Run'}: {error['error']}"))
+        if len(run.errors) > 20:
+            self.stdout.write(f"... and {len(run.errors) - 20} more")
+
+        summary = (
+            f"Payroll run {run.pk} for {run.month}/{run.year}: {run.get_status_display()} - "
+            f"{run.created_count} created, {run.skipped_count} skipped, {run.error_count} errors"
+        )
+        if run.status == PayrollRun.Status.COMPLETED:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.ERROR(summary))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-17 02:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('payroll', '0003_payslip_allocated_leaves_payslip_final_leave_balance_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.IntegerField()),
+                ('year', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_employees', models.IntegerField(default=0)),
+                ('processed', models.IntegerField(default=0)),
+                ('created_count', models.IntegerField(default=0)),
+                ('skipped_count', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('progress_at', models.DateTimeField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(blank=True, help_text='Leave empty to run for every active employee', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payroll_runs', to='organizations.company')),
+                ('triggered_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['year', 'month', 'company'], name='payroll_pay_year_19304b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_alter_employee_photo'),
+        ('payroll', '0004_payroll_run'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salarystructure',
+            index=models.Index(fields=['employee', 'applicable_from'], name='payroll_sal_employe_4354b6_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_ytd(apps, schema_editor):
+    """Seed PayrollYTD from the payslips issued before the table existed"""
+    Payslip = apps.get_model('payroll', 'Payslip')
+    PayrollYTD = apps.get_model('payroll', 'PayrollYTD')
+    start_month = getattr(settings, 'PAYROLL_FISCAL_YEAR_START_MONTH', 4)
+    fields = (
+        'total_earnings', 'total_deductions', 'net_salary', 'tds', 'epf',
+        'unpaid_leave_deduction', 'unpaid_leaves',
+    )
+
+    rows = {}
+    payslips = Payslip.objects.filter(status__in=('published', 'paid')).order_by().values_list(
+        'employee_id', 'month', 'year', *fields
+    )
+    for employee_id, month, year, *values in payslips.iterator():
+        fiscal_year = year if month >= start_month else year - 1
+        row = rows.get((employee_id, fiscal_year))
+        if row is None:
+            row = rows[(employee_id, fiscal_year)] = PayrollYTD(employee_id=employee_id, fiscal_year=fiscal_year)
+        row.payslip_count += 1
+        row.gross_earnings += values[0] or 0
+        row.total_deductions += values[1] or 0
+        row.net_salary += values[2] or 0
+        row.tds += values[3] or 0
+        row.epf += values[4] or 0
+        row.unpaid_leave_deduction += values[5] or 0
+        row.unpaid_leaves += values[6] or 0
+    PayrollYTD.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_alter_employee_photo'),
+        ('payroll', '0005_salary_structure_effective_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollYTD',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fiscal_year', models.IntegerField(help_text='Calendar year in which the fiscal year starts')),
+                ('payslip_count', models.IntegerField(default=0)),
+                ('gross_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_deductions', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net_salary', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('tds', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='TDS')),
+                ('epf', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='EPF')),
+                ('unpaid_leave_deduction', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unpaid_leaves', models.DecimalField(decimal_places=1, default=0, max_digits=6)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_ytd', to='employees.employee')),
+            ],
+            options={
+                'verbose_name': 'Payroll YTD',
+                'verbose_name_plural': 'Payroll YTD',
+                'ordering': ['-fiscal_year', 'employee'],
+                'unique_together': {('employee', 'fiscal_year')},
+            },
+        ),
+        migrations.RunPython(backfill_ytd, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from employees.models import Employee
 
@@ -40,6 +40,7 @@ class SalaryStructure(models.Model):
     class Meta:
         verbose_name = "Salary Structure"
         verbose_name_plural = "Salary Structures"
+        indexes = [models.Index(fields=['employee', 'applicable_from'])]
 
     def __str__(self):
         return f"Salary Structure - {self.employee.get_full_name()}"
@@ -118,6 +119,30 @@ class Payslip(models.Model):
     def __str__(self):
         return f"Payslip {self.month}/{self.year} - {self.employee.get_full_name()}"
 
+    def save(self, *args, **kwargs):
+        # The PayrollYTD update in post_save commits or rolls back with the payslip
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+    # Fields that make up the payslip's contribution to PayrollYTD
+    YTD_SOURCE_FIELDS = (
+        'employee_id', 'month', 'year', 'status', 'total_earnings', 'total_deductions',
+        'net_salary', 'tds', 'epf', 'unpaid_leave_deduction', 'unpaid_leaves',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from .services import PayrollYTDService
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded contribution so saving applies only the difference
+        if all(field in instance.__dict__ for field in cls.YTD_SOURCE_FIELDS):
+            instance._ytd_snapshot = PayrollYTDService.snapshot(instance)
+        return instance
+
 class PayrollConfig(models.Model):
     """
     Generic payroll configurations.
@@ -129,3 +154,81 @@ class PayrollConfig(models.Model):
 
     def __str__(self):
         return self.key
+
+
+class PayrollRun(models.Model):
+    """
+    One payslip generation pass over a company (or every company) for a month.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    company = models.ForeignKey(
+        'organizations.Company',
+        on_delete=models.CASCADE,
+        related_name='payroll_runs',
+        null=True,
+        blank=True,
+        help_text="Leave empty to run for every active employee",
+    )
+    month = models.IntegerField()  # 1-12
+    year = models.IntegerField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+
+    # Progress
+    total_employees = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    created_count = models.IntegerField(default=0)
+    skipped_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # [{"employee_id", "employee", "error"}]
+    progress_at = models.DateTimeField(null=True, blank=True)
+
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    triggered_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='payroll_runs',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['year', 'month', 'company'])]
+
+    def __str__(self):
+        scope = self.company or "All companies"
+        return f"Payroll run {self.month}/{self.year} - {scope} ({self.get_status_display()})"
+
+
+class PayrollYTD(models.Model):
+    """
+    Year-to-date totals of an employee's issued (published or paid) payslips
+    for one fiscal year, kept in step by the payslip signals.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='payroll_ytd')
+    fiscal_year = models.IntegerField(help_text="Calendar year in which the fiscal year starts")
+    payslip_count = models.IntegerField(default=0)
+    gross_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_deductions = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net_salary = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tds = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="TDS")
+    epf = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="EPF")
+    unpaid_leave_deduction = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unpaid_leaves = models.DecimalField(max_digits=6, decimal_places=1, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Payroll YTD"
+        verbose_name_plural = "Payroll YTD"
+        unique_together = ['employee', 'fiscal_year']
+        ordering = ['-fiscal_year', 'employee']
+
+    def __str__(self):
+        return f"YTD {self.fiscal_year}-{str(self.fiscal_year + 1)[2:]} - {self.employee_id}"
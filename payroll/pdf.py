@@ -0,0 +1,71 @@
+"""
+Minimal PDF writer for payslips.
+
+Writes a single A4 page of text in the standard Helvetica fonts, so no
+rendering library is needed. The output depends only on the rows passed in
+(no timestamps or random IDs), which keeps documents content-addressable.
+"""
+
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+VALUE_X = 380
+
+# style: (font, size, space above)
+STYLES = {
+    'title': ('F2', 18, 0),
+    'heading': ('F2', 12, 14),
+    'text': ('F1', 10, 2),
+    'total': ('F2', 10, 4),
+}
+
+
+def _escape(text):
+    text = str(text).encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def render(rows):
+    """
+    PDF bytes for [(style, label, value)] rows laid out top to bottom.
+    `value` (may be empty) is printed in a second column; rows that do not
+    fit on the page are dropped.
+    """
+    commands = []
+    y = PAGE_HEIGHT - MARGIN
+    for style, label, value in rows:
+        font, size, space = STYLES[style]
+        y -= size + space
+        if y < MARGIN:
+            break
+        commands.append(f"BT /{font} {size} Tf {MARGIN} {y} Td ({_escape(label)}) Tj ET")
+        if value not in (None, ''):
+            commands.append(f"BT /{font} {size} Tf {VALUE_X} {y} Td ({_escape(value)}) Tj ET")
+    stream = "\n".join(commands).encode('latin-1')
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>"
+        ).encode('latin-1'),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+    ]
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    return bytes(output)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import SalaryStructure, Payslip, PayrollConfig
+from .models import SalaryStructure, Payslip, PayrollConfig, PayrollYTD
 
 class PayslipSummarySerializer(serializers.ModelSerializer):
     month_name = serializers.SerializerMethodField()
@@ -120,6 +120,7 @@ class PayslipSerializer(serializers.ModelSerializer):
     bank_details = serializers.SerializerMethodField()
     earnings_breakdown = serializers.SerializerMethodField()
     deductions_breakdown = serializers.SerializerMethodField()
+    pdf_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Payslip
@@ -128,7 +129,7 @@ class PayslipSerializer(serializers.ModelSerializer):
             'allocated_leaves', 'paid_leaves', 'unpaid_leaves', 'final_leave_balance',
             'status', 'misc_deduction_2', 'bonus', 'total_working_days',
             'total_earnings', 'total_deductions', 'total_taxes', 'total_net_salary',
-            'statement_reference', 'bank_details', 'earnings_breakdown', 'deductions_breakdown'
+            'statement_reference', 'bank_details', 'earnings_breakdown', 'deductions_breakdown', 'pdf_url'
         ]
 
     def get_status(self, obj):
@@ -178,6 +179,13 @@ class PayslipSerializer(serializers.ModelSerializer):
         ]
         return [item for item in items if item["amount"] > 0]
 
+    def get_pdf_url(self, obj):
+        # Versioned by the document digest, so the download can be cached for good
+        from django.urls import reverse
+        from .services import PayslipDocumentService
+        digest = PayslipDocumentService.digest(PayslipDocumentService.rows(obj))
+        return f"{reverse('payslip-pdf', args=[obj.id])}?v={digest}"
+
 class SalaryOverviewSerializer(serializers.Serializer):
     id = serializers.CharField(source='employee.id')
     name = serializers.CharField(source='employee.get_full_name')
@@ -209,3 +217,50 @@ class PayrollConfigSerializer(serializers.ModelSerializer):
     class Meta:
         model = PayrollConfig
         fields = ['key', 'value', 'description']
+
+class PayrollSimulationSerializer(serializers.Serializer):
+    """Input of the payroll what-if preview"""
+    month = serializers.IntegerField(min_value=1, max_value=12)
+    year = serializers.IntegerField(min_value=2000, max_value=2100)
+    employee_id = serializers.IntegerField(required=False)
+    department_id = serializers.IntegerField(required=False)
+    structure = serializers.DictField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0),
+        required=False,
+        help_text="Salary structure fields to override, e.g. {\"basic_salary\": 40000}"
+    )
+    extra_leave_days = serializers.ListField(child=serializers.DateField(), required=False, default=list)
+    extra_leave_unpaid = serializers.BooleanField(default=True)
+    extra_holidays = serializers.ListField(child=serializers.DateField(), required=False, default=list)
+    refresh = serializers.BooleanField(default=False, help_text="Rebuild the cached month inputs")
+
+    def validate_structure(self, value):
+        from .services import STRUCTURE_FIELDS
+        unknown = sorted(set(value) - set(STRUCTURE_FIELDS))
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(STRUCTURE_FIELDS)}"
+            )
+        return value
+
+    def validate(self, data):
+        if bool(data.get('employee_id')) == bool(data.get('department_id')):
+            raise serializers.ValidationError("Provide exactly one of employee_id or department_id.")
+        for field in ('extra_leave_days', 'extra_holidays'):
+            outside = [d for d in data[field] if (d.year, d.month) != (data['year'], data['month'])]
+            if outside:
+                raise serializers.ValidationError({field: f"Dates must fall in {data['month']:02d}/{data['year']}."})
+        return data
+
+class PayrollYTDSerializer(serializers.ModelSerializer):
+    fiscal_year_label = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PayrollYTD
+        fields = [
+            'fiscal_year', 'fiscal_year_label', 'payslip_count', 'gross_earnings', 'total_deductions',
+            'net_salary', 'tds', 'epf', 'unpaid_leave_deduction', 'unpaid_leaves', 'updated_at'
+        ]
+
+    def get_fiscal_year_label(self, obj):
+        return f"{obj.fiscal_year}-{str(obj.fiscal_year + 1)[2:]}"
@@ -1,100 +1,306 @@
-from datetime import date, timedelta, datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
 import calendar
-from django.db.models import Sum, Q
+import logging
+from django.conf import settings
+from django.db.models import Sum, Q, F
+from django.utils import timezone
 from decimal import Decimal
 from leaves.models import Leave, LeaveBalance, LeaveQuota
-from holidays.models import Holiday
+from leaves.services import LeaveDateIndex
+from holidays.services import CompanyCalendarService
 from attendance.models import Attendance
+from attendance import daygrid
 from attendance.services import AttendanceCalculationService
-from .models import SalaryStructure, Payslip
+from .models import SalaryStructure, Payslip, PayrollRun, PayrollYTD
+
+logger = logging.getLogger(__name__)
+
+
+def _is_present(times):
+    """True when any (in, out) pair of an attendance row's ATTENDANCE_TIME_FIELDS is complete"""
+    office_in, office_out, home_in, home_out, punch_in, punch_out = times
+    return bool((office_in and office_out) or (home_in and home_out) or (punch_in and punch_out))
+
+
+ATTENDANCE_TIME_FIELDS = (
+    'office_in_time', 'office_out_time', 'home_in_time', 'home_out_time', 'in_time', 'out_time',
+)
+
+STRUCTURE_FIELDS = (
+    'basic_salary', 'hra', 'medical_allowance', 'conveyance_allowance', 'special_allowance', 'epf', 'tds',
+)
+
+
+class SalaryStructureService:
+    """
+    Effective-dated salary structure lookup.
+
+    A structure applies from applicable_from through applicable_till; either end
+    may be empty (open-ended). On a given day the active structure with the
+    latest applicable_from that covers it wins, ties going to the oldest row as
+    `.filter(is_active=True).first()` used to. Every lookup, however many
+    employees and dates it covers, is one query over (employee, applicable_from).
+    """
+
+    @staticmethod
+    def timelines(employee_ids, start_date, end_date):
+        """{employee_id: [structure dict]} of active structures overlapping the range"""
+        timelines = {}
+        for structure in SalaryStructure.objects.filter(
+            Q(applicable_from__isnull=True) | Q(applicable_from__lte=end_date),
+            Q(applicable_till__isnull=True) | Q(applicable_till__gte=start_date),
+            employee_id__in=employee_ids,
+            is_active=True,
+        ).values('id', 'employee_id', 'applicable_from', 'applicable_till', *STRUCTURE_FIELDS):
+            timelines.setdefault(structure['employee_id'], []).append(structure)
+        for timeline in timelines.values():
+            # Newest applicable_from first; equal dates keep the oldest row first
+            timeline.sort(key=lambda s: (s['applicable_from'] or date.min, -s['id']), reverse=True)
+        return timelines
+
+    @staticmethod
+    def resolve(timeline, day):
+        """Structure of a timeline in force on `day`, or None"""
+        for structure in timeline:
+            starts, ends = structure['applicable_from'], structure['applicable_till']
+            if (starts is None or starts <= day) and (ends is None or ends >= day):
+                return structure
+        return None
+
+    @staticmethod
+    def values(structure):
+        return {field: structure[field] for field in STRUCTURE_FIELDS}
+
+    @staticmethod
+    def gross(values):
+        """Monthly earnings of structure values, like SalaryStructure.total_earnings"""
+        return (
+            values['basic_salary'] + values['hra'] + values['medical_allowance']
+            + values['conveyance_allowance'] + values['special_allowance']
+        )
+
+    @classmethod
+    def effective_on(cls, pairs):
+        """{(employee_id, day): structure values or None} for many (employee_id, day) pairs"""
+        pairs = list(pairs)
+        if not pairs:
+            return {}
+        days = [day for _, day in pairs]
+        timelines = cls.timelines({employee_id for employee_id, _ in pairs}, min(days), max(days))
+        result = {}
+        for employee_id, day in pairs:
+            structure = cls.resolve(timelines.get(employee_id, []), day)
+            result[(employee_id, day)] = cls.values(structure) if structure else None
+        return result
+
+    @classmethod
+    def prorate(cls, timeline, month, year):
+        """
+        Structure values for a month, each component weighted by the days every
+        structure was in force (a mid-month increment pays the old amounts up to
+        the day before and the new ones from that day). Days before the first or
+        after the last structure of the month take the nearest one. None when no
+        structure applies in the month.
+        """
+        _, last_day = calendar.monthrange(year, month)
+        in_force = [cls.resolve(timeline, date(year, month, day)) for day in range(1, last_day + 1)]
+        covered = [structure for structure in in_force if structure]
+        if not covered:
+            return None
+
+        days_by_structure = {}
+        structures = {}
+        current = covered[0]
+        for structure in in_force:
+            current = structure or current
+            days_by_structure[current['id']] = days_by_structure.get(current['id'], 0) + 1
+            structures[current['id']] = current
+
+        if len(days_by_structure) == 1:
+            return cls.values(current)
+        prorated = {}
+        for field in STRUCTURE_FIELDS:
+            total = sum((structures[pk][field] * days for pk, days in days_by_structure.items()), Decimal('0'))
+            prorated[field] = (total / last_day).quantize(Decimal('0.01'))
+        return prorated
+
+    @classmethod
+    def for_month(cls, employee_ids, month, year):
+        """{employee_id: prorated structure values} for employees with a structure in the month"""
+        start_date = date(year, month, 1)
+        end_date = date(year, month, calendar.monthrange(year, month)[1])
+        result = {}
+        for employee_id, timeline in cls.timelines(employee_ids, start_date, end_date).items():
+            values = cls.prorate(timeline, month, year)
+            if values is not None:
+                result[employee_id] = values
+        return result
+
+    @classmethod
+    def arrears(cls, payslips):
+        """
+        {payslip_id: amount still owed} for issued payslips, from the structures
+        now on record (e.g. a back-dated increment). The unpaid leave deduction
+        scales with gross salary, so it is recomputed proportionally.
+        """
+        payslips = list(payslips)
+        if not payslips:
+            return {}
+        months = [(p.year, p.month) for p in payslips]
+        first, last = min(months), max(months)
+        timelines = cls.timelines(
+            {p.employee_id for p in payslips},
+            date(first[0], first[1], 1),
+            date(last[0], last[1], calendar.monthrange(*last)[1]),
+        )
+
+        result = {}
+        for payslip in payslips:
+            values = cls.prorate(timelines.get(payslip.employee_id, []), payslip.month, payslip.year)
+            if values is None or not payslip.total_earnings:
+                result[payslip.id] = Decimal('0.00')
+                continue
+            gross = cls.gross(values)
+            deduction = payslip.unpaid_leave_deduction * gross / payslip.total_earnings
+            owed = (gross - payslip.total_earnings) - (deduction - payslip.unpaid_leave_deduction)
+            result[payslip.id] = owed.quantize(Decimal('0.01'))
+        return result
+
 
 class PayrollService:
     @staticmethod
-    def calculate_monthly_salary(employee, month, year):
+    def month_range(month, year):
+        """(start_date, end_date, days_in_month)"""
+        _, last_day = calendar.monthrange(year, month)
+        return date(year, month, 1), date(year, month, last_day), last_day
+
+    @staticmethod
+    def unpaid_leave_days(leave_dates):
+        """{date: True if the leave covering it is unpaid} from a LeaveDateIndex-like lookup"""
+        return {
+            day: leave.leave_type == Leave.LeaveType.UNPAID_LEAVE
+            for day, leave in leave_dates.items()
+        }
+
+    @staticmethod
+    def day_counts(payroll_inputs, month, year, holidays):
+        """
+        (working_days, absent_days, paid_leave_days, unpaid_leave_days) per input,
+        classified together as one company-month by the shared day kernel.
+
+        Days before joining, weekends and holidays are neither paid nor deducted.
+        A day with attendance is worked whatever the leave says; otherwise a paid
+        leave day counts as working and an unpaid one, like a day with neither
+        attendance nor leave, as absent.
+        """
+        grid = daygrid.MonthGrid(year, month, holidays)
+        joined, leave, unpaid, worked = [], [], [], []
+        for payroll_input in payroll_inputs:
+            present = payroll_input['present']
+            leaves = payroll_input['leaves']
+            joined.append(grid.joined(payroll_input['joining_date']))
+            worked.append(grid.mask(present))
+            leave.append(grid.mask(day for day in leaves if day not in present))
+            unpaid.append(grid.mask(day for day, is_unpaid in leaves.items() if is_unpaid))
+
+        if not joined:
+            return []
+        codes = daygrid.classify(
+            grid, grid.matrix(joined), leave=grid.matrix(leave), unpaid=grid.matrix(unpaid), worked=grid.matrix(worked)
+        )
+        result = []
+        for day_counts in daygrid.counts(codes):
+            paid_leave_days = day_counts[daygrid.LEAVE]
+            unpaid_leave_days = day_counts[daygrid.UNPAID_LEAVE]
+            result.append((
+                day_counts[daygrid.WORKED] + paid_leave_days,
+                day_counts[daygrid.ABSENT] + unpaid_leave_days,
+                paid_leave_days,
+                unpaid_leave_days,
+            ))
+        return result
+
+    @staticmethod
+    def salary(payroll_input, month, year, day_counts):
+        """Financial figures of one employee-month from its day_counts() entry"""
+        _, last_day = calendar.monthrange(year, month)
+        working_days_count, absent_days_count, paid_leave_days, unpaid_leave_days = day_counts
+        structure = payroll_input['structure']
+
+        gross_salary = SalaryStructureService.gross(structure)
+        daily_rate = gross_salary / Decimal(last_day)
+
+        unpaid_leave_deduction = absent_days_count * daily_rate
+        statutory_deductions = structure['epf'] + structure['tds']
+        net_salary = gross_salary - statutory_deductions - unpaid_leave_deduction
+
+        return {
+            "month": month,
+            "year": year,
+            "gross_salary": gross_salary,
+            "working_days": working_days_count,
+            "absent_days": absent_days_count,
+            "paid_leave_days": paid_leave_days,
+            "unpaid_leave_days": unpaid_leave_days,
+            "statutory_deductions": statutory_deductions,
+            "unpaid_leave_deduction": unpaid_leave_deduction.quantize(Decimal('0.01')),
+            "net_salary": net_salary.quantize(Decimal('0.01')),
+            "leave_balance": payroll_input['available'],
+            "allocated_leaves": payroll_input['allocated'],
+            "daily_rate": daily_rate.quantize(Decimal('0.01'))
+        }
+
+    @classmethod
+    def compute_many(cls, payroll_inputs, month, year, holidays):
+        """
+        Salaries for many employees from pre-fetched, plain data (no queries).
+
+        Each payroll input holds joining_date, the structure components, the set
+        of present dates, {date: is_unpaid} for approved leave days and the leave
+        balance figures; `holidays` is a collection of holiday dates. Everything
+        is picklable so the calculation can run in a worker process.
+        """
+        return [
+            cls.salary(payroll_input, month, year, day_counts)
+            for payroll_input, day_counts in zip(payroll_inputs, cls.day_counts(payroll_inputs, month, year, holidays))
+        ]
+
+    @classmethod
+    def compute(cls, payroll_input, month, year, holidays):
+        """Salary for one employee, see compute_many()"""
+        return cls.compute_many([payroll_input], month, year, holidays)[0]
+
+    @classmethod
+    def calculate_monthly_salary(cls, employee, month, year):
         """
         Calculates the salary for an employee for a specific month.
         Automated based on Attendance and Approved Leaves.
         """
-        # 1. Get Salary Structure
-        salary_structure = SalaryStructure.objects.filter(employee=employee, is_active=True).first()
-        if not salary_structure:
+        # 1. Get the Salary Structure(s) in force during the month, prorated
+        structure = SalaryStructureService.for_month([employee.id], month, year).get(employee.id)
+        if not structure:
             return None
 
         # 2. Get Month Range
-        _, last_day = calendar.monthrange(year, month)
-        start_date = date(year, month, 1)
-        end_date = date(year, month, last_day)
-        
-        # 3. Calculate Attendance/Working Days automatically
-        working_days_count = 0
-        absent_days_count = 0
-        total_days = last_day
-        
-        # Fetch all attendance records for this month once to avoid repeated DB hits
-        attendance_records = {a.date: a for a in Attendance.objects.filter(
-            employee=employee, date__range=[start_date, end_date]
-        )}
-        
-        # Fetch leaves and holidays
-        holidays = set(Holiday.objects.filter(
-            date__range=[start_date, end_date], is_active=True
-        ).values_list('date', flat=True))
-        
-        # Approved leaves
+        start_date, end_date, _ = cls.month_range(month, year)
+
+        # 3. Fetch attendance, approved leaves, holidays and the leave balance
+        present = {
+            row[0] for row in Attendance.objects.filter(
+                employee=employee, date__range=[start_date, end_date]
+            ).values_list('date', *ATTENDANCE_TIME_FIELDS)
+            if _is_present(row[1:])
+        }
+        holidays = CompanyCalendarService.holidays_in_range(start_date, end_date)
         approved_leaves = Leave.objects.filter(
             employee=employee,
             status='Approved',
             from_date__lte=end_date,
             to_date__gte=start_date
         )
-        
-        leave_dates = {}
-        for l in approved_leaves:
-            curr = max(l.from_date, start_date)
-            limit = min(l.to_date, end_date)
-            while curr <= limit:
-                leave_dates[curr] = l
-                curr += timedelta(days=1)
-
-        # 4. Iterate through each day to determine payment status
-        for day in range(1, last_day + 1):
-            curr_date = date(year, month, day)
-            
-            # Skip if before joining
-            if employee.joining_date and curr_date < employee.joining_date:
-                continue
-                
-            # If it's a weekend or holiday, it's a paid non-working day
-            if curr_date.weekday() >= 5 or curr_date in holidays:
-                continue
-
-            # Check attendance
-            att = attendance_records.get(curr_date)
-            leave = leave_dates.get(curr_date)
-            
-            if att and ((att.office_in_time and att.office_out_time) or 
-                       (att.home_in_time and att.home_out_time) or
-                       (att.in_time and att.out_time)):
-                working_days_count += 1
-            elif leave:
-                # If on paid leave, it counts as working/paid
-                if leave.leave_type != Leave.LeaveType.UNPAID_LEAVE:
-                    working_days_count += 1
-                else:
-                    absent_days_count += 1
-            else:
-                # No attendance and no leave = Absent (Undeducted)
-                absent_days_count += 1
-
-        # 5. Financial Calculations
-        gross_salary = salary_structure.total_earnings
-        daily_rate = gross_salary / Decimal(total_days)
-        
-        unpaid_leave_deduction = absent_days_count * daily_rate
-        statutory_deductions = salary_structure.epf + salary_structure.tds
-        net_salary = gross_salary - statutory_deductions - unpaid_leave_deduction
+        leave_dates = LeaveDateIndex(approved_leaves, start_date, end_date)
 
-        # 6. Fetch Leave Balance Info
         total_allocated = Decimal('0')
         remaining_balance = Decimal('0')
         balance_obj = LeaveBalance.objects.filter(employee=employee, year=year).first()
@@ -102,16 +308,677 @@ class PayrollService:
             total_allocated = balance_obj.total_allocated
             remaining_balance = balance_obj.available
 
+        # 4. Day-by-day payment status and financial calculations
+        return cls.compute({
+            'joining_date': employee.joining_date,
+            'structure': structure,
+            'present': present,
+            'leaves': cls.unpaid_leave_days(leave_dates),
+            'allocated': total_allocated,
+            'available': remaining_balance,
+        }, month, year, holidays)
+
+
+def _compute_chunk(items, month, year, holidays):
+    """
+    Worker entry point: [(employee_id, payroll_input)] -> [(employee_id, result, error)].
+
+    Module level so it can be pickled for a ProcessPoolExecutor. The chunk is
+    classified as one matrix; one bad record only fails its own employee.
+    """
+    try:
+        computed = PayrollService.compute_many([payroll_input for _, payroll_input in items], month, year, holidays)
+        return [(employee_id, result, None) for (employee_id, _), result in zip(items, computed)]
+    except Exception:
+        pass
+
+    # Something in the chunk is malformed: redo it one employee at a time to find out who
+    results = []
+    for employee_id, payroll_input in items:
+        try:
+            results.append((employee_id, PayrollService.compute(payroll_input, month, year, holidays), None))
+        except Exception as e:
+            results.append((employee_id, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+class PayrollRunService:
+    """
+    Generates draft payslips for every active employee of a company for one month.
+
+    Inputs are fetched in a fixed number of queries whatever the head count
+    (employees, existing payslips, structures, attendance, leaves, balances;
+    holidays come from the CompanyCalendarService cache). Salaries are then
+    computed in memory, optionally across a process pool, and written with
+    bulk_create in chunks, stamping progress on the PayrollRun after each one.
+    Employees who already have a payslip for the month are skipped, so a run
+    can be repeated or resumed after a failure without touching issued slips.
+    A RUNNING run whose progress_at is older than PAYROLL_RUN_STALE_SECONDS
+    belongs to a process that died and may be claimed again.
+    bulk_create skips post_save, so no "payslip generated" notification is sent
+    for drafts; publishing a payslip sends it as before.
+    """
+
+    @staticmethod
+    def create(month, year, company=None, user=None):
+        return PayrollRun.objects.create(company=company, month=month, year=year, triggered_by=user)
+
+    @staticmethod
+    def _stale():
+        """Running runs that stopped reporting progress"""
+        stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'PAYROLL_RUN_STALE_SECONDS', 900))
+        return Q(status=PayrollRun.Status.RUNNING) & (Q(progress_at__lt=stale_before) | Q(progress_at__isnull=True))
+
+    @classmethod
+    def claimable(cls):
+        """Runs execute() will pick up: pending, failed or stale"""
+        return PayrollRun.objects.filter(
+            Q(status__in=[PayrollRun.Status.PENDING, PayrollRun.Status.FAILED]) | cls._stale()
+        )
+
+    @classmethod
+    def queued(cls):
+        """Runs waiting for a worker: pending or stale (failed runs are requeued explicitly)"""
+        return PayrollRun.objects.filter(Q(status=PayrollRun.Status.PENDING) | cls._stale()).order_by('created_at')
+
+    @staticmethod
+    def enqueue(runs):
+        """Mark failed runs pending again so the next `run_payroll --queued` picks them up"""
+        return runs.filter(status=PayrollRun.Status.FAILED).update(status=PayrollRun.Status.PENDING)
+
+    @staticmethod
+    def collect_inputs(employees, month, year):
+        """
+        {employee_id: payroll_input} for `employees` [(id, joining_date)].
+
+        Employees without an active salary structure are left out.
+        """
+        start_date, end_date, _ = PayrollService.month_range(month, year)
+        employee_ids = [employee_id for employee_id, _ in employees]
+
+        structures = SalaryStructureService.for_month(employee_ids, month, year)
+
+        present = {}
+        for row in Attendance.objects.filter(
+            employee_id__in=structures, date__range=[start_date, end_date]
+        ).values_list('employee_id', 'date', *ATTENDANCE_TIME_FIELDS):
+            if _is_present(row[2:]):
+                present.setdefault(row[0], set()).add(row[1])
+
+        # Default ordering is kept so overlapping leaves resolve as they do per employee
+        leaves_by_employee = {}
+        for leave in Leave.objects.filter(
+            employee_id__in=structures,
+            status='Approved',
+            from_date__lte=end_date,
+            to_date__gte=start_date,
+        ).only('employee_id', 'leave_type', 'from_date', 'to_date', 'rh_dates', 'day_status'):
+            leaves_by_employee.setdefault(leave.employee_id, []).append(leave)
+
+        balances = {}
+        for balance in LeaveBalance.objects.filter(
+            employee_id__in=structures, year=year
+        ).order_by('employee_id', 'id').only('employee_id', 'total_allocated', 'used', 'pending'):
+            balances.setdefault(balance.employee_id, balance)
+
+        inputs = {}
+        for employee_id, joining_date in employees:
+            if employee_id not in structures:
+                continue
+            balance = balances.get(employee_id)
+            leave_dates = LeaveDateIndex(leaves_by_employee.get(employee_id, ()), start_date, end_date)
+            inputs[employee_id] = {
+                'joining_date': joining_date,
+                'structure': structures[employee_id],
+                'present': present.get(employee_id, set()),
+                'leaves': PayrollService.unpaid_leave_days(leave_dates),
+                'allocated': balance.total_allocated if balance else Decimal('0'),
+                'available': balance.available if balance else Decimal('0'),
+            }
+        return inputs
+
+    @staticmethod
+    def build_payslip(employee_id, payroll_input, result, user_id=None):
+        structure = payroll_input['structure']
+        total_deductions = result['statutory_deductions'] + result['unpaid_leave_deduction']
+        return Payslip(
+            employee_id=employee_id,
+            month=result['month'],
+            year=result['year'],
+            total_earnings=result['gross_salary'],
+            total_deductions=total_deductions,
+            net_salary=result['net_salary'],
+            total_taxes=structure['tds'],
+            unpaid_leave_deduction=result['unpaid_leave_deduction'],
+            working_days=result['working_days'],
+            leaves_taken=result['paid_leave_days'] + result['unpaid_leave_days'],
+            paid_leaves=result['paid_leave_days'],
+            unpaid_leaves=result['unpaid_leave_days'],
+            allocated_leaves=result['allocated_leaves'],
+            leave_balance=result['leave_balance'],
+            final_leave_balance=result['leave_balance'],
+            generated_by_id=user_id,
+            status='draft',
+            **structure,
+        )
+
+    @staticmethod
+    def _stamp(run, **counters):
+        """Add to the run's counters in the database and mirror them on the instance"""
+        PayrollRun.objects.filter(pk=run.pk).update(
+            progress_at=timezone.now(),
+            **{field: F(field) + value for field, value in counters.items()},
+        )
+        for field, value in counters.items():
+            setattr(run, field, getattr(run, field) + value)
+
+    @classmethod
+    def execute(cls, run, workers=None, chunk_size=None, batch_size=1000, render_pdfs=None):
+        """
+        Process a pending, failed or stale run; returns the run.
+
+        `workers` > 1 computes chunks in a process pool; the default comes from
+        PAYROLL_RUN_WORKERS (0 = compute inline). With `render_pdfs` (default
+        PAYROLL_RUN_RENDER_PDFS) the new payslips' PDFs are rendered with the
+        same pool at the end. Returns without doing anything if another process
+        has already picked the run up.
+        """
+        if workers is None:
+            workers = getattr(settings, 'PAYROLL_RUN_WORKERS', 0)
+        if render_pdfs is None:
+            render_pdfs = getattr(settings, 'PAYROLL_RUN_RENDER_PDFS', False)
+        chunk_size = chunk_size or getattr(settings, 'PAYROLL_RUN_CHUNK_SIZE', 250)
+
+        now = timezone.now()
+        claimed = cls.claimable().filter(pk=run.pk).update(
+            status=PayrollRun.Status.RUNNING, started_at=now, progress_at=now, finished_at=None,
+            total_employees=0, processed=0, created_count=0, skipped_count=0, error_count=0, errors=[],
+        )
+        run.refresh_from_db()
+        if not claimed:
+            return run
+
+        try:
+            cls._process(run, workers, chunk_size, batch_size, render_pdfs)
+        except Exception as e:
+            logger.exception("Payroll run %s failed", run.pk)
+            PayrollRun.objects.filter(pk=run.pk).update(
+                status=PayrollRun.Status.FAILED, finished_at=timezone.now(),
+                errors=run.errors + [{'employee_id': None, 'employee': None, 'error': f"{type(e).__name__}: {e}"}],
+            )
+        else:
+            PayrollRun.objects.filter(pk=run.pk).update(
+                status=PayrollRun.Status.COMPLETED, finished_at=timezone.now(), errors=run.errors,
+            )
+        run.refresh_from_db()
+        return run
+
+    @classmethod
+    def _process(cls, run, workers, chunk_size, batch_size, render_pdfs=False):
+        from employees.models import Employee
+
+        start_date, end_date, _ = PayrollService.month_range(run.month, run.year)
+        employees = Employee.objects.filter(is_active=True)
+        if run.company_id:
+            employees = employees.filter(company_id=run.company_id)
+        employees = {
+            row[0]: row[1:] for row in employees.order_by('id').values_list(
+                'id', 'joining_date', 'employee_id', 'first_name', 'last_name'
+            )
+        }
+        existing = set(Payslip.objects.filter(
+            month=run.month, year=run.year, employee_id__in=employees
+        ).values_list('employee_id', flat=True))
+
+        pending = [(pk, values[0]) for pk, values in employees.items() if pk not in existing]
+        inputs = cls.collect_inputs(pending, run.month, run.year)
+
+        def describe(employee_id):
+            code, first_name, last_name = employees[employee_id][1:]
+            return f"{code} {first_name} {last_name}".strip()
+
+        run.errors = [
+            {'employee_id': pk, 'employee': describe(pk), 'error': "No active salary structure"}
+            for pk, _ in pending if pk not in inputs
+        ]
+        PayrollRun.objects.filter(pk=run.pk).update(total_employees=len(employees), errors=run.errors)
+        run.total_employees = len(employees)
+        cls._stamp(
+            run,
+            processed=len(existing) + len(run.errors),
+            skipped_count=len(existing),
+            error_count=len(run.errors),
+        )
+
+        holidays = set(CompanyCalendarService.holidays_in_range(start_date, end_date))
+        items = list(inputs.items())
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        if workers and workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_compute_chunk, chunk, run.month, run.year, holidays) for chunk in chunks]
+                for future in futures:
+                    cls._save_chunk(run, inputs, future.result(), describe, batch_size)
+        else:
+            for chunk in chunks:
+                cls._save_chunk(run, inputs, _compute_chunk(chunk, run.month, run.year, holidays), describe, batch_size)
+
+        if render_pdfs and inputs:
+            payslips = Payslip.objects.filter(
+                month=run.month, year=run.year, employee_id__in=list(inputs)
+            ).select_related('employee__designation', 'employee__department')
+            _, errors = PayslipDocumentService.render_many(payslips, workers=workers)
+            if errors:
+                employee_ids = dict(payslips.filter(id__in=[pk for pk, _ in errors]).values_list('id', 'employee_id'))
+                run.errors = run.errors + [
+                    {'employee_id': employee_ids[pk], 'employee': describe(employee_ids[pk]), 'error': f"PDF: {error}"}
+                    for pk, error in errors
+                ]
+                cls._stamp(run, error_count=len(errors))
+
+    @classmethod
+    def _save_chunk(cls, run, inputs, results, describe, batch_size):
+        from django.db import transaction
+
+        payslips = []
+        errors = []
+        for employee_id, result, error in results:
+            if error:
+                errors.append({'employee_id': employee_id, 'employee': describe(employee_id), 'error': error})
+            else:
+                payslips.append(cls.build_payslip(employee_id, inputs[employee_id], result, run.triggered_by_id))
+
+        # unique_together (employee, month, year) makes a concurrent duplicate a no-op;
+        # ignore_conflicts does not say which rows were dropped, so count them
+        existing = Payslip.objects.filter(
+            month=run.month, year=run.year, employee_id__in=[payslip.employee_id for payslip in payslips]
+        )
+        with transaction.atomic():
+            before = existing.count() if payslips else 0
+            Payslip.objects.bulk_create(payslips, batch_size=batch_size, ignore_conflicts=True)
+            created = existing.count() - before if payslips else 0
+        if errors:
+            run.errors = run.errors + errors
+            PayrollRun.objects.filter(pk=run.pk).update(errors=run.errors)
+        cls._stamp(
+            run, processed=len(results), created_count=created,
+            skipped_count=len(payslips) - created, error_count=len(errors),
+        )
+
+
+class PayrollSimulationService:
+    """
+    What-if previews of a month's payroll.
+
+    The month's inputs (structures, attendance, approved leaves, balances and
+    holidays) for one employee or department are fetched once by
+    PayrollRunService.collect_inputs and kept in the cache for
+    PAYROLL_SIMULATION_CACHE_SECONDS, so repeated previews while HR edits
+    the overrides run without queries. Pass refresh=True to rebuild the
+    snapshot after the underlying data changed.
+    """
+
+    @staticmethod
+    def cache_key(month, year, employee_id=None, department_id=None):
+        scope = f"employee:{employee_id}" if employee_id else f"department:{department_id}"
+        return f"payroll:simulation:{year}:{month}:{scope}"
+
+    @classmethod
+    def snapshot(cls, month, year, employee_id=None, department_id=None, refresh=False):
+        """Cached {inputs, names, missing, holidays, built_at} for the scope"""
+        from django.core.cache import cache
+        from employees.models import Employee
+
+        key = cls.cache_key(month, year, employee_id, department_id)
+        snapshot = None if refresh else cache.get(key)
+        if snapshot is not None:
+            return snapshot
+
+        employees = Employee.objects.filter(is_active=True)
+        if employee_id:
+            employees = employees.filter(id=employee_id)
+        else:
+            employees = employees.filter(department_id=department_id)
+        rows = list(employees.order_by('id').values_list('id', 'joining_date', 'first_name', 'last_name'))
+
+        inputs = PayrollRunService.collect_inputs([row[:2] for row in rows], month, year)
+        start_date, end_date, _ = PayrollService.month_range(month, year)
+        snapshot = {
+            'inputs': inputs,
+            'names': {row[0]: f"{row[2]} {row[3]}".strip() for row in rows},
+            'missing': [row[0] for row in rows if row[0] not in inputs],
+            'holidays': set(CompanyCalendarService.holidays_in_range(start_date, end_date)),
+            'built_at': timezone.now(),
+        }
+        cache.set(key, snapshot, getattr(settings, 'PAYROLL_SIMULATION_CACHE_SECONDS', 300))
+        return snapshot
+
+    @staticmethod
+    def apply_overrides(payroll_input, structure=None, extra_leave_days=(), extra_leave_unpaid=True):
+        """
+        Copy of a payroll input with structure fields replaced and leave days
+        added. The extra leave days are taken off `present`, since a day with
+        attendance would otherwise count as worked whatever the leave says.
+        """
+        leaves = dict(payroll_input['leaves'])
+        for day in extra_leave_days:
+            leaves[day] = extra_leave_unpaid
+        return dict(
+            payroll_input,
+            structure={**payroll_input['structure'], **(structure or {})},
+            leaves=leaves,
+            present=payroll_input['present'] - set(extra_leave_days),
+        )
+
+    @staticmethod
+    def figures(result):
+        return {
+            field: result[field]
+            for field in ('working_days', 'absent_days', 'gross_salary', 'statutory_deductions',
+                          'unpaid_leave_deduction', 'net_salary')
+        }
+
+    @classmethod
+    def simulate(cls, month, year, employee_id=None, department_id=None, structure=None,
+                 extra_leave_days=(), extra_leave_unpaid=True, extra_holidays=(), refresh=False):
+        """Baseline and simulated salary of every employee in scope, with totals"""
+        snapshot = cls.snapshot(month, year, employee_id, department_id, refresh=refresh)
+        employee_ids = list(snapshot['inputs'])
+        baseline_inputs = [snapshot['inputs'][pk] for pk in employee_ids]
+        simulated_inputs = [
+            cls.apply_overrides(payroll_input, structure, extra_leave_days, extra_leave_unpaid)
+            for payroll_input in baseline_inputs
+        ]
+
+        baseline = PayrollService.compute_many(baseline_inputs, month, year, snapshot['holidays'])
+        simulated = PayrollService.compute_many(
+            simulated_inputs, month, year, snapshot['holidays'] | set(extra_holidays)
+        )
+
+        employees = []
+        for pk, before, after in zip(employee_ids, baseline, simulated):
+            employees.append({
+                "employee_id": pk,
+                "employee": snapshot['names'][pk],
+                "baseline": cls.figures(before),
+                "simulated": cls.figures(after),
+                "net_difference": after['net_salary'] - before['net_salary'],
+            })
+
+        baseline_net = sum((row['baseline']['net_salary'] for row in employees), Decimal('0'))
+        simulated_net = sum((row['simulated']['net_salary'] for row in employees), Decimal('0'))
         return {
             "month": month,
             "year": year,
-            "gross_salary": gross_salary,
-            "working_days": working_days_count,
-            "absent_days": absent_days_count,
-            "statutory_deductions": statutory_deductions,
-            "unpaid_leave_deduction": unpaid_leave_deduction.quantize(Decimal('0.01')),
-            "net_salary": net_salary.quantize(Decimal('0.01')),
-            "leave_balance": remaining_balance,
-            "allocated_leaves": total_allocated,
-            "daily_rate": daily_rate.quantize(Decimal('0.01'))
+            "snapshot_at": snapshot['built_at'],
+            "employees": employees,
+            "skipped": [
+                {"employee_id": pk, "employee": snapshot['names'][pk], "error": "No active salary structure"}
+                for pk in snapshot['missing']
+            ],
+            "totals": {
+                "baseline_net": baseline_net,
+                "simulated_net": simulated_net,
+                "difference": simulated_net - baseline_net,
+            },
         }
+
+
+def _render_documents(items):
+    """Worker entry point: [(digest, rows)] -> [(digest, pdf bytes)]"""
+    from .pdf import render
+    return [(digest, render(rows)) for digest, rows in items]
+
+
+class PayslipDocumentService:
+    """
+    PDF payslips stored content-addressed in default_storage.
+
+    A document's path is the SHA-256 of its rows and the layout version, so
+    each version of a payslip is rendered once: edits (or a layout change)
+    produce a new path and existing files are never rewritten. Downloads then
+    read the stored file, and the digest doubles as the ETag.
+    """
+
+    LAYOUT_VERSION = 1
+
+    @staticmethod
+    def rows(payslip):
+        """[(style, label, value)] printed on the payslip"""
+        employee = payslip.employee
+
+        def amount(value):
+            return f"{value:,.2f}"
+
+        rows = [
+            ('title', f"Payslip - {calendar.month_name[payslip.month]} {payslip.year}", ''),
+            ('text', "Reference", f"PAY-{str(payslip.year)[2:]}-{payslip.month:02d}-{payslip.id:03d}"),
+            ('heading', "Employee", ''),
+            ('text', "Name", employee.get_full_name()),
+            ('text', "Employee ID", employee.employee_id),
+            ('text', "Designation", employee.designation.name if employee.designation else ''),
+            ('text', "Department", employee.department.name if employee.department else ''),
+            ('text', "Bank account", f"**** {employee.account_number[-4:]}" if employee.account_number else ''),
+            ('heading', "Attendance", ''),
+            ('text', "Working days", payslip.working_days),
+            ('text', "Leaves taken", payslip.leaves_taken),
+            ('text', "Paid leaves", payslip.paid_leaves),
+            ('text', "Unpaid leaves", payslip.unpaid_leaves),
+            ('text', "Leave balance", payslip.leave_balance),
+            ('heading', "Earnings", ''),
+        ]
+        earnings = [
+            ("Basic Salary", payslip.basic_salary),
+            ("HRA", payslip.hra),
+            ("Special Allowance", payslip.special_allowance),
+            ("Medical Allowance", payslip.medical_allowance),
+            ("Conveyance Allowance", payslip.conveyance_allowance),
+            ("Bonus", payslip.bonus),
+            ("Arrears", payslip.arrears),
+        ]
+        rows += [('text', label, amount(value)) for label, value in earnings if value]
+        rows.append(('total', "Total earnings", amount(payslip.total_earnings)))
+        rows.append(('heading', "Deductions", ''))
+        deductions = [
+            ("Tax (TDS)", payslip.tds),
+            ("Provident Fund", payslip.epf),
+            ("Loan Deduction", payslip.loan_deduction),
+            ("Advance Deduction", payslip.advance_deduction),
+            ("Unpaid Leave Deduction", payslip.unpaid_leave_deduction),
+            ("Misc Deduction", payslip.misc_deduction),
+            ("Professional Tax", payslip.misc_deduction_2),
+        ]
+        rows += [('text', label, amount(value)) for label, value in deductions if value]
+        rows.append(('total', "Total deductions", amount(payslip.total_deductions)))
+        rows.append(('heading', "Net salary", amount(payslip.net_salary)))
+        return [(style, label, str(value)) for style, label, value in rows]
+
+    @classmethod
+    def digest(cls, rows):
+        import hashlib
+        import json
+        payload = json.dumps({'layout': cls.LAYOUT_VERSION, 'rows': rows}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def path(digest):
+        return f"payslips/{digest[:2]}/{digest}.pdf"
+
+    @classmethod
+    def get_or_render(cls, payslip):
+        """(digest, storage path) of the payslip's current PDF, rendering it if missing"""
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from .pdf import render
+
+        rows = cls.rows(payslip)
+        digest = cls.digest(rows)
+        path = cls.path(digest)
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(render(rows)))
+        return digest, path
+
+    @classmethod
+    def render_many(cls, payslips, workers=0, chunk_size=50):
+        """
+        Render missing PDFs for many payslips, optionally across a process pool.
+        Returns (rendered, errors) with errors as [(payslip_id, message)].
+        """
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+
+        pending = {}
+        errors = []
+        for payslip in payslips:
+            try:
+                rows = cls.rows(payslip)
+            except Exception as e:
+                errors.append((payslip.id, f"{type(e).__name__}: {e}"))
+                continue
+            digest = cls.digest(rows)
+            if digest not in pending and not default_storage.exists(cls.path(digest)):
+                pending[digest] = rows
+
+        items = list(pending.items())
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        if workers and workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                rendered = [document for chunk in pool.map(_render_documents, chunks) for document in chunk]
+        else:
+            rendered = [document for chunk in chunks for document in _render_documents(chunk)]
+
+        for digest, content in rendered:
+            default_storage.save(cls.path(digest), ContentFile(content))
+        return len(rendered), errors
+
+
+# PayrollYTD counters, in the order of PayrollYTDService.contribution()
+YTD_FIELDS = (
+    'payslip_count', 'gross_earnings', 'total_deductions', 'net_salary',
+    'tds', 'epf', 'unpaid_leave_deduction', 'unpaid_leaves',
+)
+
+
+class PayrollYTDService:
+    """
+    Maintains PayrollYTD rows.
+
+    Only issued payslips (published or paid) count. Payslip saves apply the
+    difference of the payslip's contribution with F() expressions in the same
+    transaction, deletes subtract it, and rebuild() recomputes a fiscal year
+    from the payslips in one aggregate query (needed after bulk writes, which
+    bypass the signals). The fiscal year starts in PAYROLL_FISCAL_YEAR_START_MONTH.
+    """
+
+    ISSUED_STATUSES = ('published', 'paid')
+
+    @staticmethod
+    def start_month():
+        return getattr(settings, 'PAYROLL_FISCAL_YEAR_START_MONTH', 4)
+
+    @classmethod
+    def fiscal_year(cls, month, year):
+        """Fiscal year (the calendar year it starts in) of a payroll month"""
+        return year if month >= cls.start_month() else year - 1
+
+    @classmethod
+    def fiscal_year_of(cls, day):
+        return cls.fiscal_year(day.month, day.year)
+
+    @classmethod
+    def contribution(cls, payslip):
+        """Counters a single payslip adds to its YTD row"""
+        if payslip.status not in cls.ISSUED_STATUSES:
+            return (0,) * len(YTD_FIELDS)
+        return (
+            1,
+            payslip.total_earnings,
+            payslip.total_deductions,
+            payslip.net_salary,
+            payslip.tds,
+            payslip.epf,
+            payslip.unpaid_leave_deduction,
+            payslip.unpaid_leaves,
+        )
+
+    @classmethod
+    def snapshot(cls, payslip):
+        """(employee_id, fiscal_year, contribution) of a payslip, used to compute deltas on save"""
+        return (payslip.employee_id, cls.fiscal_year(payslip.month, payslip.year), cls.contribution(payslip))
+
+    @classmethod
+    def record_saved(cls, payslip, previous):
+        """
+        Apply a payslip save to the YTD rows.
+        previous is the snapshot taken when the payslip was loaded,
+        None for new payslips, or False when it is unknown.
+        """
+        current = cls.snapshot(payslip)
+        if previous is False:
+            cls.rebuild(current[1], employee_ids=[current[0]])
+            return
+        if previous is not None and previous[:2] != current[:2]:
+            cls.record_deleted(payslip, previous)
+            previous = None
+        old = previous[2] if previous else (0,) * len(YTD_FIELDS)
+        cls._apply(current[0], current[1], tuple(new - before for new, before in zip(current[2], old)))
+
+    @classmethod
+    def record_deleted(cls, payslip, previous=None):
+        """Remove a payslip's contribution from its YTD row"""
+        employee_id, fiscal_year, contribution = previous or cls.snapshot(payslip)
+        cls._apply(employee_id, fiscal_year, tuple(-value for value in contribution))
+
+    @staticmethod
+    def _apply(employee_id, fiscal_year, delta):
+        from django.db import transaction
+
+        changes = {field: F(field) + value for field, value in zip(YTD_FIELDS, delta) if value}
+        if not changes:
+            return
+        with transaction.atomic():
+            PayrollYTD.objects.get_or_create(employee_id=employee_id, fiscal_year=fiscal_year)
+            PayrollYTD.objects.filter(employee_id=employee_id, fiscal_year=fiscal_year).update(
+                updated_at=timezone.now(), **changes
+            )
+
+    @classmethod
+    def rebuild(cls, fiscal_year, employee_ids=None):
+        """Recompute the YTD rows of a fiscal year from its payslips; returns the number of rows written"""
+        from django.db import transaction
+        from django.db.models import Count
+
+        start = cls.start_month()
+        payslips = Payslip.objects.filter(status__in=cls.ISSUED_STATUSES).filter(
+            Q(year=fiscal_year, month__gte=start) | Q(year=fiscal_year + 1, month__lt=start)
+        )
+        rows = PayrollYTD.objects.filter(fiscal_year=fiscal_year)
+        if employee_ids is not None:
+            payslips = payslips.filter(employee_id__in=employee_ids)
+            rows = rows.filter(employee_id__in=employee_ids)
+
+        totals = payslips.order_by().values('employee_id').annotate(
+            payslip_count=Count('id'),
+            gross_earnings=Sum('total_earnings'),
+            total_deductions=Sum('total_deductions'),
+            net_salary=Sum('net_salary'),
+            tds=Sum('tds'),
+            epf=Sum('epf'),
+            unpaid_leave_deduction=Sum('unpaid_leave_deduction'),
+            unpaid_leaves=Sum('unpaid_leaves'),
+        )
+        with transaction.atomic():
+            rows.delete()
+            PayrollYTD.objects.bulk_create([
+                PayrollYTD(fiscal_year=fiscal_year, **total) for total in totals
+            ])
+        return len(totals)
+
+    @classmethod
+    def fiscal_years(cls):
+        """Fiscal years that have at least one payslip"""
+        start = cls.start_month()
+        return sorted({
+            year if month >= start else year - 1
+            for month, year in Payslip.objects.order_by().values_list('month', 'year').distinct()
+        })
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Payslip
+from .services import PayrollYTDService
+
+
+@receiver(post_save, sender=Payslip)
+def apply_payslip_to_ytd(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep the employee's year-to-date totals in step with the payslip.
+    Publishing adds it, edits apply the difference, moving it back to draft removes it.
+    """
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_ytd_snapshot', False)
+    PayrollYTDService.record_saved(instance, previous)
+    instance._ytd_snapshot = PayrollYTDService.snapshot(instance)
+
+
+@receiver(post_delete, sender=Payslip)
+def remove_payslip_from_ytd(sender, instance, **kwargs):
+    """Subtract a deleted payslip from its year-to-date totals"""
+    PayrollYTDService.record_deleted(instance, getattr(instance, '_ytd_snapshot', None))
@@ -1,3 +1,574 @@
-from django.test import TestCase
+from datetime import date, datetime, time
+from decimal import Decimal
+from io import StringIO
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendance.models import Attendance
+from auth_app.models import User
+from departments.models import Department, Designation
+from employees.models import Employee
+from holidays.services import CompanyCalendarService
+from leaves.models import Leave, LeaveBalance
+from organizations.models import Company
+from .models import Payslip, PayrollRun, PayrollYTD, SalaryStructure
+from .services import (
+    PayrollRunService, PayrollService, PayrollSimulationService, PayrollYTDService, PayslipDocumentService,
+    SalaryStructureService,
+)
+
+
+class PayrollRunTest(TestCase):
+    """Test cases for company-wide payroll runs"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        self.department = Department.objects.create(name="Engineering", code="ENG")
+        self.designation = Designation.objects.create(name="Developer", department=self.department)
+        self.company = Company.objects.create(name="Acme", slug="acme")
+        self.employee = self.make_employee("EMP-P001", self.company)
+        SalaryStructure.objects.create(
+            employee=self.employee, basic_salary=31000, hra=12400, special_allowance=6600, epf=1800, tds=500,
+        )
+        LeaveBalance.objects.create(
+            employee=self.employee, leave_type='Casual Leave', year=2025, total_allocated=12, used=1,
+        )
+        # March 2025 has 21 weekdays: 10 present, 1 paid leave, 2 unpaid leave, 8 absent
+        for day in range(3, 15):
+            current = date(2025, 3, day)
+            if current.weekday() < 5:
+                self.check_in(self.employee, current)
+        Leave.objects.create(
+            employee=self.employee, leave_type='Casual Leave', from_date=date(2025, 3, 17),
+            to_date=date(2025, 3, 17), no_of_days=1, reason="Errand", status='Approved',
+        )
+        Leave.objects.create(
+            employee=self.employee, leave_type='Unpaid Leave', from_date=date(2025, 3, 18),
+            to_date=date(2025, 3, 19), no_of_days=2, reason="Travel", status='Approved',
+        )
+
+    def make_employee(self, code, company, salary=None):
+        employee = Employee.objects.create(
+            employee_id=code,
+            first_name="Pay",
+            last_name=code,
+            email=f"{code.lower()}@example.com",
+            phone="+919999999999",
+            department=self.department,
+            designation=self.designation,
+            company=company,
+            joining_date=date(2025, 1, 1),
+        )
+        if salary:
+            SalaryStructure.objects.create(employee=employee, basic_salary=salary)
+        return employee
+
+    def check_in(self, employee, day):
+        return Attendance.objects.create(
+            employee=employee,
+            date=day,
+            office_in_time=timezone.make_aware(datetime.combine(day, time(9, 0))),
+            office_out_time=timezone.make_aware(datetime.combine(day, time(18, 0))),
+        )
+
+    def test_run_matches_single_employee_calculation(self):
+        """Test the bulk run produces the same figures as calculate_monthly_salary"""
+        run = PayrollRunService.execute(PayrollRunService.create(3, 2025, company=self.company))
+
+        self.assertEqual(run.status, PayrollRun.Status.COMPLETED)
+        self.assertEqual(run.created_count, 1)
+        self.assertEqual(run.processed, 1)
+        self.assertIsNotNone(run.progress_at)
+
+        expected = PayrollService.calculate_monthly_salary(self.employee, 3, 2025)
+        payslip = Payslip.objects.get(employee=self.employee, month=3, year=2025)
+        self.assertEqual(payslip.working_days, expected["working_days"])
+        self.assertEqual(payslip.working_days, 11)
+        self.assertEqual(payslip.net_salary, expected["net_salary"])
+        self.assertEqual(payslip.unpaid_leave_deduction, expected["unpaid_leave_deduction"])
+        self.assertEqual(payslip.total_earnings, Decimal('50000'))
+        self.assertEqual(payslip.paid_leaves, 1)
+        self.assertEqual(payslip.unpaid_leaves, 2)
+        # 12 allocated, 1 used, 1 more taken by the approved Casual Leave
+        self.assertEqual(payslip.leave_balance, 10)
+        self.assertEqual(payslip.status, 'draft')
+
+    def test_rerun_skips_existing_payslips(self):
+        """Test a second run leaves existing payslips alone"""
+        PayrollRunService.execute(PayrollRunService.create(3, 2025, company=self.company))
+        Payslip.objects.filter(employee=self.employee).update(status='published')
+
+        run = PayrollRunService.execute(PayrollRunService.create(3, 2025, company=self.company))
+
+        self.assertEqual(run.created_count, 0)
+        self.assertEqual(run.skipped_count, 1)
+        self.assertEqual(Payslip.objects.get(employee=self.employee).status, 'published')
+
+    def test_completed_run_is_not_processed_again(self):
+        """Test executing a completed run is a no-op"""
+        run = PayrollRunService.execute(PayrollRunService.create(3, 2025, company=self.company))
+        Payslip.objects.all().delete()
+
+        run = PayrollRunService.execute(run)
+
+        self.assertEqual(run.status, PayrollRun.Status.COMPLETED)
+        self.assertFalse(Payslip.objects.exists())
+
+    def test_missing_structure_is_reported_per_employee(self):
+        """Test an employee without a salary structure is listed as an error"""
+        missing = self.make_employee("EMP-P002", self.company)
+
+        run = PayrollRunService.execute(PayrollRunService.create(3, 2025, company=self.company))
+
+        self.assertEqual(run.status, PayrollRun.Status.COMPLETED)
+        self.assertEqual(run.created_count, 1)
+        self.assertEqual(run.error_count, 1)
+        self.assertEqual(run.errors[0]["employee_id"], missing.id)
+        self.assertEqual(run.errors[0]["error"], "No active salary structure")
+
+    def test_query_count_does_not_grow_with_head_count(self):
+        """Test inputs are bulk-fetched instead of queried per employee"""
+        small = Company.objects.create(name="Small", slug="small")
+        large = Company.objects.create(name="Large", slug="large")
+        first = self.make_employee("EMP-S001", small, salary=20000)
+        self.check_in(first, date(2025, 3, 3))
+        for index in range(5):
+            employee = self.make_employee(f"EMP-L00{index}", large, salary=20000)
+            self.check_in(employee, date(2025, 3, 3))
+
+        with CaptureQueriesContext(connection) as small_queries:
+            PayrollRunService.execute(PayrollRunService.create(3, 2025, company=small))
+        with CaptureQueriesContext(connection) as large_queries:
+            run = PayrollRunService.execute(PayrollRunService.create(3, 2025, company=large))
+
+        self.assertEqual(run.created_count, 5)
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_command_reports_summary(self):
+        """Test run_payroll creates a run and prints its outcome"""
+        out = StringIO()
+        call_command('run_payroll', month=3, year=2025, company=self.company.id, stdout=out)
+
+        run = PayrollRun.objects.get()
+        self.assertEqual(run.created_count, 1)
+        self.assertIn("1 created, 0 skipped, 0 errors", out.getvalue())
+
+    def test_stale_running_run_is_reclaimed(self):
+        """Test a run left RUNNING by a dead process is resumed, a live one is not"""
+        from datetime import timedelta
+
+        run = PayrollRunService.create(3, 2025, company=self.company)
+        PayrollRun.objects.filter(pk=run.pk).update(status=PayrollRun.Status.RUNNING, progress_at=timezone.now())
+        run = PayrollRunService.execute(run)
+        self.assertEqual(run.status, PayrollRun.Status.RUNNING)
+        self.assertFalse(Payslip.objects.exists())
+
+        PayrollRun.objects.filter(pk=run.pk).update(progress_at=timezone.now() - timedelta(hours=1))
+        run = PayrollRunService.execute(run)
+        self.assertEqual(run.status, PayrollRun.Status.COMPLETED)
+        self.assertEqual(run.created_count, 1)
+
+    def test_queued_runs_are_processed_by_the_command(self):
+        """Test failed runs are requeued and run_payroll --queued processes pending runs"""
+        run = PayrollRunService.create(3, 2025, company=self.company)
+        PayrollRun.objects.filter(pk=run.pk).update(status=PayrollRun.Status.FAILED)
+
+        self.assertEqual(PayrollRunService.enqueue(PayrollRun.objects.all()), 1)
+        out = StringIO()
+        call_command('run_payroll', queued=True, stdout=out)
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, PayrollRun.Status.COMPLETED)
+        self.assertIn("1 created", out.getvalue())
+
+    def test_conflicting_payslips_are_not_counted_as_created(self):
+        """Test payslips written concurrently by another run count as skipped"""
+        from unittest import mock
+        from .services import _compute_chunk
+
+        collect_inputs = PayrollRunService.collect_inputs
+
+        def racing_collect_inputs(employees, month, year):
+            inputs = collect_inputs(employees, month, year)
+            for employee_id, result, _ in _compute_chunk(list(inputs.items()), month, year, set()):
+                PayrollRunService.build_payslip(employee_id, inputs[employee_id], result, None).save()
+            return inputs
+
+        with mock.patch.object(PayrollRunService, 'collect_inputs', side_effect=racing_collect_inputs):
+            run = PayrollRunService.execute(PayrollRunService.create(3, 2025, company=self.company))
+
+        self.assertEqual(run.created_count, 0)
+        self.assertEqual(run.skipped_count, 1)
+        self.assertEqual(Payslip.objects.count(), 1)
+
+    def test_joining_mid_month_skips_earlier_days(self):
+        """Test days before the joining date are neither paid nor deducted"""
+        self.employee.joining_date = date(2025, 3, 17)
+        self.employee.save()
+
+        result = PayrollService.calculate_monthly_salary(self.employee, 3, 2025)
+
+        # 17-31 March: 11 weekdays, 1 paid leave, 2 unpaid leave
+        self.assertEqual(result["working_days"], 1)
+        self.assertEqual(result["absent_days"], 10)
+        self.assertEqual(result["unpaid_leave_days"], 2)
+
+
+class PayrollSimulationTest(TestCase):
+    """Test cases for payroll what-if previews"""
+
+    def setUp(self):
+        """Set up test data"""
+        cache.clear()
+        CompanyCalendarService.invalidate()
+        self.department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=self.department)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-W001",
+            first_name="What",
+            last_name="If",
+            email="whatif@example.com",
+            phone="+919999999999",
+            department=self.department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+        SalaryStructure.objects.create(employee=self.employee, basic_salary=31000, epf=1000)
+        # Present on every weekday of March 2025 except the 31st
+        for day in range(1, 31):
+            current = date(2025, 3, day)
+            if current.weekday() < 5:
+                Attendance.objects.create(
+                    employee=self.employee,
+                    date=current,
+                    office_in_time=timezone.make_aware(datetime.combine(current, time(9, 0))),
+                    office_out_time=timezone.make_aware(datetime.combine(current, time(18, 0))),
+                )
+        self.admin = User.objects.create_user(
+            username="payadmin", email="payadmin@example.com", password="pass", is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_overrides_change_only_the_simulation(self):
+        """Test structure, leave and holiday overrides against the baseline"""
+        result = PayrollSimulationService.simulate(
+            3, 2025, department_id=self.department.id, structure={'basic_salary': Decimal('62000')}
+        )
+        row = result["employees"][0]
+        self.assertEqual(row["baseline"]["absent_days"], 1)
+        self.assertEqual(row["baseline"]["net_salary"], Decimal('29000.00'))
+        self.assertEqual(row["simulated"]["net_salary"], Decimal('59000.00'))
+        self.assertEqual(result["totals"]["difference"], Decimal('30000.00'))
+
+        paid_leave = PayrollSimulationService.simulate(
+            3, 2025, employee_id=self.employee.id, extra_leave_days=[date(2025, 3, 31)], extra_leave_unpaid=False
+        )
+        self.assertEqual(paid_leave["employees"][0]["simulated"]["absent_days"], 0)
+
+        # An unpaid leave on a present day is deducted like an absence
+        unpaid_leave = PayrollSimulationService.simulate(
+            3, 2025, employee_id=self.employee.id, extra_leave_days=[date(2025, 3, 10)]
+        )
+        simulated = unpaid_leave["employees"][0]["simulated"]
+        self.assertEqual(simulated["absent_days"], 2)
+        self.assertEqual(simulated["net_salary"], Decimal('28000.00'))
+        self.assertEqual(unpaid_leave["employees"][0]["baseline"]["net_salary"], Decimal('29000.00'))
+
+        holiday = PayrollSimulationService.simulate(
+            3, 2025, employee_id=self.employee.id, extra_holidays=[date(2025, 3, 31)]
+        )
+        self.assertEqual(holiday["employees"][0]["simulated"]["working_days"], 20)
+        self.assertEqual(holiday["employees"][0]["simulated"]["absent_days"], 0)
+
+        self.assertEqual(SalaryStructure.objects.get().basic_salary, Decimal('31000'))
+
+    def test_repeated_previews_reuse_the_snapshot(self):
+        """Test the month inputs are fetched once per scope"""
+        PayrollSimulationService.simulate(3, 2025, department_id=self.department.id)
+        with self.assertNumQueries(0):
+            PayrollSimulationService.simulate(
+                3, 2025, department_id=self.department.id, structure={'hra': Decimal('5000')}
+            )
+
+    def test_endpoint_validates_scope_and_fields(self):
+        """Test the simulate endpoint rejects bad input and returns the preview"""
+        response = self.client.post('/api/payroll/simulate/', {"month": 3, "year": 2025}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/payroll/simulate/', {
+            "month": 3, "year": 2025, "employee_id": self.employee.id, "structure": {"salary": 1},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("structure", response.data["errors"])
+
+        response = self.client.post('/api/payroll/simulate/', {
+            "month": 3, "year": 2025, "employee_id": self.employee.id, "extra_holidays": ["2025-04-01"],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/payroll/simulate/', {
+            "month": 3, "year": 2025, "employee_id": self.employee.id, "structure": {"tds": "500"},
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["error"], 0)
+        self.assertEqual(response.data["data"]["totals"]["difference"], Decimal('-500.00'))
+
+
+class SalaryStructureLookupTest(TestCase):
+    """Test cases for effective-dated salary structures"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.employee = Employee.objects.create(
+            employee_id="EMP-H001",
+            first_name="Hist",
+            last_name="Ory",
+            email="history@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+        self.old = SalaryStructure.objects.create(
+            employee=self.employee, basic_salary=30000,
+            applicable_from=date(2025, 1, 1), applicable_till=date(2025, 6, 15),
+        )
+
+    def test_effective_structure_per_date(self):
+        """Test each date resolves to the structure in force, in one query"""
+        SalaryStructure.objects.create(employee=self.employee, basic_salary=60000, applicable_from=date(2025, 6, 16))
+        SalaryStructure.objects.create(
+            employee=self.employee, basic_salary=99000, applicable_from=date(2025, 3, 1), is_active=False,
+        )
+        pairs = [(self.employee.id, date(2025, 3, 10)), (self.employee.id, date(2025, 7, 1)),
+                 (self.employee.id, date(2024, 12, 31))]
+
+        with self.assertNumQueries(1):
+            found = SalaryStructureService.effective_on(pairs)
+
+        self.assertEqual(found[pairs[0]]["basic_salary"], Decimal('30000'))
+        self.assertEqual(found[pairs[1]]["basic_salary"], Decimal('60000'))
+        self.assertIsNone(found[pairs[2]])
+
+    def test_undated_structures_keep_oldest_row(self):
+        """Test legacy rows without dates resolve like .first() did"""
+        SalaryStructure.objects.all().delete()
+        first = SalaryStructure.objects.create(employee=self.employee, basic_salary=10000)
+        SalaryStructure.objects.create(employee=self.employee, basic_salary=20000)
+
+        values = SalaryStructureService.for_month([self.employee.id], 3, 2025)[self.employee.id]
+
+        self.assertEqual(values["basic_salary"], first.basic_salary)
+
+    def test_mid_month_increment_is_prorated(self):
+        """Test a structure change on the 16th pays each amount for its days"""
+        SalaryStructure.objects.create(employee=self.employee, basic_salary=60000, applicable_from=date(2025, 6, 16))
+
+        result = PayrollService.calculate_monthly_salary(self.employee, 6, 2025)
+
+        self.assertEqual(result["gross_salary"], Decimal('45000.00'))
+
+    def test_back_dated_increment_creates_arrears(self):
+        """Test arrears are the difference against the issued payslip"""
+        PayrollRunService.execute(PayrollRunService.create(6, 2025))
+        payslip = Payslip.objects.get(employee=self.employee)
+        self.assertEqual(payslip.total_earnings, Decimal('30000'))
+
+        SalaryStructure.objects.create(employee=self.employee, basic_salary=60000, applicable_from=date(2025, 6, 16))
+        arrears = SalaryStructureService.arrears([payslip])
+
+        # Gross rises by 15000; the unpaid deduction (every weekday absent) scales by 1.5
+        expected = Decimal('15000') - payslip.unpaid_leave_deduction / 2
+        self.assertEqual(arrears[payslip.id], expected.quantize(Decimal('0.01')))
+
+
+class PayslipDocumentTest(TestCase):
+    """Test cases for content-addressed payslip PDFs"""
+
+    def setUp(self):
+        """Set up test data"""
+        CompanyCalendarService.invalidate()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.user = User.objects.create_user(username="slip", email="slip@example.com", password="pass")
+        self.employee = Employee.objects.create(
+            user=self.user,
+            employee_id="EMP-F001",
+            first_name="Pay",
+            last_name="Slip",
+            email="slip-emp@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+            account_number="123456789",
+        )
+        SalaryStructure.objects.create(employee=self.employee, basic_salary=31000, epf=1000)
+        PayrollRunService.execute(PayrollRunService.create(3, 2025), render_pdfs=True)
+        self.payslip = Payslip.objects.get(employee=self.employee)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+    def test_payroll_run_renders_each_version_once(self):
+        """Test the run stores one PDF and re-rendering the same data reuses it"""
+        self.assertEqual(len(self.stored_files()), 1)
+
+        digest, path = PayslipDocumentService.get_or_render(self.payslip)
+        self.assertEqual(len(self.stored_files()), 1)
+        with open(os.path.join(self.media_root, path), 'rb') as document:
+            self.assertTrue(document.read().startswith(b"%PDF-1.4"))
+
+        self.payslip.bonus = Decimal('500')
+        self.payslip.save()
+        new_digest, _ = PayslipDocumentService.get_or_render(self.payslip)
+        self.assertNotEqual(new_digest, digest)
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_download_uses_etag_and_versioned_caching(self):
+        """Test the PDF endpoint's ETag, 304 and long-lived cache headers"""
+        info = self.client.get('/api/payroll/user-salary-info/')
+        pdf_url = info.data["data"]["selected_payslip"]["pdf_url"]
+
+        response = self.client.get(pdf_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+        response = self.client.get(f'/api/payroll/payslips/{self.payslip.id}/pdf/')
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(f'/api/payroll/payslips/{self.payslip.id}/pdf/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_employees_cannot_download(self):
+        """Test a payslip is only served to its owner or an admin"""
+        other = User.objects.create_user(username="other", email="other@example.com", password="pass")
+        self.client.force_authenticate(other)
+        response = self.client.get(f'/api/payroll/payslips/{self.payslip.id}/pdf/')
+        self.assertEqual(response.status_code, 404)
+
+
+class PayrollYTDTest(TestCase):
+    """Test cases for year-to-date payroll totals"""
+
+    def setUp(self):
+        """Set up test data"""
+        department = Department.objects.create(name="Engineering", code="ENG")
+        designation = Designation.objects.create(name="Developer", department=department)
+        self.user = User.objects.create_user(username="ytd", email="ytd@example.com", password="pass")
+        self.employee = Employee.objects.create(
+            user=self.user,
+            employee_id="EMP-Y001",
+            first_name="Year",
+            last_name="ToDate",
+            email="ytd-emp@example.com",
+            phone="+919999999999",
+            department=department,
+            designation=designation,
+            joining_date=date(2025, 1, 1),
+        )
+
+    def make_payslip(self, month, year, status='published', tds=500):
+        return Payslip.objects.create(
+            employee=self.employee, month=month, year=year, status=status,
+            basic_salary=50000, hra=0, medical_allowance=0, conveyance_allowance=0, special_allowance=0,
+            tds=tds, epf=1000, unpaid_leave_deduction=0,
+            total_earnings=50000, total_deductions=1000 + tds, net_salary=49000 - tds, working_days=21,
+        )
+
+    def ytd(self, fiscal_year=2025):
+        return PayrollYTD.objects.get(employee=self.employee, fiscal_year=fiscal_year)
+
+    def test_issued_payslips_are_added_to_their_fiscal_year(self):
+        """Test publishing, editing and fiscal-year boundaries"""
+        draft = self.make_payslip(4, 2025, status='draft')
+        self.assertFalse(PayrollYTD.objects.exists())
+
+        draft.status = 'published'
+        draft.save()
+        self.make_payslip(3, 2026)
+        self.make_payslip(4, 2026)
+
+        self.assertEqual(self.ytd().payslip_count, 2)
+        self.assertEqual(self.ytd().gross_earnings, Decimal('100000'))
+        self.assertEqual(self.ytd(2026).payslip_count, 1)
+
+        payslip = Payslip.objects.get(month=4, year=2025)
+        payslip.tds = 800
+        payslip.save()
+        self.assertEqual(self.ytd().tds, Decimal('1300'))
+
+    def test_delete_and_unpublish_remove_the_payslip(self):
+        """Test deleting or returning a payslip to draft subtracts it"""
+        self.make_payslip(5, 2025)
+        second = self.make_payslip(6, 2025)
+
+        Payslip.objects.get(pk=second.pk).delete()
+        self.assertEqual(self.ytd().payslip_count, 1)
+
+        first = Payslip.objects.get(month=5, year=2025)
+        first.status = 'draft'
+        first.save()
+        self.assertEqual(self.ytd().payslip_count, 0)
+        self.assertEqual(self.ytd().net_salary, Decimal('0'))
+
+    def test_rebuild_catches_up_with_bulk_updates(self):
+        """Test the rebuild command recomputes rows after queryset updates"""
+        self.make_payslip(5, 2025, status='draft')
+        self.make_payslip(6, 2025, status='draft')
+        Payslip.objects.update(status='paid')
+        self.assertFalse(PayrollYTD.objects.exists())
+
+        out = StringIO()
+        call_command('rebuild_payroll_ytd', stdout=out)
+
+        self.assertEqual(self.ytd().payslip_count, 2)
+        self.assertEqual(self.ytd().tds, Decimal('1000'))
+        self.assertIn("Rebuilt 1 YTD rows", out.getvalue())
+
+    def test_statement_is_one_row_read(self):
+        """Test the fiscal-year statement endpoint"""
+        self.make_payslip(5, 2025)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertNumQueries(2):
+            response = client.get('/api/payroll/ytd/', {'fiscal_year': 2025})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"]["fiscal_year_label"], "2025-26")
+        self.assertEqual(response.data["data"]["payslip_count"], 1)
+
+        response = client.get('/api/payroll/ytd/', {'fiscal_year': 2024})
+        self.assertEqual(response.data["data"]["payslip_count"], 0)
+
+    def test_fiscal_year_follows_start_month(self):
+        """Test month-to-fiscal-year mapping"""
+        self.assertEqual(PayrollYTDService.fiscal_year(3, 2026), 2025)
+        self.assertEqual(PayrollYTDService.fiscal_year(4, 2026), 2026)
+        with override_settings(PAYROLL_FISCAL_YEAR_START_MONTH=1):
+            self.assertEqual(PayrollYTDService.fiscal_year(3, 2026), 2026)
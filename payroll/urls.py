@@ -1,7 +1,10 @@
 from django.urls import path
-from .views import UserSalaryInfoView, GenericConfigurationView
+from .views import UserSalaryInfoView, GenericConfigurationView, PayrollSimulationView, PayslipPdfView, PayrollYTDView
 
 urlpatterns = [
     path('user-salary-info/', UserSalaryInfoView.as_view(), name='user-salary-info'),
     path('generic-configuration/', GenericConfigurationView.as_view(), name='generic-configuration'),
+    path('simulate/', PayrollSimulationView.as_view(), name='payroll-simulate'),
+    path('payslips/<int:pk>/pdf/', PayslipPdfView.as_view(), name='payslip-pdf'),
+    path('ytd/', PayrollYTDView.as_view(), name='payroll-ytd'),
 ]
@@ -1,14 +1,18 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .models import SalaryStructure, Payslip, PayrollConfig
-from .serializers import SalaryStructureSerializer, PayslipSerializer, PayslipSummarySerializer, SalaryOverviewSerializer, PayrollConfigSerializer
-from .services import PayrollService
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from .models import SalaryStructure, Payslip, PayrollConfig, PayrollYTD
+from .serializers import SalaryStructureSerializer, PayslipSerializer, PayslipSummarySerializer, SalaryOverviewSerializer, PayrollConfigSerializer, PayrollSimulationSerializer, PayrollYTDSerializer
+from .services import PayrollService, PayrollSimulationService, SalaryStructureService, PayslipDocumentService, PayrollYTDService
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from employees.models import Employee
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
 
 class UserSalaryInfoView(APIView):
     """
@@ -39,6 +43,7 @@ class UserSalaryInfoView(APIView):
                             "bank_details": openapi.Schema(type=openapi.TYPE_OBJECT),
                             "payslip_months": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
                             "selected_payslip": openapi.Schema(type=openapi.TYPE_OBJECT),
+                            "ytd": openapi.Schema(type=openapi.TYPE_OBJECT),
                         }
                     )
                 }
@@ -61,9 +66,10 @@ class UserSalaryInfoView(APIView):
             selected_payslip = all_payslips.first()
             
         # 3. Calculate Annual CTC (Constant for the user/profile)
-        # We fetch the latest active structure to determine current annual package
-        latest_structure = employee.salary_structures.filter(is_active=True).order_by('-applicable_from').first()
-        annual_ctc = float(latest_structure.total_earnings * 12) if latest_structure else 0
+        # The structure in force today determines the current annual package
+        today = timezone.now().date()
+        current_structure = SalaryStructureService.effective_on([(employee.id, today)])[(employee.id, today)]
+        annual_ctc = float(SalaryStructureService.gross(current_structure) * 12) if current_structure else 0
             
         data = {
             "id": str(employee.id),
@@ -79,7 +85,11 @@ class UserSalaryInfoView(APIView):
             # Sidebar list (Summary data)
             "payslip_months": PayslipSummarySerializer(all_payslips, many=True).data,
             # Main detail card (Full data)
-            "selected_payslip": PayslipSerializer(selected_payslip).data if selected_payslip else None
+            "selected_payslip": PayslipSerializer(selected_payslip).data if selected_payslip else None,
+            # Current fiscal year totals (one row)
+            "ytd": PayrollYTDSerializer(
+                PayrollYTDView.ytd_for(employee, PayrollYTDService.fiscal_year_of(today))
+            ).data
         }
         
         return Response({
@@ -140,3 +150,143 @@ class GenericConfigurationView(APIView):
             "error": False,
             "data": merged_data
         })
+
+
+class PayrollSimulationView(APIView):
+    """
+    What-if preview of a month's payroll for one employee or a department.
+    Month inputs are cached, so repeated previews with different overrides are cheap.
+    """
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Preview salaries with structure, leave and holiday overrides. Nothing is saved.",
+        request_body=PayrollSimulationSerializer,
+        responses={200: openapi.Response(
+            description="Baseline and simulated figures per employee with totals",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    "error": openapi.Schema(type=openapi.TYPE_INTEGER),
+                    "data": openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            "month": openapi.Schema(type=openapi.TYPE_INTEGER),
+                            "year": openapi.Schema(type=openapi.TYPE_INTEGER),
+                            "snapshot_at": openapi.Schema(type=openapi.TYPE_STRING),
+                            "employees": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                            "skipped": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                            "totals": openapi.Schema(type=openapi.TYPE_OBJECT),
+                        }
+                    )
+                }
+            )
+        )}
+    )
+    def post(self, request):
+        serializer = PayrollSimulationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "error": 1,
+                "message": "Validation failed",
+                "errors": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        data = PayrollSimulationService.simulate(**serializer.validated_data)
+        return Response({
+            "error": 0,
+            "data": data
+        })
+
+
+class PayslipPdfView(APIView):
+    """
+    PDF of a payslip, rendered once per version of its data and then read from storage.
+
+    GET /api/payroll/payslips/<id>/pdf/?v=<digest>
+    The digest is the ETag; when `v` matches it the response may be cached for a year.
+    """
+    permission_classes = [IsAuthenticated]
+    CACHE_SECONDS = 365 * 24 * 60 * 60
+
+    @swagger_auto_schema(
+        operation_description="Download a payslip as PDF (own payslips, or any for admins).",
+        manual_parameters=[
+            openapi.Parameter('v', openapi.IN_QUERY, description="Document digest from pdf_url", type=openapi.TYPE_STRING),
+        ],
+        responses={200: "application/pdf", 304: "Not modified", 404: "Not found"}
+    )
+    def get(self, request, pk):
+        payslips = Payslip.objects.select_related('employee__designation', 'employee__department')
+        if not request.user.is_staff:
+            payslips = payslips.filter(employee__user=request.user)
+        payslip = payslips.filter(pk=pk).first()
+        if not payslip:
+            raise Http404("Payslip not found")
+
+        digest, path = PayslipDocumentService.get_or_render(payslip)
+        etag = f'"{digest}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = FileResponse(
+            default_storage.open(path, 'rb'),
+            content_type='application/pdf',
+            filename=f"payslip-{payslip.year}-{payslip.month:02d}.pdf",
+        )
+        response['ETag'] = etag
+        if request.query_params.get('v') == digest:
+            patch_cache_control(response, private=True, max_age=self.CACHE_SECONDS, immutable=True)
+        else:
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class PayrollYTDView(APIView):
+    """
+    Fiscal-year statement: year-to-date totals of issued payslips.
+
+    GET /api/payroll/ytd/?fiscal_year=2025            (own totals)
+    GET /api/payroll/ytd/?fiscal_year=2025&employee_id=7  (admin)
+    """
+    permission_classes = [IsAuthenticated]
+
+    @staticmethod
+    def ytd_for(employee, fiscal_year):
+        """Stored YTD row, or an unsaved zero row when nothing was issued yet"""
+        return (
+            PayrollYTD.objects.filter(employee=employee, fiscal_year=fiscal_year).first()
+            or PayrollYTD(employee=employee, fiscal_year=fiscal_year)
+        )
+
+    @swagger_auto_schema(
+        operation_description="Year-to-date gross, deductions, TDS and unpaid leave totals for a fiscal year.",
+        manual_parameters=[
+            openapi.Parameter('fiscal_year', openapi.IN_QUERY, description="Year the fiscal year starts in (default: current)", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('employee_id', openapi.IN_QUERY, description="Employee (admins only)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: PayrollYTDSerializer}
+    )
+    def get(self, request):
+        fiscal_year = request.query_params.get('fiscal_year')
+        employee_id = request.query_params.get('employee_id')
+        try:
+            fiscal_year = int(fiscal_year) if fiscal_year else PayrollYTDService.fiscal_year_of(timezone.now().date())
+            employee_id = int(employee_id) if employee_id else None
+        except ValueError:
+            return Response({
+                "error": 1,
+                "message": "fiscal_year and employee_id must be integers"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if employee_id and request.user.is_staff:
+            employee = get_object_or_404(Employee, pk=employee_id)
+        else:
+            employee = get_object_or_404(Employee, user=request.user)
+
+        return Response({
+            "error": 0,
+            "data": PayrollYTDSerializer(self.ytd_for(employee, fiscal_year)).data
+        })